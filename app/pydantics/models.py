@@ -1,9 +1,12 @@
+from typing import Any, Literal
+
 from pydantic import BaseModel
 
 class PDFSuccessResponse(BaseModel):
     status: str = "success"
     pdf_filename: str
     total_pages: int
+    document_hash: str
 
 class PDFErrorResponse(BaseModel):
     status: str = "error"
@@ -12,10 +15,33 @@ class PDFErrorResponse(BaseModel):
 class ChatPayload(BaseModel):
     file_name: str
     query: str
+    bypass_cache: bool = False
+    session_id: str = "default"
+
+class Citation(BaseModel):
+    chunk_id: str
+    start_page: int | None = None
+    end_page: int | None = None
+    label: str
 
 class ChatResponse(BaseModel):
     status: str = "success"
     llm_reply: str
+    cached: bool = False
+    citations: list[Citation] = []
 
+class StageProgress(BaseModel):
+    status: Literal["pending", "running", "completed", "failed", "cancelled"] = "pending"
+    completed: int = 0
+    total: int | None = None
 
-
+class JobStatus(BaseModel):
+    job_id: str
+    pdf_filename: str
+    operation: Literal["summarize", "chat"]
+    status: Literal["queued", "running", "completed", "failed", "cancelled"] = "queued"
+    stages: dict[str, StageProgress]
+    result: dict[str, Any] | None = None
+    error: str | None = None
+    created_at: float
+    updated_at: float
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
 from app.pydantics.models import ChatPayload
+from app.services.executor_service import StageSaturatedError
 from app.services.llm_service import LLMService
 from app.templates.prompt_template import OperationType
 
@@ -16,7 +18,31 @@ async def setup_chat(
         llm_service: LLMService = Depends(get_llm_service)
 ):
     try:
-        response = await llm_service.invoke_llm(chat_data.query, OperationType(type="chat"), chat_data.file_name)
+        response = await llm_service.invoke_llm(
+            chat_data.query, OperationType(type="chat"), chat_data.file_name,
+            bypass_cache=chat_data.bypass_cache, session_id=chat_data.session_id
+        )
         return response
+    except StageSaturatedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
-        raise e
\ No newline at end of file
+        raise e
+
+@chat_router.post("/chat/stream")
+async def stream_chat(
+        chat_data: ChatPayload,
+        llm_service: LLMService = Depends(get_llm_service)
+):
+    """Stream the chat reply as Server-Sent Events"""
+    try:
+        events = await llm_service.stream_chat(
+            chat_data.query, chat_data.file_name,
+            bypass_cache=chat_data.bypass_cache, session_id=chat_data.session_id
+        )
+    except StageSaturatedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
+    return StreamingResponse(
+        events,
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
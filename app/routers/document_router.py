@@ -0,0 +1,47 @@
+from fastapi import APIRouter, Depends, HTTPException
+from starlette.concurrency import run_in_threadpool
+
+from app.services.llm_service import LLMService
+from app.services.service_container import SERVICES
+
+
+def get_vector_service():
+    return SERVICES.vector_service
+
+
+document_router = APIRouter()
+
+
+@document_router.get("/documents")
+async def list_documents(vector_service=Depends(get_vector_service)):
+    """List the indexed documents with their chunk counts and indexed version"""
+    documents = await run_in_threadpool(vector_service.list_documents)
+    return {"documents": documents, "count": len(documents)}
+
+
+@document_router.get("/documents/{pdf_name}")
+async def get_document_stats(pdf_name: str, vector_service=Depends(get_vector_service)):
+    """Index statistics of one document"""
+    stats = await run_in_threadpool(vector_service.document_stats, pdf_name)
+    if stats is None:
+        raise HTTPException(status_code=404, detail=f"Document not indexed: {pdf_name}")
+    return stats
+
+
+@document_router.get("/documents/{pdf_name}/chunks/{chunk_id}")
+async def get_chunk_source(pdf_name: str, chunk_id: str, vector_service=Depends(get_vector_service)):
+    """Source span of a cited chunk: its text, page range and character offsets within those pages"""
+    source = await run_in_threadpool(vector_service.get_chunk_source, pdf_name, chunk_id)
+    if source is None:
+        raise HTTPException(status_code=404, detail=f"Chunk not found: {chunk_id}")
+    return source
+
+
+@document_router.delete("/documents/{pdf_name}")
+async def delete_document(pdf_name: str, vector_service=Depends(get_vector_service)):
+    """Remove the index of a document together with its cached answers and chat history"""
+    deleted = await run_in_threadpool(vector_service.delete_document, pdf_name)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Document not indexed: {pdf_name}")
+    LLMService.clear_chat_memory(pdf_name)
+    return {"status": "success", "pdf_name": pdf_name, "deleted": True}
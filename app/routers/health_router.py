@@ -3,6 +3,13 @@ from fastapi.responses import JSONResponse
 from datetime import datetime, timezone
 import logging
 
+from app.services.cache_service import ANSWER_CACHE
+from app.services.llm_service import SUMMARY_CACHE
+from app.services.service_container import SERVICES
+from app.services.rerank_service import RERANKER
+from app.services.session_service import SESSION_STORE
+from app.services.vector_service import EMBEDDING_CACHE
+
 health_router = APIRouter()
 
 @health_router.get("/health")
@@ -26,4 +33,32 @@ async def health_check():
                 "message": str(e)
             },
             status_code=500
-        )
\ No newline at end of file
+        )
+
+@health_router.get("/ready")
+async def readiness_check():
+    """To check whether the embedding model and the vector store are loaded, with their startup cost"""
+    ready = SERVICES.is_ready()
+    return JSONResponse(
+        content={
+            "status": "ready" if ready else "starting",
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            **SERVICES.startup_report()
+        },
+        status_code=200 if ready else 503
+    )
+
+@health_router.get("/cache-stats")
+async def cache_stats():
+    """To check the hit rates of the embedding, summary and chat answer caches and the chat session memory"""
+    return JSONResponse(
+        content={
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "embedding_cache": EMBEDDING_CACHE.stats(),
+            "summary_cache": SUMMARY_CACHE.stats() if SUMMARY_CACHE else None,
+            "answer_cache": ANSWER_CACHE.stats() if ANSWER_CACHE else None,
+            "chat_sessions": SESSION_STORE.stats(),
+            "reranker": RERANKER.stats()
+        },
+        status_code=200
+    )
@@ -0,0 +1,54 @@
+import os
+from typing import Literal
+
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
+from fastapi import Form
+from starlette.concurrency import run_in_threadpool
+
+from app.services.job_service import JobService, JOB_SERVICE
+from app.services.pdf_service import PDFService
+
+
+def get_pdf_service():
+    return PDFService()
+
+def get_job_service():
+    return JOB_SERVICE
+
+
+job_router = APIRouter()
+
+
+@job_router.post("/jobs/upload-pdf")
+async def submit_upload_job(
+        file: UploadFile = File(...),
+        operation: Literal["summarize", "chat"] = Form("chat"),
+        pdf_service: PDFService = Depends(get_pdf_service),
+        job_service: JobService = Depends(get_job_service)
+):
+    """Spool the upload and queue its extraction and vectorization/summarization as a background job"""
+    try:
+        # The upload is closed once the request ends, so it is spooled to disk before queueing
+        spool_path, document_hash = await run_in_threadpool(pdf_service.spool_upload, file)
+        pdf_filename = os.path.splitext(file.filename)[0]
+        return job_service.submit(pdf_filename, spool_path, document_hash, operation)
+    except Exception as e:
+        raise e
+
+
+@job_router.get("/jobs/{job_id}")
+async def get_job_status(job_id: str, job_service: JobService = Depends(get_job_service)):
+    """Report the status, per-stage progress and, once finished, the result of a job"""
+    job = job_service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
+
+
+@job_router.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str, job_service: JobService = Depends(get_job_service)):
+    """Cancel a queued or running job"""
+    job = job_service.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Job not found: {job_id}")
+    return job
@@ -1,11 +1,12 @@
 from typing import Literal
 
-from fastapi import APIRouter, UploadFile, File, Depends
+from fastapi import APIRouter, UploadFile, File, Depends, HTTPException
 from fastapi import Form
 
+from app.services.executor_service import EXTRACT_EXECUTOR, VECTORIZE_EXECUTOR, StageSaturatedError
 from app.services.llm_service import LLMService
 from app.services.pdf_service import PDFService
-from app.services.vector_service import VectorService
+from app.services.service_container import SERVICES
 
 
 def get_pdf_service():
@@ -15,7 +16,11 @@ def get_llm_service():
     return LLMService()
 
 def get_vector_service():
-    return VectorService()
+    return SERVICES.vector_service
+
+def vectorize_pdf(pdf_data):
+    vector_service = get_vector_service()
+    return vector_service.vectorize_nudge(pdf_data)
 
 
 pdf_router = APIRouter()
@@ -28,17 +33,19 @@ async def upload_and_summarize(
         pdf_service: PDFService = Depends(get_pdf_service),
 ):
     try:
-        result = pdf_service.process_pdf(file)
+        # Extraction and vectorization are blocking, so they run on bounded stage executors
+        result = await EXTRACT_EXECUTOR.run(pdf_service.process_pdf, file)
         if result.status == "success":
             if operation == "summarize":
                 llm_service = get_llm_service()
                 llm_response = await llm_service.summarize_nudge(result.pdf_filename)
                 return llm_response
-            vector_service = get_vector_service()
-            vector_response = vector_service.vectorize_nudge(result)
+            vector_response = await VECTORIZE_EXECUTOR.run(vectorize_pdf, result)
             return vector_response
         else:
             return result
 
+    except StageSaturatedError as e:
+        raise HTTPException(status_code=429, detail=str(e), headers={"Retry-After": "5"})
     except Exception as e:
         raise e
\ No newline at end of file
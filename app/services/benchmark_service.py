@@ -0,0 +1,350 @@
+import json
+import random
+import re
+import statistics
+import time
+import uuid
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.chunking_service import TextChunker, count_words, normalize_text
+from app.services.rerank_service import RERANKER
+from app.services.vector_store_service import FlatVectorStore, HnswParams, create_vector_store
+
+_IDENTIFIER_PATTERN = re.compile(r"\b(?=[\w./-]*\d)[A-Za-z][\w./-]*\w\b|\b\d+(?:\.\d+)+\b")
+
+
+def make_retrieval_queries(ids: List[str], documents: List[str], sample_size: int,
+                           seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Derive labelled queries from a document's own chunks: each sampled chunk yields a question
+    about one of its identifiers (part numbers, clause IDs) or, failing that, a phrase taken
+    from its text. The chunk it came from is the relevant result. The queries lean towards
+    identifiers, so they suit the index benchmarks, which compare against exact search; retrieval
+    quality is measured on a labelled evaluation set instead, see load_eval_set.
+
+    Args:
+        ids: Chunk IDs
+        documents: Chunk texts, in the same order
+        sample_size: Number of queries
+        seed: Seed of the chunk and phrase sampling
+
+    Returns:
+        (query, relevant chunk ID) pairs
+    """
+    rng = random.Random(seed)
+    sampled = rng.sample(range(len(ids)), min(sample_size, len(ids)))
+
+    queries = []
+    for chunk_index in sampled:
+        text = documents[chunk_index]
+        identifiers = _IDENTIFIER_PATTERN.findall(text)
+        if identifiers:
+            query = f"What does the document say about {rng.choice(identifiers)}?"
+        else:
+            words = text.split()
+            if len(words) < 8:
+                continue
+            start = rng.randrange(0, len(words) - 7)
+            query = " ".join(words[start:start + 8])
+        queries.append((query, ids[chunk_index]))
+    return queries
+
+
+def load_eval_set(path: str, pdf_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Read a labelled retrieval evaluation set: one JSON object per line with a "query" and the
+    relevant "pages" and/or "chunk_ids". An optional "pdf_name" ties a line to one document.
+
+    Args:
+        path: Path of the JSONL file
+        pdf_name: Keep only the lines without a "pdf_name" or with this one
+
+    Returns:
+        The labelled queries
+
+    Raises:
+        ValueError: When a line has no query or no relevance labels
+    """
+    eval_set = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if not item.get("query") or not (item.get("pages") or item.get("chunk_ids")):
+                raise ValueError(f"{path}:{line_num}: needs a query and its relevant pages or chunk_ids")
+            if pdf_name is None or item.get("pdf_name", pdf_name) == pdf_name:
+                eval_set.append(item)
+    return eval_set
+
+
+def is_relevant(citation: Dict[str, Any], item: Dict[str, Any]) -> bool:
+    """Whether a retrieved chunk is one of the labelled chunks or overlaps a labelled page"""
+    if citation["chunk_id"] in item.get("chunk_ids", ()):
+        return True
+    if citation["start_page"] is None:
+        return False
+    return any(citation["start_page"] <= page <= citation["end_page"] for page in item.get("pages", ()))
+
+
+def retrieval_benchmark(vector_service, pdf_name: str, eval_set: List[Dict[str, Any]],
+                        modes: Tuple[str, ...] = ("dense", "hybrid"), top_k: int = 5) -> Optional[Dict[str, Any]]:
+    """
+    Compare retrieval modes on a labelled evaluation set over one indexed document, see load_eval_set.
+
+    Args:
+        vector_service: The VectorService
+        pdf_name: Name of the indexed PDF
+        eval_set: Labelled queries
+        modes: semantic_search modes to compare; a "+rerank" suffix adds cross-encoder re-ranking
+        top_k: Results per query
+
+    Returns:
+        Precision@1, precision@k, hit rate@k, MRR and latency per mode, or None if the document is not indexed
+    """
+    if pdf_name not in vector_service.list_document_names():
+        return None
+
+    # Embed every query and load the cross-encoder first, so each mode is timed on search alone
+    vector_service.get_text_embeddings([item["query"] for item in eval_set])
+    if any(mode.endswith("+rerank") for mode in modes):
+        RERANKER.model.predict([("warm up", "warm up")], show_progress_bar=False)
+
+    report = {"pdf_name": pdf_name, "queries": len(eval_set), "top_k": top_k, "modes": {}}
+    for mode in modes:
+        search_mode, _, rerank = mode.partition("+")
+        latencies, hits, top_hits, reranks_skipped, reciprocal_ranks, precisions = [], 0, 0, 0, [], []
+        for item in eval_set:
+            started = time.perf_counter()
+            result = vector_service.semantic_search(
+                item["query"], pdf_name=pdf_name, top_k=top_k, mode=search_mode, rerank=rerank == "rerank"
+            )
+            latencies.append((time.perf_counter() - started) * 1000)
+
+            relevant = [is_relevant(citation, item) for citation in result["citations"]] if result["success"] else []
+            rank = relevant.index(True) + 1 if any(relevant) else None
+            hits += rank is not None
+            top_hits += rank == 1
+            reciprocal_ranks.append(1 / rank if rank else 0.0)
+            precisions.append(sum(relevant) / top_k)
+            reranks_skipped += bool(result.get("rerank")) and result["rerank"]["status"] == "skipped"
+
+        latencies.sort()
+        report["modes"][mode] = {
+            "precision_at_1": round(top_hits / len(eval_set), 4) if eval_set else 0.0,
+            "precision_at_k": round(statistics.fmean(precisions), 4) if eval_set else 0.0,
+            "hit_rate_at_k": round(hits / len(eval_set), 4) if eval_set else 0.0,
+            "mrr": round(statistics.fmean(reciprocal_ranks), 4) if eval_set else 0.0,
+            "latency_ms_mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+            "latency_ms_p95": round(latencies[int(0.95 * (len(latencies) - 1))], 2) if latencies else 0.0,
+            "rerank_skipped": reranks_skipped
+        }
+    return report
+
+
+def chunking_benchmark(vector_service, pdf_name: str, repeat: int = 3) -> Optional[Dict[str, Any]]:
+    """
+    Measure the throughput of text normalization and chunking on the extracted pages of a PDF.
+
+    Args:
+        vector_service: The VectorService
+        pdf_name: Name of the extracted PDF
+        repeat: Runs per measurement, at least one; the fastest one is reported
+
+    Returns:
+        MB/s per stage and the resulting chunk count, or None if the PDF was not extracted
+    """
+    extracted_pages = vector_service.iter_extracted_pages(pdf_name)
+    if extracted_pages is None:
+        return None
+
+    # Pages are read up front so the measurements exclude disk I/O
+    pages = list(extracted_pages)
+    megabytes = sum(len(text.encode("utf-8")) for _, text in pages) / 1_000_000
+
+    def best_seconds(run) -> Tuple[float, Any]:
+        timings, result = [], None
+        for _ in range(repeat):
+            started = time.perf_counter()
+            result = run()
+            timings.append(time.perf_counter() - started)
+        return min(timings), result
+
+    normalize_seconds, _ = best_seconds(lambda: [normalize_text(text) for _, text in pages])
+    words_seconds, _ = best_seconds(lambda: sum(1 for _ in TextChunker(count_tokens=count_words).iter_chunks(pages)))
+    model_seconds, chunk_count = best_seconds(lambda: sum(1 for _ in vector_service.iter_chunks(pages)))
+
+    def throughput(seconds: float) -> float:
+        return round(megabytes / seconds, 2) if seconds else 0.0
+
+    return {
+        "pdf_name": pdf_name,
+        "pages": len(pages),
+        "megabytes": round(megabytes, 3),
+        "chunks": chunk_count,
+        "normalize_mb_per_s": throughput(normalize_seconds),
+        "chunk_word_count_mb_per_s": throughput(words_seconds),
+        "chunk_model_tokenizer_mb_per_s": throughput(model_seconds)
+    }
+
+
+def exact_neighbours(vectors: np.ndarray, queries: np.ndarray, space: str, k: int) -> np.ndarray:
+    """
+    Brute-force nearest neighbours under an HNSW distance space.
+
+    Args:
+        vectors: Indexed vectors, one per row
+        queries: Query vectors, one per row
+        space: "l2", "cosine" or "ip"
+        k: Neighbours per query
+
+    Returns:
+        Row indices of the k nearest vectors of each query, in no particular order
+    """
+    if space == "cosine":
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+    if space == "l2":
+        distances = (queries ** 2).sum(axis=1)[:, None] - 2 * queries @ vectors.T + (vectors ** 2).sum(axis=1)[None, :]
+    else:
+        distances = 1.0 - queries @ vectors.T
+    return np.argpartition(distances, k - 1, axis=1)[:, :k]
+
+
+def index_benchmark(vector_service, pdf_name: str, configs: List[HnswParams], sample_size: int = 50,
+                    top_k: int = 10, seed: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Measure recall@k against exact search and queries per second for HNSW settings, on the stored
+    vectors of a document. Each configuration is built as a temporary in-memory collection of the
+    configured vector store backend, so the document's own index is left untouched.
+
+    Args:
+        vector_service: The VectorService
+        pdf_name: Name of the indexed PDF
+        configs: HNSW settings to compare
+        sample_size: Number of queries, derived from the document's chunks
+        top_k: Neighbours per query
+        seed: Seed of the query sampling
+
+    Returns:
+        Build time, recall@k and QPS per configuration, or None if the document is not indexed
+    """
+    stored = vector_service.get_stored_chunks(pdf_name, include=("documents", "embeddings"))
+    if not stored or not stored["ids"]:
+        return None
+
+    ids, vectors = stored["ids"], stored["embeddings"]
+    queries = make_retrieval_queries(ids, stored["documents"], sample_size, seed)
+    query_vectors = vector_service.get_text_embeddings([query for query, _ in queries]).reshape(
+        len(queries), vectors.shape[1]
+    )
+    k = min(top_k, len(ids))
+
+    store = create_vector_store(vector_service.vector_store.backend)
+    batch_size = store.max_batch_size() or len(ids)
+    report = {
+        "pdf_name": pdf_name,
+        "backend": store.backend,
+        "chunks": len(ids),
+        "queries": len(queries),
+        "top_k": k,
+        "current": vector_service.document_stats(pdf_name)["index"],
+        "configs": []
+    }
+
+    for params in configs:
+        bench = store.create_collection(f"bench_{uuid.uuid4().hex[:16]}", {"description": "HNSW benchmark"}, params)
+        try:
+            started = time.perf_counter()
+            for start in range(0, len(ids), batch_size):
+                bench.upsert(ids=ids[start:start + batch_size], embeddings=vectors[start:start + batch_size])
+            build_seconds = time.perf_counter() - started
+
+            found = []
+            started = time.perf_counter()
+            for query_vector in query_vectors:
+                found.append(bench.query(query_embeddings=query_vector[None, :], n_results=k,
+                                         include=["distances"])["ids"][0])
+            search_seconds = time.perf_counter() - started
+        finally:
+            store.delete_collection(bench.name)
+
+        recalls = []
+        if queries:
+            for found_ids, exact_rows in zip(found, exact_neighbours(vectors, query_vectors, params.space, k)):
+                recalls.append(len(set(found_ids) & {ids[row] for row in exact_rows}) / k)
+
+        report["configs"].append({
+            **params._asdict(),
+            "build_seconds": round(build_seconds, 3),
+            "recall_at_k": round(statistics.fmean(recalls), 4) if recalls else 0.0,
+            "qps": round(len(queries) / search_seconds, 1) if queries and search_seconds else 0.0
+        })
+    return report
+
+
+def quantization_benchmark(vector_service, pdf_name: str, dtypes: Tuple[str, ...] = ("float32", "float16", "int8"),
+                           sample_size: int = 50, top_k: int = 10, seed: int = 0) -> Optional[Dict[str, Any]]:
+    """
+    Report the vector memory saved and the recall lost by float16 and int8 storage, with and without
+    full-precision rescoring, on the stored vectors of a document. Recall@k is measured against exact
+    float32 cosine search, each configuration runs as a temporary in-memory flat collection.
+
+    Args:
+        vector_service: The VectorService
+        pdf_name: Name of the indexed PDF
+        dtypes: Storage types to compare
+        sample_size: Number of queries, derived from the document's chunks
+        top_k: Neighbours per query
+        seed: Seed of the query sampling
+
+    Returns:
+        Vector bytes, savings against float32, recall@k and QPS per configuration,
+        or None if the document is not indexed
+    """
+    stored = vector_service.get_stored_chunks(pdf_name, include=("documents", "embeddings"))
+    if not stored or not stored["ids"]:
+        return None
+
+    ids, vectors = stored["ids"], stored["embeddings"]
+    queries = make_retrieval_queries(ids, stored["documents"], sample_size, seed)
+    query_vectors = vector_service.get_text_embeddings([query for query, _ in queries]).reshape(
+        len(queries), vectors.shape[1]
+    )
+    k = min(top_k, len(ids))
+    exact = exact_neighbours(vectors, query_vectors, "cosine", k) if queries else []
+
+    report = {"pdf_name": pdf_name, "chunks": len(ids), "dim": vectors.shape[1], "queries": len(queries),
+              "top_k": k, "configs": []}
+    for dtype in dtypes:
+        for rescore in ((False, True) if dtype != "float32" else (False,)):
+            store = FlatVectorStore(params=HnswParams(space="cosine"), dtype=dtype, rescore=rescore)
+            bench = store.create_collection("quantization_benchmark", {"description": "Quantization benchmark"})
+            bench.upsert(ids=ids, embeddings=vectors)
+
+            found = []
+            started = time.perf_counter()
+            for query_vector in query_vectors:
+                found.append(bench.query(query_embeddings=query_vector[None, :], n_results=k,
+                                         include=["distances"])["ids"][0])
+            search_seconds = time.perf_counter() - started
+
+            recalls = [len(set(found_ids) & {ids[row] for row in exact_rows}) / k
+                       for found_ids, exact_rows in zip(found, exact)]
+            memory = bench.memory_stats()
+            recall = statistics.fmean(recalls) if recalls else 0.0
+            report["configs"].append({
+                "dtype": dtype,
+                "rescore": rescore,
+                "vector_bytes": memory["vector_bytes"],
+                "bytes_saved": memory["float32_vector_bytes"] - memory["vector_bytes"],
+                "memory_ratio": round(memory["vector_bytes"] / memory["float32_vector_bytes"], 4),
+                # Kept on disk and memory-mapped when the store is persisted, only candidate rows are read
+                "full_precision_bytes": memory["full_precision_bytes"],
+                "recall_at_k": round(recall, 4),
+                "recall_lost": round(1.0 - recall, 4) if recalls else 0.0,
+                "qps": round(len(queries) / search_seconds, 1) if queries and search_seconds else 0.0
+            })
+    return report
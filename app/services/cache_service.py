@@ -0,0 +1,301 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_CACHE_ENABLED = os.getenv("SUMMARY_CACHE_ENABLED", "true").lower() == "true"
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", "10000"))
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))  # 0 disables the cache
+EMBEDDING_CACHE_TTL = int(os.getenv("EMBEDDING_CACHE_TTL", "86400"))  # Seconds, 0 keeps entries until evicted
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH", "")  # e.g. app/utils/embedding_cache.npz, empty keeps it in memory only
+
+ANSWER_CACHE_ENABLED = os.getenv("ANSWER_CACHE_ENABLED", "true").lower() == "true"
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))  # Minimum query cosine similarity
+ANSWER_CACHE_MAX_PER_DOCUMENT = int(os.getenv("ANSWER_CACHE_MAX_PER_DOCUMENT", "256"))
+ANSWER_CACHE_MAX_DOCUMENTS = int(os.getenv("ANSWER_CACHE_MAX_DOCUMENTS", "100"))
+
+
+class SummaryCache:
+    """Persistent, size-bounded LRU cache of LLM summaries keyed by a hash of their inputs"""
+
+    def __init__(self, db_path: str = "app/utils/summary_cache.sqlite3", max_entries: int = SUMMARY_CACHE_MAX_ENTRIES):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialize_db()
+
+    def _initialize_db(self):
+        """Create the cache table if it does not exist"""
+        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS summaries (
+                key TEXT PRIMARY KEY,
+                summary TEXT NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_summaries_last_access ON summaries (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(input_content: str, prompt: str, model: str, temperature: float) -> str:
+        """
+        Build a content-addressed key. The prompt text is hashed as well,
+        so editing a prompt template invalidates the entries built with it.
+
+        Args:
+            input_content: Text sent as the user message
+            prompt: System prompt used for the call
+            model: LLM model name
+            temperature: Sampling temperature
+
+        Returns:
+            Hex digest identifying the summary
+        """
+        payload = json.dumps([input_content, prompt, model, temperature], ensure_ascii=False)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached summary for `key` and mark it as recently used, or None on a miss"""
+        with self._lock:
+            row = self._conn.execute("SELECT summary FROM summaries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            self._conn.execute("UPDATE summaries SET last_access = ? WHERE key = ?", (time.time(), key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, summary: str):
+        """Store a summary and evict the least recently used entries beyond `max_entries`"""
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, summary, last_access) VALUES (?, ?, ?)",
+                (key, summary, time.time())
+            )
+            self._conn.execute(
+                """
+                DELETE FROM summaries WHERE key IN (
+                    SELECT key FROM summaries ORDER BY last_access DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                (self.max_entries,)
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process and the current number of entries"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM summaries").fetchone()[0]
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": entries,
+            "max_entries": self.max_entries
+        }
+
+
+class EmbeddingCache:
+    """In-process LRU of text hash -> embedding vector with TTL, optionally persisted to an .npz file"""
+
+    def __init__(self, max_entries: int = EMBEDDING_CACHE_SIZE, ttl: int = EMBEDDING_CACHE_TTL,
+                 path: str = EMBEDDING_CACHE_PATH):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, tuple[np.ndarray, float]] = OrderedDict()  # key -> (vector, expires_at)
+        self._lock = threading.Lock()
+        if self.path:
+            self.load()
+
+    @staticmethod
+    def make_key(text: str, model: str) -> str:
+        """Hash the text together with the model that embeds it"""
+        return hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """Return the cached vector for `key` and mark it as recently used, or None on a miss or expiry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or (entry[1] and entry[1] < time.time()):
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, vector):
+        """Store a vector and evict the least recently used entries beyond `max_entries`"""
+        if self.max_entries <= 0:
+            return
+        expires_at = time.time() + self.ttl if self.ttl else 0.0
+        with self._lock:
+            self._entries[key] = (np.asarray(vector, dtype=np.float32), expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def load(self):
+        """Load persisted entries, skipping expired ones"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            data = np.load(self.path, allow_pickle=False)
+            now = time.time()
+            with self._lock:
+                for key, vector, expires_at in zip(data["keys"], data["vectors"], data["expires_at"]):
+                    if not expires_at or expires_at >= now:
+                        self._entries[str(key)] = (vector, float(expires_at))
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        except Exception as e:
+            logger.error(f"Error loading embedding cache from {self.path}: {str(e)}")
+
+    def save(self):
+        """Persist the entries, least recently used first, if a path is configured"""
+        if not self.path:
+            return
+        with self._lock:
+            entries = list(self._entries.items())
+        if not entries:
+            return
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        np.savez(
+            self.path,
+            keys=np.array([key for key, _ in entries]),
+            vectors=np.stack([vector for _, (vector, _) in entries]),
+            expires_at=np.array([expires_at for _, (_, expires_at) in entries], dtype=np.float64)
+        )
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process and the current number of entries"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries
+        }
+
+
+class AnswerCache:
+    """
+    Semantic cache of chat answers per document. An answer is reused when a new query is within
+    the cosine threshold of a cached query and retrieval returned exactly the same chunks.
+    The answer is cached with the citations of the sections its prompt included.
+    """
+
+    def __init__(self, threshold: float = ANSWER_CACHE_THRESHOLD,
+                 max_per_document: int = ANSWER_CACHE_MAX_PER_DOCUMENT,
+                 max_documents: int = ANSWER_CACHE_MAX_DOCUMENTS):
+        self.threshold = threshold
+        self.max_per_document = max_per_document
+        self.max_documents = max_documents
+        self.hits = 0
+        self.misses = 0
+        # pdf_name -> LRU of (normalized query vector, retrieved chunk IDs, answer, citations)
+        self._documents: OrderedDict[str, OrderedDict[int, tuple[np.ndarray, tuple, str, list]]] = OrderedDict()
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _normalize(vector) -> np.ndarray:
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, pdf_name: str, query_vector, chunk_ids: list[str]) -> Optional[tuple[str, list[dict]]]:
+        """
+        Find a cached answer for a semantically equivalent query over the same retrieved context
+
+        Args:
+            pdf_name: Document the query is about
+            query_vector: Embedding of the (augmented) query
+            chunk_ids: IDs of the chunks retrieved for the query, in rank order
+
+        Returns:
+            The cached answer and its citations, or None on a miss
+        """
+        query_vector = self._normalize(query_vector)
+        chunk_ids = tuple(chunk_ids)
+
+        with self._lock:
+            entries = self._documents.get(pdf_name)
+            best_id, best_score = None, self.threshold
+            for entry_id, (cached_vector, cached_chunk_ids, _, _) in (entries or {}).items():
+                if cached_chunk_ids != chunk_ids:
+                    continue
+                score = float(np.dot(cached_vector, query_vector))
+                if score >= best_score:
+                    best_id, best_score = entry_id, score
+
+            if best_id is None:
+                self.misses += 1
+                return None
+
+            self._documents.move_to_end(pdf_name)
+            entries.move_to_end(best_id)
+            self.hits += 1
+            _, _, answer, citations = entries[best_id]
+            return answer, citations
+
+    def store(self, pdf_name: str, query_vector, chunk_ids: list[str], answer: str, citations: list[dict]):
+        """Cache an answer with its citations, evicting the least recently used entries and documents beyond the limits"""
+        with self._lock:
+            entries = self._documents.setdefault(pdf_name, OrderedDict())
+            self._documents.move_to_end(pdf_name)
+            entries[self._next_id] = (self._normalize(query_vector), tuple(chunk_ids), answer, citations)
+            self._next_id += 1
+
+            while len(entries) > self.max_per_document:
+                entries.popitem(last=False)
+            while len(self._documents) > self.max_documents:
+                self._documents.popitem(last=False)
+
+    def invalidate(self, pdf_name: str):
+        """Drop every cached answer of a document, e.g. after it was re-indexed"""
+        with self._lock:
+            self._documents.pop(pdf_name, None)
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process and the current number of entries"""
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "documents": len(self._documents),
+            "entries": sum(len(entries) for entries in self._documents.values())
+        }
+
+
+ANSWER_CACHE = AnswerCache() if ANSWER_CACHE_ENABLED else None
@@ -1,19 +1,58 @@
-import textwrap
+import logging
 from collections import OrderedDict
 
-from app.services.vector_service import VectorService
-from app.templates.prompt_template import OperationType
+from app.services.prompt_service import PROMPT_ASSEMBLER
+from app.services.service_container import SERVICES
+from app.services.session_service import SessionStore, serialize_history, deserialize_history
 
-vector_service = VectorService()
+logger = logging.getLogger(__name__)
 
 class ChatService:
     """Service for managing chat history and generating dynamic prompts"""
     
-    def __init__(self):
+    def __init__(self, pdf_name: str):
+        self.pdf_name = pdf_name  # Retrieval is scoped to this document
         self.memory = OrderedDict()
         self.query_count = 0
         self.max_memory_size = 7  # Last 7 chat pairs
 
+    @classmethod
+    def load(cls, store: SessionStore, session_id: str, pdf_name: str) -> "ChatService":
+        """Restore the chat of a session about a document, or start a new one"""
+        return cls._restore(pdf_name, store.load(session_id, pdf_name))
+
+    @classmethod
+    def _restore(cls, pdf_name: str, state: str | None) -> "ChatService":
+        chat_service = cls(pdf_name)
+        if state:
+            chat_service.query_count, chat_service.memory = deserialize_history(state)
+        return chat_service
+
+    def save(self, store: SessionStore, session_id: str):
+        """Persist the chat history of the session"""
+        store.save(session_id, self.pdf_name, serialize_history(self.query_count, self.memory))
+
+    @classmethod
+    def append_turn(cls, store: SessionStore, session_id: str, pdf_name: str, query: str, response: str):
+        """
+        Add a question and its answer to the session history in one atomic store update.
+        Turns are only recorded once the answer exists, so a failed request leaves the history untouched.
+
+        Args:
+            store: Session store
+            session_id: Chat session ID
+            pdf_name: Document the session is about
+            query: The user's question
+            response: The answer to it
+        """
+        def append(state: str | None) -> str:
+            chat_service = cls._restore(pdf_name, state)
+            chat_service.add_user_message(query)
+            chat_service.add_bot_message(response)
+            return serialize_history(chat_service.query_count, chat_service.memory)
+
+        store.update(session_id, pdf_name, append)
+
     def add_user_message(self, query: str):
         self.query_count += 1
         self.memory[f"User (query_num -> {self.query_count})"] = query
@@ -28,38 +67,28 @@ class ChatService:
             self.memory.popitem(last=False)  # Oldest user message
             self.memory.popitem(last=False)  # Oldest bot/MSP response
 
-    def get_history(self):
-        """Retrieves the conversation history and returns in a structured format"""
-
-        if not self.memory:
-            return "No history found for the user, as they are just started their conversation."
-        max_key_length = max(len(key) for key in self.memory)
-        indent_space = max_key_length + 2
-        history_str = ""
-
-        for i, (key, value) in enumerate(self.memory.items()):
-            wrapped = textwrap.fill(
-                value,
-                width=130,
-                initial_indent=' ' * (max_key_length - len(key)) + f"{key}: ",
-                subsequent_indent=' ' * indent_space
-            )
-            history_str += f"{wrapped}\n"
-            if i % 2 == 1:
-                history_str += '\n'
-        return history_str
-
-
-    def get_dynamic_prompt(self, query):
-        """Generates dynamic prompt by filling the placeholder in the prompt template"""
-
-        history = self.get_history()
-        prompt_template = OperationType(type="chat")
+    def get_dynamic_prompt(self, query, semantic_finding=None):
+        """
+        Generates the chat prompt, fitting history and retrieved chunks into the prompt token budget.
+        Returns the prompt and the page-range citations of the chunks it includes.
+        """
+
+        if semantic_finding is None:
+            semantic_finding = self.retrieve_context(query)
+        # The current question is already the prompt's query, it is not repeated as history
+        current_query_key = f"User (query_num -> {self.query_count})"
+        history = [(key, value) for key, value in self.memory.items() if key != current_query_key]
+
+        chat_prompt, usage, citations = PROMPT_ASSEMBLER.assemble(semantic_finding["query"], history, semantic_finding)
+        logger.debug(f"Chat prompt for {self.pdf_name}: {usage}")
+        return chat_prompt, citations
+
+
+    def retrieve_context(self, query):
+        """Augments the query and searches the chunks of this document; the result carries the augmented query"""
+
         query = self.augment_query(query)
-        semantic_finding = vector_service.semantic_search(query)
-        top_k_match = semantic_finding["results"]["documents"]
-        chat_prompt = prompt_template.dynamic_prompt(query=query, history=history, context=top_k_match)
-        return chat_prompt
+        return SERVICES.vector_service.semantic_search(query, pdf_name=self.pdf_name)
 
 
     def augment_query(self, user_query):
@@ -0,0 +1,219 @@
+import bisect
+import os
+import re
+from typing import Callable, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+CHUNK_MIN_TOKENS = int(os.getenv("CHUNK_MIN_TOKENS", "300"))
+CHUNK_MAX_TOKENS = int(os.getenv("CHUNK_MAX_TOKENS", "500"))
+CHUNK_OVERLAP_TOKENS = int(os.getenv("CHUNK_OVERLAP_TOKENS", "0"))  # Tokens of trailing sentences repeated in the next chunk
+
+# Zero-width characters are deleted by str.translate, every whitespace run collapses in one regex pass
+_ZERO_WIDTH_CHARS = dict.fromkeys(map(ord, "\u200b\u200c\u200d\ufeff"))
+_WHITESPACE_PATTERN = re.compile(r"\s+")
+# Sentence end: terminal punctuation and closing quotes/brackets, followed by a space and an upper-case start
+_SENTENCE_END_PATTERN = re.compile(r"""[.!?]+["')\]]*(?= ["'(\[]?[A-Z0-9])""")
+_PAGE_MARKER_PATTERN = re.compile(r"^--- PAGE (\d+) ---$", re.MULTILINE)
+
+TokenCounter = Callable[[List[str]], List[int]]
+
+
+def normalize_text(text: str) -> str:
+    """Drop zero-width characters and collapse tabs, newlines and repeated spaces into single spaces"""
+    return _WHITESPACE_PATTERN.sub(" ", text.translate(_ZERO_WIDTH_CHARS)).strip()
+
+
+def count_words(texts: List[str]) -> List[int]:
+    """Whitespace token counts, used when no model tokenizer is available"""
+    return [len(text.split()) for text in texts]
+
+
+def split_pages(part_text: str) -> Iterator[Tuple[int, str]]:
+    """
+    Split the text of a part file back into its pages.
+
+    Args:
+        part_text: Part file content with "--- PAGE N ---" headers
+
+    Yields:
+        (page number, raw page text) tuples in page order
+    """
+    markers = list(_PAGE_MARKER_PATTERN.finditer(part_text))
+    if not markers:
+        if part_text.strip():
+            yield 0, part_text
+        return
+
+    for marker, next_marker in zip(markers, markers[1:] + [None]):
+        end = next_marker.start() if next_marker else len(part_text)
+        yield int(marker.group(1)), part_text[marker.end():end]
+
+
+class Chunk(NamedTuple):
+    """A chunk with its position: character offsets in the normalized document text and its page range"""
+    text: str
+    start_char: int
+    end_char: int
+    start_page: int
+    end_page: int
+
+
+class TextChunker:
+    """
+    Streams pages into token-bounded chunks: each page is normalized in a single pass, split into
+    sentences as it arrives and packed into chunks that are yielded as soon as they are complete.
+
+    Offsets refer to the normalized document text, the normalized pages joined by single spaces.
+    page_starts records where each page begins in it and forms the document's offset index.
+    """
+
+    def __init__(self, count_tokens: TokenCounter = count_words, min_tokens: int = CHUNK_MIN_TOKENS,
+                 max_tokens: int = CHUNK_MAX_TOKENS, overlap_tokens: int = CHUNK_OVERLAP_TOKENS):
+        self.count_tokens = count_tokens
+        self.min_tokens = min_tokens
+        self.max_tokens = max(max_tokens, 1)
+        # Overlap stays below min_tokens so a chunk always gains new text before it is flushed
+        self.overlap_tokens = max(min(overlap_tokens, min_tokens // 2), 0)
+        self.page_starts: List[Tuple[int, int]] = []  # (page number, offset of its first character)
+        self.document_length = 0
+
+    def page_at(self, offset: int) -> int:
+        """Number of the page holding the character at offset"""
+        index = bisect.bisect_right(self._page_offsets, offset) - 1
+        return self.page_starts[max(index, 0)][0] if self.page_starts else 0
+
+    def iter_sentences(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Tuple[str, int, int]]:
+        """
+        Segment a stream of raw page texts into sentences. The trailing fragment of a page is
+        carried into the next one, so sentences running across a page break stay whole.
+
+        Args:
+            pages: (page number, raw page text) tuples, in document order
+
+        Yields:
+            (sentence, token count, start offset) tuples
+        """
+        self.page_starts, self._page_offsets, self.document_length = [], [], 0
+        tail, tail_start = "", 0
+
+        for page_num, page in pages:
+            text = normalize_text(page)
+            if not text:
+                continue
+
+            # Pages are joined by a single space in the document text
+            page_start = self.document_length + 1 if self.document_length else 0
+            self.page_starts.append((page_num, page_start))
+            self._page_offsets.append(page_start)
+            self.document_length = page_start + len(text)
+
+            if tail:
+                text = f"{tail} {text}"
+            else:
+                tail_start = page_start
+
+            sentences, starts, start = [], [], 0
+            for match in _SENTENCE_END_PATTERN.finditer(text):
+                sentences.append(text[start:match.end()])
+                starts.append(tail_start + start)
+                start = match.end() + 1
+            tail, tail_start = text[start:], tail_start + start
+
+            # One tokenizer call per page instead of one per sentence
+            if sentences:
+                yield from zip(sentences, self.count_tokens(sentences), starts)
+
+        if tail:
+            yield tail, self.count_tokens([tail])[0], tail_start
+
+    def iter_chunks(self, pages: Iterable[Tuple[int, str]]) -> Iterator[Chunk]:
+        """
+        Pack the sentences of a page stream into chunks of at most max_tokens tokens.
+        No text is dropped: a chunk falls below min_tokens only at the end of the document,
+        and a sentence too long for the remaining space of a small chunk is split between chunks.
+
+        Args:
+            pages: (page number, raw page text) tuples, in document order
+
+        Yields:
+            Chunks as soon as they are complete
+        """
+        chunk: List[Tuple[str, int, int]] = []  # (text, tokens, start offset)
+        total, fresh = 0, False
+
+        for sentence, tokens, start in self.iter_sentences(pages):
+            piece: Optional[str] = sentence
+            while piece:
+                if total + tokens <= self.max_tokens:
+                    chunk.append((piece, tokens, start))
+                    total, fresh = total + tokens, True
+                    break
+
+                if total >= self.min_tokens:
+                    yield self._make_chunk(chunk)
+                    chunk, total = self._overlap(chunk)
+                    fresh = False
+                    continue
+
+                # A small chunk is topped up with the head of the sentence instead of being flushed short.
+                # Words of normalized text are separated by single spaces, so the head is an exact prefix
+                words = piece.split(" ")
+                head_words = max(len(words) * (self.max_tokens - total) // max(tokens, 1), 1)
+                head_tokens = self.count_tokens([" ".join(words[:head_words])])[0]
+                if total + head_tokens > self.max_tokens and head_words > 1:
+                    # Tokens per word vary, so the estimated head can overshoot the remaining space
+                    head_words, head_tokens = self._fit_head(words, head_words, self.max_tokens - total)
+                head, rest = " ".join(words[:head_words]), " ".join(words[head_words:])
+                rest_tokens = self.count_tokens([rest])[0] if rest else 0
+
+                chunk.append((head, head_tokens, start))
+                yield self._make_chunk(chunk)
+                chunk, total = self._overlap(chunk)
+                fresh = False
+                piece, tokens, start = rest, rest_tokens, start + len(head) + 1
+
+        if fresh:
+            yield self._make_chunk(chunk)
+
+    def _fit_head(self, words: List[str], head_words: int, budget: int) -> Tuple[int, int]:
+        """
+        Binary search for the longest prefix of fewer than head_words words that fits in budget tokens.
+        A single word is kept even if it does not fit, so splitting a sentence always makes progress.
+
+        Returns:
+            (number of words, token count) of the prefix
+        """
+        low, high = 1, head_words - 1
+        fitted = None
+        while low <= high:
+            middle = (low + high) // 2
+            tokens = self.count_tokens([" ".join(words[:middle])])[0]
+            if tokens <= budget:
+                fitted, low = (middle, tokens), middle + 1
+            else:
+                high = middle - 1
+        return fitted or (1, self.count_tokens([words[0]])[0])
+
+    def _make_chunk(self, pieces: List[Tuple[str, int, int]]) -> Chunk:
+        start_char = pieces[0][2]
+        end_char = pieces[-1][2] + len(pieces[-1][0])
+        return Chunk(
+            text=" ".join(text for text, _, _ in pieces),
+            start_char=start_char,
+            end_char=end_char,
+            start_page=self.page_at(start_char),
+            end_page=self.page_at(end_char - 1)
+        )
+
+    def _overlap(self, chunk: List[Tuple[str, int, int]]) -> Tuple[List[Tuple[str, int, int]], int]:
+        """Trailing sentences of a flushed chunk that fit the overlap, to start the next chunk with"""
+        overlap, total = [], 0
+        for piece in reversed(chunk):
+            if total + piece[1] > self.overlap_tokens:
+                break
+            overlap.append(piece)
+            total += piece[1]
+        return overlap[::-1], total
@@ -0,0 +1,75 @@
+import asyncio
+import functools
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EXTRACT_MAX_WORKERS = int(os.getenv("EXTRACT_MAX_WORKERS", "2"))
+VECTORIZE_MAX_WORKERS = int(os.getenv("VECTORIZE_MAX_WORKERS", "2"))
+SEARCH_MAX_WORKERS = int(os.getenv("SEARCH_MAX_WORKERS", "4"))
+STAGE_MAX_PENDING = int(os.getenv("STAGE_MAX_PENDING", "8"))  # Queued calls per stage before rejecting
+
+
+class StageSaturatedError(Exception):
+    """Raised when a stage already has as many calls running and queued as it accepts"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"The {stage} stage is at capacity, please retry shortly")
+        self.stage = stage
+
+
+class StageExecutor:
+    """Runs the blocking calls of one pipeline stage on a bounded thread pool, off the event loop"""
+
+    def __init__(self, stage: str, max_workers: int, max_pending: int = STAGE_MAX_PENDING):
+        self.stage = stage
+        self.max_workers = max_workers
+        self.max_in_flight = max_workers + max_pending
+        self.in_flight = 0  # Only touched from the event loop thread
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"{stage}-stage")
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs) -> Any:
+        """
+        Run a blocking callable on the stage's thread pool
+
+        Args:
+            func: Blocking callable
+            *args: Positional arguments for func
+            **kwargs: Keyword arguments for func
+
+        Returns:
+            Whatever func returns
+
+        Raises:
+            StageSaturatedError: When the stage has no free worker or queue slot
+        """
+        if self.in_flight >= self.max_in_flight:
+            raise StageSaturatedError(self.stage)
+
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        finally:
+            self.in_flight -= 1
+
+    def stats(self) -> dict:
+        """Current load of the stage"""
+        return {
+            "in_flight": self.in_flight,
+            "max_workers": self.max_workers,
+            "max_in_flight": self.max_in_flight
+        }
+
+    def shutdown(self):
+        """Stop accepting work and wait for running calls to finish"""
+        self._executor.shutdown(wait=True)
+
+
+EXTRACT_EXECUTOR = StageExecutor("extract", EXTRACT_MAX_WORKERS)
+VECTORIZE_EXECUTOR = StageExecutor("vectorize", VECTORIZE_MAX_WORKERS)
+SEARCH_EXECUTOR = StageExecutor("search", SEARCH_MAX_WORKERS)
@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Literal
+
+from dotenv import load_dotenv
+
+from app.pydantics.models import JobStatus, StageProgress
+from app.services.llm_service import LLMService
+from app.services.pdf_service import PDFService
+from app.services.service_container import SERVICES
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_HISTORY_SIZE = int(os.getenv("JOB_HISTORY_SIZE", "200"))  # Finished jobs kept for status polling
+
+FINISHED_STATUSES = ("completed", "failed", "cancelled")
+
+
+class JobCancelledError(Exception):
+    """Raised from progress callbacks to stop the blocking work of a cancelled job"""
+
+
+class JobService:
+    """In-process background queue running PDF ingestion jobs as tracked stages"""
+
+    def __init__(self, max_workers: int = JOB_WORKERS, history_size: int = JOB_HISTORY_SIZE):
+        self.history_size = history_size
+        self._jobs: OrderedDict[str, JobStatus] = OrderedDict()
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._blocking: dict[str, asyncio.Future] = {}  # Executor work of a job that is still running
+        self._cancelled: set[str] = set()
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ingest-job")
+
+    def submit(self, pdf_filename: str, spool_path: str, document_hash: str,
+               operation: Literal["summarize", "chat"]) -> JobStatus:
+        """
+        Queue an ingestion job for a spooled upload
+
+        Args:
+            pdf_filename: PDF filename without extension
+            spool_path: Path of the spooled upload, removed once extracted
+            document_hash: SHA-256 of the PDF file bytes
+            operation: "summarize" or "chat", as for /upload-pdf
+
+        Returns:
+            Snapshot of the queued job
+        """
+        now = time.time()
+        final_stage = "summarize" if operation == "summarize" else "vectorize"
+        job = JobStatus(
+            job_id=uuid.uuid4().hex,
+            pdf_filename=pdf_filename,
+            operation=operation,
+            stages={"extract": StageProgress(), final_stage: StageProgress()},
+            created_at=now,
+            updated_at=now
+        )
+
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict_finished_jobs()
+            snapshot = job.model_copy(deep=True)
+
+        self._tasks[job.job_id] = asyncio.create_task(self._run_job(job.job_id, spool_path, document_hash))
+        return snapshot
+
+    def get(self, job_id: str) -> JobStatus | None:
+        """Snapshot of a job, or None if it is unknown or was evicted"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.model_copy(deep=True) if job else None
+
+    def cancel(self, job_id: str) -> JobStatus | None:
+        """
+        Request cancellation of a queued or running job. Blocking work stops at its next
+        progress report; a job that already finished is returned unchanged.
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            Snapshot of the job, or None if it is unknown
+        """
+        job = self.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+
+        self._cancelled.add(job_id)
+        task = self._tasks.get(job_id)
+        if task:
+            task.cancel()
+        return self.get(job_id)
+
+    def shutdown(self):
+        """Cancel outstanding jobs and stop the worker pool"""
+        for job_id in list(self._tasks):
+            self.cancel(job_id)
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    async def _run_job(self, job_id: str, spool_path: str, document_hash: str):
+        """Run the extraction stage, then the vectorize or summarize stage, recording progress"""
+        job = self.get(job_id)
+
+        try:
+            self._update_job(job_id, status="running")
+
+            # Extraction
+            self._update_stage(job_id, "extract", status="running")
+            pdf_data = await self._run_blocking(
+                job_id,
+                PDFService().process_spooled_pdf,
+                job.pdf_filename,
+                spool_path,
+                document_hash,
+                self._progress_callback(job_id, "extract")
+            )
+            self._raise_if_cancelled(job_id)
+            if pdf_data.status != "success":
+                return self._fail(job_id, "extract", pdf_data.error)
+            self._update_stage(job_id, "extract", status="completed")
+
+            # Summarization or vectorization
+            if job.operation == "summarize":
+                self._update_stage(job_id, "summarize", status="running")
+                result = await LLMService().summarize_nudge(
+                    pdf_data.pdf_filename, progress=self._progress_callback(job_id, "summarize")
+                )
+                self._raise_if_cancelled(job_id)
+                if not result.get("success"):
+                    return self._fail(job_id, "summarize", result.get("error"))
+                self._update_stage(job_id, "summarize", status="completed")
+            else:
+                self._update_stage(job_id, "vectorize", status="running")
+                result = await self._run_blocking(
+                    job_id,
+                    lambda: SERVICES.vector_service.vectorize_nudge(
+                        pdf_data, progress=self._progress_callback(job_id, "vectorize")
+                    )
+                )
+                self._raise_if_cancelled(job_id)
+                if result.get("status") != "success":
+                    return self._fail(job_id, "vectorize", result.get("error"))
+                self._update_stage(job_id, "vectorize", status="completed")
+
+            self._update_job(job_id, status="completed", result=result)
+
+        except (asyncio.CancelledError, JobCancelledError):
+            self._mark_cancelled(job_id)
+        except Exception as e:
+            logger.error(f"Error in job {job_id}: {str(e)}")
+            self._update_job(job_id, status="failed", error=str(e))
+        finally:
+            # An executor thread cannot be interrupted: keep the cancel flag set and the spooled file
+            # in place until the blocking work has stopped at its next progress report
+            blocking = self._blocking.pop(job_id, None)
+            if blocking is not None:
+                await asyncio.wait([blocking])
+                if not blocking.cancelled():
+                    blocking.exception()  # Retrieved so it is not logged as unhandled
+            # Covers jobs cancelled before extraction picked up the spooled file
+            if os.path.exists(spool_path):
+                try:
+                    os.remove(spool_path)
+                except OSError:
+                    pass
+            self._tasks.pop(job_id, None)
+            self._cancelled.discard(job_id)
+
+    async def _run_blocking(self, job_id: str, func: Callable, *args):
+        """
+        Run blocking work on the job pool. Cancelling the job task does not cancel the work itself,
+        _run_job waits for it to stop before it clears the job's cancel flag.
+        """
+        future = asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        self._blocking[job_id] = future
+        result = await asyncio.shield(future)
+        self._blocking.pop(job_id, None)
+        return result
+
+    def _progress_callback(self, job_id: str, stage: str) -> Callable[[int, int], None]:
+        """Build a progress callback for a stage that also aborts the stage once the job is cancelled"""
+        def report(completed: int, total: int):
+            self._raise_if_cancelled(job_id)
+            self._update_stage(job_id, stage, completed=completed, total=total)
+        return report
+
+    def _raise_if_cancelled(self, job_id: str):
+        if job_id in self._cancelled:
+            raise JobCancelledError(f"Job {job_id} was cancelled")
+
+    def _fail(self, job_id: str, stage: str, error: str | None):
+        self._update_stage(job_id, stage, status="failed")
+        self._update_job(job_id, status="failed", error=error)
+
+    def _mark_cancelled(self, job_id: str):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for stage in job.stages.values():
+                if stage.status in ("pending", "running"):
+                    stage.status = "cancelled"
+            job.status = "cancelled"
+            job.updated_at = time.time()
+
+    def _update_job(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for name, value in fields.items():
+                setattr(job, name, value)
+            job.updated_at = time.time()
+
+    def _update_stage(self, job_id: str, stage: str, **fields):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            for name, value in fields.items():
+                setattr(job.stages[stage], name, value)
+            job.updated_at = time.time()
+
+    def _evict_finished_jobs(self):
+        """Drop the oldest finished jobs beyond the history size; caller holds the lock"""
+        excess = len(self._jobs) - self.history_size
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATUSES]:
+            if excess <= 0:
+                break
+            del self._jobs[job_id]
+            excess -= 1
+
+
+JOB_SERVICE = JobService()
@@ -0,0 +1,161 @@
+import json
+import logging
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+BM25_K1 = float(os.getenv("BM25_K1", "1.5"))
+BM25_B = float(os.getenv("BM25_B", "0.75"))
+
+# Identifiers such as "A-1024.3" or "ISO/IEC-27001" are kept whole and also split into their parts
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[._/-][a-z0-9]+)*")
+_PART_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word tokens, with compound identifiers indexed whole and by part"""
+    tokens = []
+    for token in _TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(token)
+        parts = _PART_PATTERN.findall(token)
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over the chunks of one document, stored as postings lists"""
+
+    def __init__(self, ids: List[str], doc_lens: List[int], postings: Dict[str, List[List[int]]]):
+        self.ids = ids
+        self.doc_lens = doc_lens
+        self.postings = postings  # term -> [[chunk index, term frequency], ...]
+        self.avg_doc_len = sum(doc_lens) / len(doc_lens) if doc_lens else 0.0
+
+    @classmethod
+    def build(cls, ids: List[str], texts: List[str]) -> "BM25Index":
+        """
+        Index chunk texts.
+
+        Args:
+            ids: Chunk IDs, as stored in ChromaDB
+            texts: Chunk texts, in the same order
+
+        Returns:
+            The index
+        """
+        doc_lens, postings = [], {}
+        for chunk_index, text in enumerate(texts):
+            term_counts = Counter(tokenize(text))
+            doc_lens.append(sum(term_counts.values()))
+            for term, frequency in term_counts.items():
+                postings.setdefault(term, []).append([chunk_index, frequency])
+        return cls(list(ids), doc_lens, postings)
+
+    def search(self, query: str, top_k: int = 5) -> List[Tuple[str, float]]:
+        """
+        Rank chunks against a query.
+
+        Args:
+            query: Search query text
+            top_k: Number of results to return
+
+        Returns:
+            (chunk ID, BM25 score) pairs, best first
+        """
+        total_chunks = len(self.ids)
+        scores: Dict[int, float] = {}
+        for term in set(tokenize(query)):
+            term_postings = self.postings.get(term)
+            if not term_postings:
+                continue
+            idf = math.log(1 + (total_chunks - len(term_postings) + 0.5) / (len(term_postings) + 0.5))
+            for chunk_index, frequency in term_postings:
+                length_norm = 1 - BM25_B + BM25_B * self.doc_lens[chunk_index] / self.avg_doc_len
+                scores[chunk_index] = scores.get(chunk_index, 0.0) + idf * frequency * (BM25_K1 + 1) / (
+                    frequency + BM25_K1 * length_norm
+                )
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:top_k]
+        return [(self.ids[chunk_index], score) for chunk_index, score in ranked]
+
+    def to_dict(self) -> dict:
+        return {"ids": self.ids, "doc_lens": self.doc_lens, "postings": self.postings}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "BM25Index":
+        return cls(data["ids"], data["doc_lens"], data["postings"])
+
+
+class LexicalIndexStore:
+    """BM25 indexes per document, kept in memory and optionally persisted as JSON files"""
+
+    def __init__(self, persist_directory: Optional[str] = None):
+        self.persist_directory = persist_directory
+        self._indexes: Dict[str, BM25Index] = {}
+        self._lock = threading.Lock()
+        if self.persist_directory:
+            os.makedirs(self.persist_directory, exist_ok=True)
+
+    def build(self, pdf_name: str, file_name: str, ids: List[str], texts: List[str]) -> BM25Index:
+        """
+        Build and store the index of a document, replacing the previous one.
+
+        Args:
+            pdf_name: Name of the PDF
+            file_name: File name of the persisted index, e.g. the document's collection name
+            ids: Chunk IDs
+            texts: Chunk texts, in the same order
+
+        Returns:
+            The new index
+        """
+        index = BM25Index.build(ids, texts)
+        if self.persist_directory:
+            path = os.path.join(self.persist_directory, f"{file_name}.json")
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(index.to_dict(), f, separators=(",", ":"))
+            os.replace(f"{path}.tmp", path)
+
+        with self._lock:
+            self._indexes[pdf_name] = index
+        return index
+
+    def get(self, pdf_name: str, file_name: str) -> Optional[BM25Index]:
+        """The index of a document, loaded from disk on first use, or None if it was never built"""
+        with self._lock:
+            index = self._indexes.get(pdf_name)
+        if index is not None or not self.persist_directory:
+            return index
+
+        path = os.path.join(self.persist_directory, f"{file_name}.json")
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                index = BM25Index.from_dict(json.load(f))
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading BM25 index {path}: {str(e)}")
+            return None
+
+        with self._lock:
+            self._indexes[pdf_name] = index
+        return index
+
+    def delete(self, pdf_name: str, file_name: str):
+        """Drop the index of a document"""
+        with self._lock:
+            self._indexes.pop(pdf_name, None)
+        if self.persist_directory:
+            path = os.path.join(self.persist_directory, f"{file_name}.json")
+            if os.path.exists(path):
+                os.remove(path)
@@ -1,10 +1,21 @@
+import asyncio
+import json
 import logging
 import os
+import random
+import time
+from collections import deque
+from typing import AsyncIterator, Callable
 
-from openai import AsyncOpenAI
+from openai import AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError
 
 from app.pydantics.models import ChatResponse
+from app.services.cache_service import SummaryCache, SUMMARY_CACHE_ENABLED, ANSWER_CACHE
 from app.services.chat_service import ChatService
+from app.services.executor_service import SEARCH_EXECUTOR, StageSaturatedError
+from app.services.prompt_service import CHAT_RESPONSE_MAX_TOKENS
+from app.services.service_container import SERVICES
+from app.services.session_service import SESSION_STORE, DEFAULT_SESSION_ID
 from app.templates.prompt_template import OperationType
 
 logger = logging.getLogger(__name__)
@@ -12,23 +23,70 @@ logger = logging.getLogger(__name__)
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 
-CLIENT = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL)
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "4"))
+LLM_TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", "0"))  # 0 disables rate limiting
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "1.0"))
+
+# Hierarchical reduction of part summaries; a depth of 0 sends all part summaries to a single final call
+SUMMARY_REDUCE_MAX_DEPTH = int(os.getenv("SUMMARY_REDUCE_MAX_DEPTH", "3"))
+SUMMARY_REDUCE_FAN_IN = int(os.getenv("SUMMARY_REDUCE_FAN_IN", "8"))
+SUMMARY_REDUCE_TOKEN_BUDGET = int(os.getenv("SUMMARY_REDUCE_TOKEN_BUDGET", "60000"))
+
+# Retries are handled by LLMService so they share the backoff policy and the rate limiter
+CLIENT = AsyncOpenAI(api_key=OPENAI_API_KEY, base_url=OPENAI_BASE_URL, max_retries=0)
+
+
+class TokenRateLimiter:
+    """Sliding one-minute window that caps the estimated tokens sent to the LLM"""
+
+    def __init__(self, tokens_per_minute: int):
+        self.tokens_per_minute = tokens_per_minute
+        self._window = deque()  # (timestamp, tokens) of requests in the last minute
+        self._used = 0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, tokens: int):
+        """Wait until `tokens` fit into the current window, then reserve them"""
+        if self.tokens_per_minute <= 0:
+            return
+        tokens = min(tokens, self.tokens_per_minute)
+
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                while self._window and now - self._window[0][0] >= 60:
+                    self._used -= self._window.popleft()[1]
+
+                if self._used + tokens <= self.tokens_per_minute:
+                    self._window.append((now, tokens))
+                    self._used += tokens
+                    return
+
+                await asyncio.sleep(60 - (now - self._window[0][0]))
+
+
+RATE_LIMITER = TokenRateLimiter(LLM_TOKENS_PER_MINUTE)
+
+SUMMARY_CACHE = SummaryCache() if SUMMARY_CACHE_ENABLED else None
 
-global_memory = {} # To store non-persisted chat
 
 class LLMService:
     """Service for summarizing PDF content"""
 
     def __init__(self):
         self.active_model = "gpt-4o-mini"
+        self.max_tokens = 16000
+        self.temperature = 0.2
         self.utils_dir = "app/utils"
 
-    async def summarize_nudge(self, pdf_name: str) -> dict:
+    async def summarize_nudge(self, pdf_name: str, progress: Callable[[int, int], None] | None = None) -> dict:
         """
         Process all parts of a PDF and summarize each part
 
         Args:
             pdf_name: Name of the PDF (directory name in utils)
+            progress: Optional callback receiving (parts summarized, total parts)
 
         Returns:
             dict: Processing result
@@ -37,33 +95,35 @@ class LLMService:
             # Find PDF directory
             pdf_dir = os.path.join(self.utils_dir, pdf_name)
 
-            # Get all part files
+            # Get all part files in numeric part order (part_2 before part_10)
             part_files = [f for f in os.listdir(pdf_dir) if f.startswith('part_') and f.endswith('.txt')]
-            part_files.sort()
+            part_files.sort(key=lambda f: int(os.path.splitext(f)[0].split('_')[1]))
 
-            grouped_summary = ""
-            # Process each part
-            for part_file in part_files:
-                part_path = os.path.join(pdf_dir, part_file)
+            # Summarize the parts concurrently; gather keeps the results in part order
+            semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+            parts_done = 0
 
-                # Read the part content
-                with open(part_path, 'r', encoding='utf-8') as f:
-                    extracted_data = f.read()
+            async def summarize_part(part_file: str) -> str:
+                nonlocal parts_done
+                summarized_data = await self._summarize_part(pdf_name, pdf_dir, part_file, semaphore)
+                parts_done += 1
+                if progress:
+                    progress(parts_done, len(part_files))
+                return summarized_data
 
-                # Getting part name (e.g., "part_1" from "part_1.txt")
-                part_name = os.path.splitext(part_file)[0]
+            part_summaries = await asyncio.gather(*(summarize_part(part_file) for part_file in part_files))
 
-                # Summarize the data
-                summarized_data = await self.invoke_llm(extracted_data, OperationType(type="part"))
-                grouped_summary += f"{part_file}\n\n {summarized_data}\n\n"
-                await self._save_summary(pdf_name, part_name, summarized_data)
+            # Reduce the part summaries level by level until they fit a single final call
+            labelled_summaries = await self._reduce_summaries(list(zip(part_files, part_summaries)), semaphore)
+            grouped_summary = self._join_summaries(labelled_summaries)
 
             final_summary = await self.invoke_llm(grouped_summary, OperationType(type="final"))
 
             return {
                 "success": True,
                 "pdf_name": pdf_name,
-                "summary": final_summary
+                "summary": final_summary,
+                "cache_stats": SUMMARY_CACHE.stats() if SUMMARY_CACHE else None
             }
 
         except Exception as e:
@@ -73,10 +133,98 @@ class LLMService:
                 "error": str(e)
             }
 
+    async def _summarize_part(self, pdf_name: str, pdf_dir: str, part_file: str, semaphore: asyncio.Semaphore) -> str:
+        """
+        Summarize a single part file, bounded by the shared concurrency semaphore
+
+        Args:
+            pdf_name: Name of the PDF
+            pdf_dir: Directory holding the part files
+            part_file: Part file name (e.g., "part_1.txt")
+            semaphore: Limits how many parts are summarized at once
+
+        Returns:
+            Summarized text of the part
+        """
+        async with semaphore:
+            part_path = os.path.join(pdf_dir, part_file)
+
+            # Read the part content
+            with open(part_path, 'r', encoding='utf-8') as f:
+                extracted_data = f.read()
+
+            # Getting part name (e.g., "part_1" from "part_1.txt")
+            part_name = os.path.splitext(part_file)[0]
+
+            # Summarize the data
+            summarized_data = await self.invoke_llm(extracted_data, OperationType(type="part"))
+            await self._save_summary(pdf_name, part_name, summarized_data)
+            return summarized_data
+
+    async def _reduce_summaries(self, labelled_summaries: list[tuple[str, str]], semaphore: asyncio.Semaphore) -> list[tuple[str, str]]:
+        """
+        Tree-reduce summaries: group them into token-bounded fan-in batches and summarize each
+        group concurrently, repeating until one group is left or the depth limit is reached
+
+        Args:
+            labelled_summaries: (label, summary) pairs in document order
+            semaphore: Limits how many groups are summarized at once
+
+        Returns:
+            The (label, summary) pairs to hand to the final summary call
+        """
+        for level in range(1, SUMMARY_REDUCE_MAX_DEPTH + 1):
+            groups = self._group_summaries(labelled_summaries)
+            if len(groups) <= 1:
+                break
+
+            async def summarize_group(group: list[tuple[str, str]]) -> str:
+                async with semaphore:
+                    return await self.invoke_llm(self._join_summaries(group), OperationType(type="group"))
+
+            group_summaries = await asyncio.gather(*(summarize_group(group) for group in groups))
+            labelled_summaries = [
+                (f"level_{level}_group_{group_num}", summary)
+                for group_num, summary in enumerate(group_summaries, 1)
+            ]
+            logger.info(f"Reduced summaries to {len(labelled_summaries)} groups at level {level}")
+
+        return labelled_summaries
+
+    @staticmethod
+    def _group_summaries(labelled_summaries: list[tuple[str, str]]) -> list[list[tuple[str, str]]]:
+        """Split summaries, in order, into groups of at most SUMMARY_REDUCE_FAN_IN that fit the token budget"""
+        groups, current_group, current_tokens = [], [], 0
+
+        for label, summary in labelled_summaries:
+            tokens = LLMService._estimate_tokens(summary)
+            if current_group and (len(current_group) >= SUMMARY_REDUCE_FAN_IN
+                                  or current_tokens + tokens > SUMMARY_REDUCE_TOKEN_BUDGET):
+                groups.append(current_group)
+                current_group, current_tokens = [], 0
+            current_group.append((label, summary))
+            current_tokens += tokens
+
+        if current_group:
+            groups.append(current_group)
+        return groups
+
+    @staticmethod
+    def _join_summaries(labelled_summaries: list[tuple[str, str]]) -> str:
+        """Concatenate labelled summaries into a single LLM input"""
+        return "".join(f"{label}\n\n {summary}\n\n" for label, summary in labelled_summaries)
+
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token estimate (~4 characters per token)"""
+        return len(text) // 4
+
     async def invoke_llm(self,
               input_content: str,
               current_operation: OperationType,
-              pdf_name: str|None = None
+              pdf_name: str|None = None,
+              bypass_cache: bool = False,
+              session_id: str = DEFAULT_SESSION_ID
     ):
         """
         Summarize extracted data or generate chat response using OpenAI
@@ -85,41 +233,187 @@ class LLMService:
             input_content: Text content from PDF part | user_query
             current_operation: OperationType (defines chat, part summary or final summary),
             pdf_name: name of the pdf file
+            bypass_cache: skip the semantic answer cache in chat mode
+            session_id: chat session whose history is used in chat mode
 
         Returns:
             Summarized text or llm_reply in a pydantic way
         """
         try:
+            cache_key = None
+            answer_probe = None
             if current_operation.in_chat_mode():
-                prompt = self._build_chat_prompt(input_content, pdf_name)
+                # Query embedding and vector search block, so they run on the search stage executor
+                prompt, cached_answer, answer_probe, citations = await SEARCH_EXECUTOR.run(
+                    self._build_chat_prompt, input_content, pdf_name, bypass_cache, session_id
+                )
+                if cached_answer is not None:
+                    return self.chat_response(
+                        input_content, cached_answer, pdf_name, cached=True, session_id=session_id, citations=citations
+                    )
             else:
                 prompt = current_operation.dynamic_prompt()
-            response = await CLIENT.chat.completions.create(
-                model=self.active_model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": prompt
-                    },
-                    {
-                        "role": "user",
-                        "content": input_content
-                    }
-                ],
-                response_format={"type": "text"},
-                max_tokens=16000,
-                temperature=0.2
-            )
+                if SUMMARY_CACHE:
+                    # Unchanged parts and documents are served from the summary cache
+                    cache_key = SUMMARY_CACHE.make_key(input_content, prompt, self.active_model, self.temperature)
+                    cached_summary = SUMMARY_CACHE.get(cache_key)
+                    if cached_summary is not None:
+                        return cached_summary
+            # Chat replies get a right-sized completion budget, summaries keep the large one
+            max_tokens = CHAT_RESPONSE_MAX_TOKENS if current_operation.in_chat_mode() else None
+            response = await self._create_completion(prompt, input_content, max_tokens=max_tokens)
 
             llm_response =  response.choices[0].message.content
             if current_operation.in_chat_mode():
-                return self.chat_response(llm_response, pdf_name)
+                if answer_probe and llm_response:
+                    ANSWER_CACHE.store(*answer_probe, llm_response, citations)
+                return self.chat_response(
+                    input_content, llm_response, pdf_name, session_id=session_id, citations=citations
+                )
+            if cache_key and llm_response:
+                SUMMARY_CACHE.put(cache_key, llm_response)
             return response.choices[0].message.content
 
+        except StageSaturatedError:
+            raise
         except Exception as e:
             logger.error(f"Error in _summarize_data: {str(e)}")
             return f"Error summarizing data: {str(e)}"
 
+    async def _create_completion(self, prompt: str, input_content: str, stream: bool = False,
+                                 max_tokens: int | None = None):
+        """
+        Call the chat completions API under the token rate limit, retrying 429/5xx responses,
+        connection errors and timeouts with exponential backoff
+
+        Args:
+            prompt: System prompt
+            input_content: User message content
+            stream: Return an async stream of completion chunks instead of the full completion
+            max_tokens: Completion token limit, defaults to the summary-sized self.max_tokens
+
+        Returns:
+            The raw chat completion response, or the chunk stream when streaming
+        """
+        max_tokens = max_tokens or self.max_tokens
+        # Prompt estimate plus the completion budget, which counts towards the limit
+        estimated_tokens = self._estimate_tokens(prompt + input_content) + max_tokens
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            await RATE_LIMITER.acquire(estimated_tokens)
+            try:
+                return await CLIENT.chat.completions.create(
+                    model=self.active_model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": prompt
+                        },
+                        {
+                            "role": "user",
+                            "content": input_content
+                        }
+                    ],
+                    response_format={"type": "text"},
+                    max_tokens=max_tokens,
+                    temperature=self.temperature,
+                    stream=stream
+                )
+            except APIStatusError as e:
+                retryable = e.status_code == 429 or e.status_code >= 500
+                if not retryable or attempt == LLM_MAX_RETRIES:
+                    raise e
+
+                retry_after = e.response.headers.get("retry-after")
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = LLM_RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, LLM_RETRY_BASE_DELAY)
+
+                logger.warning(f"LLM call failed with status {e.status_code}, retrying in {delay:.1f}s "
+                               f"(attempt {attempt + 1}/{LLM_MAX_RETRIES})")
+                await asyncio.sleep(delay)
+            except (APIConnectionError, APITimeoutError) as e:
+                # The client's own retries are disabled, so transient network failures are retried here
+                if attempt == LLM_MAX_RETRIES:
+                    raise e
+
+                delay = LLM_RETRY_BASE_DELAY * 2 ** attempt + random.uniform(0, LLM_RETRY_BASE_DELAY)
+                logger.warning(f"LLM call failed with {type(e).__name__}, retrying in {delay:.1f}s "
+                               f"(attempt {attempt + 1}/{LLM_MAX_RETRIES})")
+                await asyncio.sleep(delay)
+
+    async def stream_chat(self, user_query: str, pdf_name: str, bypass_cache: bool = False,
+                          session_id: str = DEFAULT_SESSION_ID) -> AsyncIterator[str]:
+        """
+        Retrieve the context for a chat query and open a Server-Sent Events stream of the reply.
+        Retrieval runs before the stream is returned, so a saturated search stage still surfaces
+        as StageSaturatedError instead of an event inside an already started response.
+
+        Args:
+            user_query: The user's question
+            pdf_name: name of the pdf file
+            bypass_cache: skip the semantic answer cache
+            session_id: chat session whose history is used
+
+        Returns:
+            Async iterator of SSE frames
+        """
+        # Query embedding and vector search block, so they run on the search stage executor
+        prompt, cached_answer, answer_probe, citations = await SEARCH_EXECUTOR.run(
+            self._build_chat_prompt, user_query, pdf_name, bypass_cache, session_id
+        )
+        return self._stream_chat_events(
+            user_query, pdf_name, session_id, prompt, cached_answer, answer_probe, citations
+        )
+
+    async def _stream_chat_events(self, user_query: str, pdf_name: str, session_id: str, prompt: str | None,
+                                  cached_answer: str | None, answer_probe: tuple | None,
+                                  citations: list[dict]) -> AsyncIterator[str]:
+        """
+        Forward the completion deltas as they arrive. The question and the full reply are added
+        to the chat memory and the answer cache once the stream finishes, a failed stream records nothing.
+
+        Yields:
+            "delta" events with text fragments, then a "done" event with the ChatResponse,
+            or an "error" event
+        """
+        try:
+            if cached_answer is not None:
+                yield self._sse_event("delta", {"delta": cached_answer})
+                yield self._sse_event("done", self.chat_response(
+                    user_query, cached_answer, pdf_name, cached=True, session_id=session_id, citations=citations
+                ).model_dump())
+                return
+
+            stream = await self._create_completion(
+                prompt, user_query, stream=True, max_tokens=CHAT_RESPONSE_MAX_TOKENS
+            )
+            reply_parts = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    reply_parts.append(delta)
+                    yield self._sse_event("delta", {"delta": delta})
+
+            llm_response = "".join(reply_parts)
+            if answer_probe and llm_response:
+                ANSWER_CACHE.store(*answer_probe, llm_response, citations)
+            yield self._sse_event("done", self.chat_response(
+                user_query, llm_response, pdf_name, session_id=session_id, citations=citations
+            ).model_dump())
+
+        except Exception as e:
+            logger.error(f"Error in stream_chat: {str(e)}")
+            yield self._sse_event("error", {"status": "error", "message": str(e)})
+
+    @staticmethod
+    def _sse_event(event: str, data: dict) -> str:
+        """Format one Server-Sent Events frame"""
+        return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
     async def _save_summary(self, pdf_name: str, part: str, summarized_data: str):
         """
         Save summarized data to file
@@ -148,23 +442,41 @@ class LLMService:
             raise e
 
     @staticmethod
-    def _build_chat_prompt(user_query, pdf_name):
-        chat_service = global_memory.get(pdf_name, None)
+    def _build_chat_prompt(user_query, pdf_name, bypass_cache=False, session_id=DEFAULT_SESSION_ID):
+        """
+        Retrieve the context for a chat query and look it up in the semantic answer cache
 
-        if not chat_service:
-            chat_service = ChatService()
-            global_memory[pdf_name] = chat_service
+        Returns:
+            (prompt or None on a cache hit, cached answer or None, answer cache probe or None,
+            page-range citations of the chunks the answer draws on)
+        """
+        chat_service = ChatService.load(SESSION_STORE, session_id, pdf_name)
+        # The question joins the stored history with its answer, in chat_response
         chat_service.add_user_message(user_query)
-        dynamic_prompt = chat_service.get_dynamic_prompt(user_query)
+        semantic_finding = chat_service.retrieve_context(user_query)
+
+        answer_probe = None
+        if ANSWER_CACHE and not bypass_cache and semantic_finding["success"]:
+            # The query embedding is served from the embedding cache, the search just computed it
+            query_vector = SERVICES.vector_service.get_text_embedding(semantic_finding["query"])
+            answer_probe = (pdf_name, query_vector, semantic_finding["results"]["ids"][0])
+            cached = ANSWER_CACHE.lookup(*answer_probe)
+            if cached is not None:
+                # The citations stored with the answer, i.e. the sections its prompt included
+                cached_answer, citations = cached
+                return None, cached_answer, answer_probe, citations
 
-        return dynamic_prompt
+        dynamic_prompt, citations = chat_service.get_dynamic_prompt(user_query, semantic_finding)
 
-    def chat_response(self, llm_response: str, pdf_name: str):
-        chat_service = global_memory.get(pdf_name, None)
+        return dynamic_prompt, None, answer_probe, citations
+
+    @staticmethod
+    def clear_chat_memory(pdf_name: str):
+        """Forget the chat history of every session about a document"""
+        SESSION_STORE.delete_document(pdf_name)
 
-        if not chat_service:
-            chat_service = ChatService()
-            global_memory[pdf_name] = chat_service
-        chat_service.add_bot_message(llm_response)
+    def chat_response(self, user_query: str, llm_response: str, pdf_name: str, cached: bool = False,
+                      session_id: str = DEFAULT_SESSION_ID, citations: list[dict] | None = None):
+        ChatService.append_turn(SESSION_STORE, session_id, pdf_name, user_query, llm_response)
 
-        return ChatResponse(llm_reply=llm_response)
\ No newline at end of file
+        return ChatResponse(llm_reply=llm_response, cached=cached, citations=citations or [])
\ No newline at end of file
@@ -1,8 +1,26 @@
+import hashlib
+import json
 import os
+import tempfile
+from typing import Callable, Iterator
+
 import fitz  # PyMuPDF
 
 from app.pydantics.models import PDFSuccessResponse, PDFErrorResponse
 
+SPOOL_BLOCK_SIZE = 1024 * 1024  # Bytes copied per read while spooling uploads to disk
+
+# Parallel page extraction on the shared process pool: documents below the page threshold are extracted serially
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(os.cpu_count() or 1)))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "200"))
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "50"))
+
+
+def _extract_page_range(pdf_path: str, start_page: int, end_page: int) -> list[str]:
+    """Worker entry point: open the PDF independently and extract the text of a page range"""
+    with fitz.open(pdf_path, filetype="pdf") as doc:
+        return [doc[page_num].get_text() for page_num in range(start_page, end_page)]
+
 
 class PDFService:
     """Service for extracting and storing text in parts"""
@@ -15,54 +33,185 @@ class PDFService:
         """Ensure the utils directory exists"""
         os.makedirs(self.utils_dir, exist_ok=True)
 
-    def process_pdf(self, file) -> PDFSuccessResponse | PDFErrorResponse:
+    def process_pdf(self, file, progress: Callable[[int, int], None] | None = None) -> PDFSuccessResponse | PDFErrorResponse:
         """
         Process uploaded PDF file and save text in 10-page per part
 
         Args:
             file: FastAPI UploadFile object
+            progress: Optional callback receiving (pages extracted, total pages)
 
         Returns:
             dict: Processing result with details
         """
         try:
-            # Get PDF filename without extension
-            pdf_filename = os.path.splitext(file.filename)[0]
+            # Spool the upload to a temporary file, hashing it on the way, instead of reading it into memory
+            spool_path, document_hash = self.spool_upload(file)
+        except Exception as e:
+            error_message = f"Error occurred while extracting the text from the PDF: {str(e)}"
+            return PDFErrorResponse(error=error_message)
 
+        # Get PDF filename without extension
+        pdf_filename = os.path.splitext(file.filename)[0]
+        return self.process_spooled_pdf(pdf_filename, spool_path, document_hash, progress)
+
+    def process_spooled_pdf(self, pdf_filename: str, spool_path: str, document_hash: str,
+                            progress: Callable[[int, int], None] | None = None) -> PDFSuccessResponse | PDFErrorResponse:
+        """
+        Extract a spooled PDF into 10-page part files; the spooled file is removed afterwards
+
+        Args:
+            pdf_filename: PDF filename without extension
+            spool_path: Path of the spooled upload
+            document_hash: SHA-256 of the PDF file bytes
+            progress: Optional callback receiving (pages extracted, total pages)
+
+        Returns:
+            dict: Processing result with details
+        """
+        try:
             # Create directory for this PDF
             pdf_dir = os.path.join(self.utils_dir, pdf_filename)
             os.makedirs(pdf_dir, exist_ok=True)
 
-            # Read file content and open PDF
-            file_content = file.file.read()
-            doc = fitz.open(stream=file_content, filetype="pdf")
-            total_pages = len(doc)
+            try:
+                # Same document already extracted: reuse its part files
+                metadata = self._load_metadata(pdf_dir)
+                if metadata and metadata.get("document_hash") == document_hash:
+                    if progress:
+                        progress(metadata["total_pages"], metadata["total_pages"])
+                    return PDFSuccessResponse(
+                        pdf_filename=pdf_filename,
+                        total_pages=metadata["total_pages"],
+                        document_hash=document_hash
+                    )
+
+                # Drop part files of a previous version so none are left behind
+                self._remove_part_files(pdf_dir)
+
+                # Opening by path lets PyMuPDF read pages on demand instead of holding the whole file
+                doc = fitz.open(spool_path, filetype="pdf")
+                total_pages = len(doc)
+
+                # Process in chunks of 10 pages
+                pages_per_chunk = 10
+                part_file = None
+
+                try:
+                    # Write each page straight to its part file as it is extracted
+                    for page_num, text in self._extract_pages(spool_path, doc):
+                        if page_num % pages_per_chunk == 0:
+                            if part_file:
+                                part_file.close()
+                            part_filename = f"part_{page_num // pages_per_chunk + 1}.txt"
+                            part_file = open(os.path.join(pdf_dir, part_filename), 'w', encoding='utf-8')
+
+                        part_file.write(f"--- PAGE {page_num + 1} ---\n{text}\n\n")
+                        if progress:
+                            progress(page_num + 1, total_pages)
+                finally:
+                    if part_file:
+                        part_file.close()
+                    doc.close()
+
+                self._save_metadata(pdf_dir, document_hash, total_pages)
+                return PDFSuccessResponse(pdf_filename=pdf_filename, total_pages=total_pages, document_hash=document_hash)
+
+            finally:
+                if os.path.exists(spool_path):
+                    os.remove(spool_path)
 
-            # Process in chunks of 10 pages
-            pages_per_chunk = 10
-            part_number = 1
+        except Exception as e:
+            error_message = f"Error occurred while extracting the text from the PDF: {str(e)}"
+            return PDFErrorResponse(error=error_message)
 
-            for start_page in range(0, total_pages, pages_per_chunk):
-                end_page = min(start_page + pages_per_chunk, total_pages)
+    @staticmethod
+    def iter_page_texts(doc, start_page: int = 0, end_page: int | None = None) -> Iterator[tuple[int, str]]:
+        """
+        Lazily extract page text so only one page is held in memory at a time
 
-                # Extract text from this chunk
-                chunk_text = ""
-                for page_num in range(start_page, end_page):
-                    page = doc[page_num]
-                    text = page.get_text()
-                    chunk_text += f"--- PAGE {page_num + 1} ---\n{text}\n\n"
+        Args:
+            doc: Open PyMuPDF document
+            start_page: First page index to extract
+            end_page: Page index to stop at (exclusive), defaults to the last page
 
-                # Save chunk to file
-                part_filename = f"part_{part_number}.txt"
-                part_path = os.path.join(pdf_dir, part_filename)
+        Yields:
+            (page index, page text) tuples in page order
+        """
+        end_page = len(doc) if end_page is None else end_page
+        for page_num in range(start_page, end_page):
+            yield page_num, doc[page_num].get_text()
 
-                with open(part_path, 'w', encoding='utf-8') as f:
-                    f.write(chunk_text)
+    def _extract_pages(self, pdf_path: str, doc) -> Iterator[tuple[int, str]]:
+        """
+        Extract page text serially for small documents, or across the shared process pool for large ones
 
-                part_number += 1
-            doc.close()
-            return PDFSuccessResponse(pdf_filename=pdf_filename, total_pages=total_pages)
+        Args:
+            pdf_path: Path of the PDF on disk, opened independently by each worker
+            doc: Open PyMuPDF document, used for serial extraction
 
-        except Exception as e:
-            error_message = f"Error occurred while extracting the text from the PDF: {str(e)}"
-            return PDFErrorResponse(error=error_message)
\ No newline at end of file
+        Yields:
+            (page index, page text) tuples in page order
+        """
+        total_pages = len(doc)
+        if PDF_EXTRACT_WORKERS <= 1 or total_pages < PDF_PARALLEL_MIN_PAGES:
+            yield from self.iter_page_texts(doc)
+            return
+
+        ranges = [(start, min(start + PDF_PAGES_PER_TASK, total_pages))
+                  for start in range(0, total_pages, PDF_PAGES_PER_TASK)]
+
+        # Imported here so the spawned extraction workers do not load the other services
+        from app.services.service_container import SERVICES
+
+        # map yields the page ranges back in submission order, i.e. in page order
+        page_texts = SERVICES.extract_pool.map(
+            _extract_page_range,
+            [pdf_path] * len(ranges),
+            [start for start, _ in ranges],
+            [end for _, end in ranges]
+        )
+        for (start_page, _), texts in zip(ranges, page_texts):
+            for offset, text in enumerate(texts):
+                yield start_page + offset, text
+
+    @staticmethod
+    def spool_upload(file) -> tuple[str, str]:
+        """
+        Copy an upload to a temporary file in fixed-size blocks while hashing it
+
+        Args:
+            file: FastAPI UploadFile object
+
+        Returns:
+            (temporary file path, SHA-256 of the file bytes)
+        """
+        sha256 = hashlib.sha256()
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spool:
+            while block := file.file.read(SPOOL_BLOCK_SIZE):
+                sha256.update(block)
+                spool.write(block)
+        return spool.name, sha256.hexdigest()
+
+    @staticmethod
+    def _load_metadata(pdf_dir: str) -> dict | None:
+        """Load the metadata of the last extracted version of a PDF, if any"""
+        metadata_path = os.path.join(pdf_dir, "metadata.json")
+        if not os.path.exists(metadata_path):
+            return None
+        with open(metadata_path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def _save_metadata(pdf_dir: str, document_hash: str, total_pages: int):
+        """Record which version of the PDF the part files were extracted from"""
+        metadata_path = os.path.join(pdf_dir, "metadata.json")
+        with open(metadata_path, 'w', encoding='utf-8') as f:
+            json.dump({"document_hash": document_hash, "total_pages": total_pages}, f)
+
+    @staticmethod
+    def _remove_part_files(pdf_dir: str):
+        """Delete previously extracted part files and metadata"""
+        for file_name in os.listdir(pdf_dir):
+            if (file_name.startswith('part_') and file_name.endswith('.txt')) or file_name == "metadata.json":
+                os.remove(os.path.join(pdf_dir, file_name))
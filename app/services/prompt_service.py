@@ -0,0 +1,229 @@
+import hashlib
+import logging
+import os
+import re
+import threading
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+import tiktoken
+from dotenv import load_dotenv
+
+from app.templates.prompt_template import OperationType
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+PROMPT_TOKENIZER_MODEL = os.getenv("PROMPT_TOKENIZER_MODEL", "gpt-4o-mini")
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", "6000"))  # System prompt incl. history and context
+CHAT_HISTORY_TOKEN_SHARE = float(os.getenv("CHAT_HISTORY_TOKEN_SHARE", "0.3"))  # Share of the free budget for history
+CHAT_HISTORY_SUMMARIZE = os.getenv("CHAT_HISTORY_SUMMARIZE", "true").lower() == "true"
+CHAT_HISTORY_DIGEST_SHARE = float(os.getenv("CHAT_HISTORY_DIGEST_SHARE", "0.25"))  # Share of the history budget for the digest
+CHAT_HISTORY_DIGEST_MESSAGE_TOKENS = int(os.getenv("CHAT_HISTORY_DIGEST_MESSAGE_TOKENS", "60"))  # Per digested message
+CHAT_RESPONSE_MAX_TOKENS = int(os.getenv("CHAT_RESPONSE_MAX_TOKENS", "1500"))
+
+NO_HISTORY = "No history found for the user, as they are just started their conversation."
+NO_CONTEXT = "No matching sections were found in the document."
+
+_tokenizer = None
+_tokenizer_lock = threading.Lock()
+_tokenizer_loaded = False
+
+
+def get_tokenizer() -> Optional[tiktoken.Encoding]:
+    """
+    The tiktoken encoding of the chat model, or None when its BPE file cannot be loaded,
+    e.g. offline without a TIKTOKEN_CACHE_DIR. Token counts then fall back to ~4 characters per token.
+    """
+    global _tokenizer, _tokenizer_loaded
+    if _tokenizer_loaded:
+        return _tokenizer
+
+    with _tokenizer_lock:
+        if not _tokenizer_loaded:
+            try:
+                try:
+                    _tokenizer = tiktoken.encoding_for_model(PROMPT_TOKENIZER_MODEL)
+                except KeyError:
+                    _tokenizer = tiktoken.get_encoding("o200k_base")
+            except Exception as e:
+                logger.warning(f"Could not load the tiktoken encoding, prompt token counts are estimated "
+                               f"from characters: {str(e)}")
+            _tokenizer_loaded = True
+    return _tokenizer
+
+
+def count_tokens(text: str) -> int:
+    """Number of tokens of text for the chat model"""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return (len(text) + 3) // 4
+    return len(tokenizer.encode(text, disallowed_special=()))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """Cut text down to at most max_tokens tokens"""
+    if max_tokens <= 0:
+        return ""
+    tokenizer = get_tokenizer()
+    if tokenizer is None:
+        return text[:max_tokens * 4]
+    tokens = tokenizer.encode(text, disallowed_special=())
+    return text if len(tokens) <= max_tokens else tokenizer.decode(tokens[:max_tokens])
+
+
+@lru_cache(maxsize=4096)
+def format_turn(speaker: str, message: str) -> Tuple[str, int]:
+    """
+    Format one history message and count its tokens. Memoized, so each message is formatted
+    and tokenized once however many turns it stays in the history.
+
+    Args:
+        speaker: Memory key of the message, e.g. "User (query_num -> 3)"
+        message: Message text
+
+    Returns:
+        (formatted line, token count)
+    """
+    line = f"{speaker}: {message}"
+    return line, count_tokens(line) + 1  # +1 for the line break joining the lines
+
+
+class PromptAssembler:
+    """Fits the chat system prompt, conversation history and retrieved chunks into a token budget"""
+
+    def __init__(self, token_budget: int = CHAT_PROMPT_TOKEN_BUDGET,
+                 history_share: float = CHAT_HISTORY_TOKEN_SHARE,
+                 summarize_history: bool = CHAT_HISTORY_SUMMARIZE):
+        self.token_budget = token_budget
+        self.history_share = history_share
+        self.summarize_history = summarize_history
+        self.prompt_template = OperationType(type="chat")
+
+    def assemble(self, query: str, history: List[Tuple[str, str]],
+                 semantic_finding: Optional[Dict[str, Any]]) -> Tuple[str, Dict[str, int], List[Dict[str, Any]]]:
+        """
+        Build the chat prompt within the token budget.
+
+        Args:
+            query: The (augmented) user query
+            history: (speaker, message) pairs, oldest first
+            semantic_finding: Result of VectorService.semantic_search
+
+        Returns:
+            (prompt, token usage per prompt section, citations of the chunks included in the prompt)
+        """
+        template_tokens = count_tokens(self.prompt_template.dynamic_prompt(query=query, history="", context=""))
+        free_tokens = max(self.token_budget - template_tokens, 0)
+
+        history_text, history_tokens = self._fit_history(history, int(free_tokens * self.history_share))
+        # History budget it did not use goes to the document context
+        context_text, context_tokens, citations = self._fit_context(semantic_finding, free_tokens - history_tokens)
+
+        prompt = self.prompt_template.dynamic_prompt(
+            query=query,
+            history=history_text or NO_HISTORY,
+            context=context_text or NO_CONTEXT
+        )
+        return prompt, {
+            "template_tokens": template_tokens,
+            "history_tokens": history_tokens,
+            "context_tokens": context_tokens,
+            "chunks_used": len(citations)
+        }, citations
+
+    def _fit_history(self, history: List[Tuple[str, str]], budget: int) -> Tuple[str, int]:
+        """Keep the most recent messages that fit the budget; older ones are reduced to a digest"""
+        turns = [format_turn(*message) for message in history]
+        verbatim_budget = budget
+        if self.summarize_history and sum(tokens for _, tokens in turns) > budget:
+            # Leave room for the digest of the messages that will not fit
+            verbatim_budget = int(budget * (1 - CHAT_HISTORY_DIGEST_SHARE))
+
+        kept, used = [], 0
+        for index in range(len(turns) - 1, -1, -1):
+            line, tokens = turns[index]
+            if used + tokens > verbatim_budget:
+                break
+            kept.append(line)
+            used += tokens
+        else:
+            index = -1
+
+        lines = kept[::-1]
+        dropped = history[:index + 1]
+        if dropped and self.summarize_history:
+            digest = self._digest_history(dropped, budget - used)
+            if digest:
+                lines.insert(0, digest)
+                used += count_tokens(digest) + 1
+
+        return "\n".join(lines), used
+
+    @staticmethod
+    def _digest_history(messages: List[Tuple[str, str]], budget: int) -> str:
+        """
+        Shorten older messages, questions and answers alike, to their first tokens and keep
+        as many of the most recent ones as fit the budget.
+
+        Args:
+            messages: (speaker, message) pairs that did not fit the history budget, oldest first
+            budget: Tokens left for the digest
+
+        Returns:
+            The digest line, or an empty string when not even one message fits
+        """
+        header = "Summary of the earlier conversation:"
+        used = count_tokens(header) + 1
+        parts = []
+        for speaker, message in reversed(messages):
+            role = "User" if speaker.startswith("User") else "AI"
+            part = f"{role}: {truncate_to_tokens(message, CHAT_HISTORY_DIGEST_MESSAGE_TOKENS)}"
+            tokens = count_tokens(part) + 1
+            if used + tokens > budget:
+                break
+            parts.append(part)
+            used += tokens
+
+        return f"{header} " + " | ".join(parts[::-1]) if parts else ""
+
+    @staticmethod
+    def _fit_context(semantic_finding: Optional[Dict[str, Any]],
+                     budget: int) -> Tuple[str, int, List[Dict[str, Any]]]:
+        """Add the retrieved chunks in rank order, skipping duplicates, until the budget is spent"""
+        if not semantic_finding or not semantic_finding.get("success"):
+            return "", 0, []
+
+        # Search results are ranked best first, by distance or by fused rank in hybrid mode
+        documents = (semantic_finding["results"].get("documents") or [[]])[0]
+        citations = semantic_finding.get("citations") or [None] * len(documents)
+
+        seen, sections, used, cited = set(), [], 0, []
+        for document, citation in zip(documents, citations):
+            fingerprint = hashlib.sha1(re.sub(r"\s+", " ", document).strip().lower().encode("utf-8")).digest()
+            if fingerprint in seen:
+                continue
+            seen.add(fingerprint)
+
+            # The page label lets the model point the user to its sources
+            label = f"Section {len(sections) + 1}, {citation['label']}" if citation else f"Section {len(sections) + 1}"
+            section = f"[{label}]\n{document}"
+            tokens = count_tokens(section) + 2
+            if used + tokens > budget:
+                if not sections:
+                    # Always give the model the best match, cut down to the budget
+                    section = truncate_to_tokens(section, budget - 2)
+                    if section:
+                        sections.append(section)
+                        cited.append(citation)
+                        used += count_tokens(section) + 2
+                break
+            sections.append(section)
+            cited.append(citation)
+            used += tokens
+
+        return "\n\n".join(sections), used, [citation for citation in cited if citation]
+
+
+PROMPT_ASSEMBLER = PromptAssembler()
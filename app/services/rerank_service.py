@@ -0,0 +1,140 @@
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from dotenv import load_dotenv
+
+# sentence_transformers (torch) is imported lazily, the cross-encoder only loads when re-ranking is used
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+RERANK_ENABLED = os.getenv("RERANK_ENABLED", "false").lower() == "true"
+RERANK_MODEL = os.getenv("RERANK_MODEL", "cross-encoder/ms-marco-MiniLM-L-6-v2")
+RERANK_MAX_CANDIDATES = int(os.getenv("RERANK_MAX_CANDIDATES", "30"))  # Upper bound of the candidate pool
+RERANK_BATCH_SIZE = int(os.getenv("RERANK_BATCH_SIZE", "16"))
+RERANK_LATENCY_BUDGET_MS = float(os.getenv("RERANK_LATENCY_BUDGET_MS", "200"))
+RERANK_SKIP_MARGIN = float(os.getenv("RERANK_SKIP_MARGIN", "0.15"))  # Dense distance gap between the top two results
+
+
+class CrossEncoderReranker:
+    """
+    Re-scores retrieved chunks with a local cross-encoder on CPU. The candidate pool adapts to the
+    latency budget using the measured cost per scored pair, and re-ranking is skipped when the dense
+    search already separates its best result clearly.
+    """
+
+    def __init__(self, model_name: str = RERANK_MODEL, max_candidates: int = RERANK_MAX_CANDIDATES,
+                 batch_size: int = RERANK_BATCH_SIZE, latency_budget_ms: float = RERANK_LATENCY_BUDGET_MS,
+                 skip_margin: float = RERANK_SKIP_MARGIN):
+        self.model_name = model_name
+        self.max_candidates = max_candidates
+        self.batch_size = batch_size
+        self.latency_budget_ms = latency_budget_ms
+        self.skip_margin = skip_margin
+        self.pair_ms: Optional[float] = None  # Moving average of the scoring cost per (query, chunk) pair
+        self.reranked = 0
+        self.skipped = 0
+        self._model = None
+        self._lock = threading.Lock()
+
+    @property
+    def model(self):
+        """The cross-encoder, loaded on first use"""
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    from sentence_transformers import CrossEncoder
+                    self._model = CrossEncoder(self.model_name, device="cpu")
+        return self._model
+
+    def candidate_pool(self, top_k: int) -> int:
+        """Number of candidates to retrieve: as many as the latency budget allows, at least top_k"""
+        if self.pair_ms is None:
+            return max(top_k, self.max_candidates)
+        affordable = int(self.latency_budget_ms / max(self.pair_ms, 1e-3))
+        return max(top_k, min(self.max_candidates, affordable))
+
+    def rerank(self, query: str, results: Dict[str, Any], top_k: int,
+               dense_results: Optional[Dict[str, Any]] = None) -> tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Re-order search results by cross-encoder relevance and keep the best top_k.
+
+        Args:
+            query: Search query text
+            results: Search results in the ChromaDB query result layout, ranked best first
+            top_k: Number of results to keep
+            dense_results: The dense ranking results were fused from, defaults to results themselves.
+                Re-ranking is skipped when its best distance clearly leads and that chunk also leads results
+
+        Returns:
+            (results cut to top_k, re-ranking report)
+        """
+        documents = results["documents"][0]
+        # Fused results are in RRF order, so distance gaps are only meaningful in the dense ranking
+        dense_results = dense_results or results
+        distances = [distance for distance in (dense_results.get("distances") or [[]])[0][:2] if distance is not None]
+        separated = len(distances) == 2 and distances[1] - distances[0] >= self.skip_margin
+
+        if len(documents) <= 1:
+            return self._take(results, list(range(len(documents))), top_k), {"status": "skipped", "reason": "single"}
+        if separated and dense_results["ids"][0][0] == results["ids"][0][0]:
+            self.skipped += 1
+            return self._take(results, list(range(len(documents))), top_k), {"status": "skipped", "reason": "separated"}
+
+        started = time.perf_counter()
+        scores: List[float] = []
+        for start in range(0, len(documents), self.batch_size):
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            batch = documents[start:start + self.batch_size]
+            # Stop before a batch that would overrun the budget; the best dense candidates were scored first
+            if scores and self.pair_ms is not None and elapsed_ms + self.pair_ms * len(batch) > self.latency_budget_ms:
+                break
+            scores.extend(float(score) for score in self.model.predict(
+                [(query, document) for document in batch], batch_size=self.batch_size, show_progress_bar=False
+            ))
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        pair_ms = elapsed_ms / len(scores)
+        self.pair_ms = pair_ms if self.pair_ms is None else 0.8 * self.pair_ms + 0.2 * pair_ms
+        self.reranked += 1
+
+        # Scored candidates by relevance, then any unscored ones in their original order
+        order = sorted(range(len(scores)), key=lambda index: scores[index], reverse=True)
+        order += list(range(len(scores), len(documents)))
+        reranked = self._take(results, order, top_k)
+        reranked["rerank_scores"] = [[round(scores[index], 4) if index < len(scores) else None
+                                      for index in order[:top_k]]]
+        return reranked, {
+            "status": "reranked",
+            "candidates": len(documents),
+            "scored": len(scores),
+            "latency_ms": round(elapsed_ms, 2)
+        }
+
+    @staticmethod
+    def _take(results: Dict[str, Any], order: List[int], top_k: int) -> Dict[str, Any]:
+        """Apply a new order to every per-result list of a query result and cut it to top_k"""
+        count = len(results["ids"][0])
+        reordered = dict(results)
+        for key, value in results.items():
+            if isinstance(value, list) and value and isinstance(value[0], list) and len(value[0]) == count:
+                reordered[key] = [[value[0][index] for index in order[:top_k]]]
+        return reordered
+
+    def stats(self) -> dict:
+        """Re-ranking counters and the current cost estimate"""
+        return {
+            "enabled": RERANK_ENABLED,
+            "model": self.model_name,
+            "reranked": self.reranked,
+            "skipped": self.skipped,
+            "pair_ms": round(self.pair_ms, 3) if self.pair_ms is not None else None,
+            "candidate_pool": self.candidate_pool(0)
+        }
+
+
+RERANKER = CrossEncoderReranker()
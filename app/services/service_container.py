@@ -0,0 +1,133 @@
+import importlib
+import logging
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.services.executor_service import EXTRACT_EXECUTOR, VECTORIZE_EXECUTOR, SEARCH_EXECUTOR
+from app.services.pdf_service import PDF_EXTRACT_WORKERS
+from app.services.vector_service import (
+    VectorService, get_embedding_model, embedding_parity, EMBEDDING_BACKEND, EMBEDDING_CACHE
+)
+from app.services.vector_store_service import VECTOR_STORE_BACKEND
+
+logger = logging.getLogger(__name__)
+
+# Compare a non-PyTorch embedding backend with the PyTorch reference during warm-up
+EMBEDDING_PARITY_CHECK = os.getenv("EMBEDDING_PARITY_CHECK", "false").lower() == "true"
+
+
+class ServiceContainer:
+    """Process-wide holder of the long-lived services shared by every router"""
+
+    def __init__(self):
+        self._vector_service = None
+        self._extract_pool = None
+        self._lock = threading.Lock()
+        self.app_import_seconds = None
+        self.embedding_parity = None
+        # Readiness and startup cost of each component loaded during warm-up
+        self.components = {
+            name: {"status": "pending", "import_seconds": None, "load_seconds": None, "error": None}
+            for name in ("embedding_model", "vector_store")
+        }
+
+    @property
+    def vector_service(self) -> VectorService:
+        """The shared VectorService: one vector store, collection handle and embedding model per process"""
+        if self._vector_service is None:
+            with self._lock:
+                if self._vector_service is None:
+                    self._vector_service = VectorService()
+        return self._vector_service
+
+    @property
+    def extract_pool(self) -> ProcessPoolExecutor:
+        """
+        The shared process pool for page extraction, started on first use. Workers are spawned rather
+        than forked: the pool is created from a worker thread while torch and ChromaDB threads run,
+        and forking a multithreaded process can deadlock the children.
+        """
+        if self._extract_pool is None:
+            with self._lock:
+                if self._extract_pool is None:
+                    self._extract_pool = ProcessPoolExecutor(
+                        max_workers=PDF_EXTRACT_WORKERS, mp_context=multiprocessing.get_context("spawn")
+                    )
+        return self._extract_pool
+
+    def warm_up(self):
+        """Load the embedding model and the vector store concurrently so requests do not pay for them"""
+        loaders = {
+            "embedding_model": ("sentence_transformers", self._load_embedding_model),
+            "vector_store": ({"hnswlib": "hnswlib", "flat": "numpy"}.get(VECTOR_STORE_BACKEND, "chromadb"),
+                             lambda: self.vector_service)
+        }
+        with ThreadPoolExecutor(max_workers=len(loaders), thread_name_prefix="warm-up") as pool:
+            for name, (module_name, loader) in loaders.items():
+                pool.submit(self._load_component, name, module_name, loader)
+
+        if EMBEDDING_PARITY_CHECK and EMBEDDING_BACKEND != "torch" and self.is_ready():
+            try:
+                self.embedding_parity = embedding_parity()
+            except Exception as e:
+                logger.error(f"Error checking embedding parity: {str(e)}")
+
+        logger.info(f"Startup report: {self.startup_report()}")
+
+    def _load_embedding_model(self):
+        # One encode call also initializes the model's inference kernels
+        get_embedding_model().encode("warm up", convert_to_tensor=False)
+
+    def _load_component(self, name: str, module_name: str, loader: Callable[[], Any]):
+        """Import a component's module and run its loader, timing both phases"""
+        component = self.components[name]
+        component["status"] = "loading"
+        try:
+            started = time.perf_counter()
+            importlib.import_module(module_name)
+            imported = time.perf_counter()
+            loader()
+            loaded = time.perf_counter()
+
+            component["import_seconds"] = round(imported - started, 3)
+            component["load_seconds"] = round(loaded - imported, 3)
+            component["status"] = "ready"
+        except Exception as e:
+            logger.error(f"Error loading {name}: {str(e)}")
+            component["status"] = "error"
+            component["error"] = str(e)
+
+    def is_ready(self) -> bool:
+        """True once every component finished loading"""
+        return all(component["status"] == "ready" for component in self.components.values())
+
+    def startup_report(self) -> dict:
+        """Import and load cost per component"""
+        return {
+            "app_import_seconds": self.app_import_seconds,
+            "embedding_backend": EMBEDDING_BACKEND,
+            "embedding_parity": self.embedding_parity,
+            "components": {name: dict(component) for name, component in self.components.items()}
+        }
+
+    def shutdown(self):
+        """Drain the stage executors and release the shared services"""
+        for executor in (EXTRACT_EXECUTOR, VECTORIZE_EXECUTOR, SEARCH_EXECUTOR):
+            executor.shutdown()
+        try:
+            EMBEDDING_CACHE.save()
+        except Exception as e:
+            logger.error(f"Error saving embedding cache: {str(e)}")
+        with self._lock:
+            self._vector_service = None
+            if self._extract_pool is not None:
+                self._extract_pool.shutdown(wait=True, cancel_futures=True)
+                self._extract_pool = None
+        logger.info("Services shut down")
+
+
+SERVICES = ServiceContainer()
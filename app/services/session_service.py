@@ -0,0 +1,289 @@
+import abc
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Optional
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CHAT_SESSION_STORE = os.getenv("CHAT_SESSION_STORE", "memory").lower()  # "memory" or "sqlite"
+CHAT_SESSION_MAX = int(os.getenv("CHAT_SESSION_MAX", "1000"))  # Sessions kept before evicting the least recently used
+CHAT_SESSION_TTL = int(os.getenv("CHAT_SESSION_TTL", "86400"))  # Seconds of inactivity, 0 keeps sessions until evicted
+CHAT_SESSION_DB_PATH = os.getenv("CHAT_SESSION_DB_PATH", "app/utils/chat_sessions.sqlite3")
+
+DEFAULT_SESSION_ID = "default"
+
+
+class SessionStore(abc.ABC):
+    """Chat histories keyed by (session ID, document), stored as compact serialized state"""
+
+    @abc.abstractmethod
+    def load(self, session_id: str, pdf_name: str) -> Optional[str]:
+        """Return the serialized state of a session, or None if it is unknown or expired"""
+
+    @abc.abstractmethod
+    def save(self, session_id: str, pdf_name: str, state: str):
+        """Store the serialized state of a session"""
+
+    @abc.abstractmethod
+    def update(self, session_id: str, pdf_name: str, transform: Callable[[Optional[str]], str]):
+        """
+        Replace the state of a session with transform(current state) in one atomic step,
+        so concurrent requests of a session never overwrite each other's turns.
+
+        Args:
+            session_id: Chat session ID
+            pdf_name: Document the session is about
+            transform: Receives the serialized state, or None for an unknown or expired session,
+                and returns the new serialized state
+        """
+
+    @abc.abstractmethod
+    def delete_document(self, pdf_name: str) -> int:
+        """Drop every session about a document and return how many were removed"""
+
+    @abc.abstractmethod
+    def stats(self) -> dict:
+        """Session counts and the memory held by their serialized state"""
+
+
+class MemorySessionStore(SessionStore):
+    """Per-process LRU of sessions with an inactivity TTL"""
+
+    def __init__(self, max_sessions: int = CHAT_SESSION_MAX, ttl: int = CHAT_SESSION_TTL):
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._sessions: OrderedDict[tuple[str, str], tuple[str, float]] = OrderedDict()  # key -> (state, last_access)
+        self._state_bytes = 0
+        self._lock = threading.Lock()
+
+    def load(self, session_id: str, pdf_name: str) -> Optional[str]:
+        key = (session_id, pdf_name)
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is None or self._expired(entry[1]):
+                if entry is not None:
+                    self._remove(key)
+                self.misses += 1
+                return None
+
+            self._sessions[key] = (entry[0], time.time())
+            self._sessions.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def save(self, session_id: str, pdf_name: str, state: str):
+        with self._lock:
+            self._put((session_id, pdf_name), state)
+
+    def update(self, session_id: str, pdf_name: str, transform: Callable[[Optional[str]], str]):
+        key = (session_id, pdf_name)
+        with self._lock:
+            entry = self._sessions.get(key)
+            current = entry[0] if entry is not None and not self._expired(entry[1]) else None
+            self._put(key, transform(current))
+
+    def delete_document(self, pdf_name: str) -> int:
+        with self._lock:
+            keys = [key for key in self._sessions if key[1] == pdf_name]
+            for key in keys:
+                self._remove(key)
+            return len(keys)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "evictions": self.evictions,
+            "sessions": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "state_bytes": self._state_bytes
+        }
+
+    def _expired(self, last_access: float) -> bool:
+        return bool(self.ttl) and last_access + self.ttl < time.time()
+
+    def _put(self, key: tuple[str, str], state: str):
+        """Store a session as the most recently used one, evicting beyond max_sessions; caller holds the lock"""
+        if key in self._sessions:
+            self._remove(key)
+        self._sessions[key] = (state, time.time())
+        self._state_bytes += len(state.encode("utf-8"))
+
+        while len(self._sessions) > self.max_sessions:
+            self._remove(next(iter(self._sessions)))
+            self.evictions += 1
+
+    def _remove(self, key: tuple[str, str]):
+        """Drop a session and its size from the byte count; caller holds the lock"""
+        state, _ = self._sessions.pop(key)
+        self._state_bytes -= len(state.encode("utf-8"))
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions in a SQLite file, shared by every worker process on the host and kept across restarts"""
+
+    def __init__(self, db_path: str = CHAT_SESSION_DB_PATH, max_sessions: int = CHAT_SESSION_MAX,
+                 ttl: int = CHAT_SESSION_TTL):
+        self.db_path = db_path
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._initialize_db()
+
+    def _initialize_db(self):
+        """Create the sessions table if it does not exist"""
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10)
+        # WAL lets the workers read while another one writes
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chat_sessions (
+                session_id TEXT NOT NULL,
+                pdf_name TEXT NOT NULL,
+                state TEXT NOT NULL,
+                last_access REAL NOT NULL,
+                PRIMARY KEY (session_id, pdf_name)
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_last_access ON chat_sessions (last_access)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_chat_sessions_pdf_name ON chat_sessions (pdf_name)")
+        self._conn.commit()
+
+    def load(self, session_id: str, pdf_name: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT state, last_access FROM chat_sessions WHERE session_id = ? AND pdf_name = ?",
+                (session_id, pdf_name)
+            ).fetchone()
+            if row is None or (self.ttl and row[1] + self.ttl < now):
+                self.misses += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE chat_sessions SET last_access = ? WHERE session_id = ? AND pdf_name = ?",
+                (now, session_id, pdf_name)
+            )
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def save(self, session_id: str, pdf_name: str, state: str):
+        with self._lock:
+            self._write(session_id, pdf_name, state, time.time())
+            self._conn.commit()
+
+    def update(self, session_id: str, pdf_name: str, transform: Callable[[Optional[str]], str]):
+        now = time.time()
+        with self._lock:
+            # The write lock is taken before reading, so other worker processes wait for this update
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT state, last_access FROM chat_sessions WHERE session_id = ? AND pdf_name = ?",
+                    (session_id, pdf_name)
+                ).fetchone()
+                current = row[0] if row is not None and not (self.ttl and row[1] + self.ttl < now) else None
+                self._write(session_id, pdf_name, transform(current), now)
+                self._conn.commit()
+            except Exception as e:
+                self._conn.rollback()
+                raise e
+
+    def _write(self, session_id: str, pdf_name: str, state: str, now: float):
+        """Store a session and drop expired and surplus ones; caller holds the lock and commits"""
+        self._conn.execute(
+            "INSERT OR REPLACE INTO chat_sessions (session_id, pdf_name, state, last_access) VALUES (?, ?, ?, ?)",
+            (session_id, pdf_name, state, now)
+        )
+        if self.ttl:
+            self._conn.execute("DELETE FROM chat_sessions WHERE last_access < ?", (now - self.ttl,))
+        self._conn.execute(
+            """
+            DELETE FROM chat_sessions WHERE rowid IN (
+                SELECT rowid FROM chat_sessions ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_sessions,)
+        )
+
+    def delete_document(self, pdf_name: str) -> int:
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM chat_sessions WHERE pdf_name = ?", (pdf_name,)).rowcount
+            self._conn.commit()
+            return deleted
+
+    def stats(self) -> dict:
+        with self._lock:
+            sessions, state_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(LENGTH(CAST(state AS BLOB))), 0) FROM chat_sessions"
+            ).fetchone()
+        total = self.hits + self.misses
+        return {
+            "backend": "sqlite",
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            "sessions": sessions,
+            "max_sessions": self.max_sessions,
+            "state_bytes": state_bytes
+        }
+
+
+def serialize_history(query_count: int, memory: OrderedDict) -> str:
+    """
+    Serialize a chat history compactly as [query count, [[role, query number, text], ...]]
+
+    Args:
+        query_count: Number of the latest user query
+        memory: ChatService memory, keyed "User (query_num -> N)" / "AI (response_num -> N)"
+
+    Returns:
+        JSON string
+    """
+    turns = []
+    for key, text in memory.items():
+        role = "u" if key.startswith("User") else "a"
+        turns.append([role, int(key.rsplit("-> ", 1)[1].rstrip(")")), text])
+    return json.dumps([query_count, turns], ensure_ascii=False, separators=(",", ":"))
+
+
+def deserialize_history(state: str) -> tuple[int, OrderedDict]:
+    """Rebuild the query count and ChatService memory from serialize_history output"""
+    query_count, turns = json.loads(state)
+    memory = OrderedDict()
+    for role, num, text in turns:
+        key = f"User (query_num -> {num})" if role == "u" else f"AI (response_num -> {num})"
+        memory[key] = text
+    return query_count, memory
+
+
+def create_session_store(backend: str = CHAT_SESSION_STORE) -> SessionStore:
+    """Build the configured session store"""
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend != "memory":
+        logger.warning(f"Unknown CHAT_SESSION_STORE '{backend}', using the in-memory store")
+    return MemorySessionStore()
+
+
+SESSION_STORE = create_session_store()
@@ -1,23 +1,122 @@
+import hashlib
+import json
+import logging
 import os
-import re
-import uuid
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple
 
-import chromadb
-import nltk
-from chromadb.config import Settings
+import numpy as np
 from dotenv import load_dotenv
-from nltk.data import find
-from nltk.tokenize import sent_tokenize
-from sentence_transformers import SentenceTransformer
 
 from app.pydantics.models import PDFSuccessResponse
+from app.services.cache_service import EmbeddingCache, ANSWER_CACHE
+from app.services.chunking_service import Chunk, TextChunker, normalize_text, split_pages, count_words
+from app.services.lexical_service import LexicalIndexStore
+from app.services.rerank_service import RERANKER, RERANK_ENABLED
+from app.services.vector_store_service import HnswParams, create_vector_store
+
+# The vector store backend and sentence_transformers (torch) are imported lazily so the app starts fast
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL")
-CURRENT_EMBEDDING_MODEL = SentenceTransformer(EMBEDDING_MODEL)
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+VECTOR_WRITE_BATCH_SIZE = int(os.getenv("VECTOR_WRITE_BATCH_SIZE", "512"))
+
+# Embedding backend: "torch" (fp32), "onnx" (ONNX Runtime) or "onnx-int8" (dynamically quantized ONNX)
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "torch").lower()
+EMBEDDING_ONNX_INT8_FILE = os.getenv("EMBEDDING_ONNX_INT8_FILE", "onnx/model_quint8_avx2.onnx")
+
+PARITY_SAMPLE_TEXTS = [
+    "What are the key findings of this report?",
+    "The warranty does not cover damage caused by improper installation or unauthorized repairs.",
+    "Section 4.2 specifies a maximum operating temperature of 85 degrees Celsius.",
+    "Revenue grew by 12 percent year over year, driven mainly by the services segment."
+]
+
+EMBEDDING_CACHE = EmbeddingCache()
+
+# Every document gets its own collection, so a query only walks the index of the active document
+DOCUMENT_COLLECTION_PREFIX = "pdf_"
+LEGACY_COLLECTION_NAME = "pdf_documents"  # Shared collection of earlier versions, no longer queried
+
+# Retrieval: "hybrid" fuses BM25 and dense results with reciprocal rank fusion, "dense" is vector search only
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid").lower()
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "20"))  # Results taken from each retriever before fusion
+HYBRID_DENSE_WEIGHT = float(os.getenv("HYBRID_DENSE_WEIGHT", "1.0"))
+HYBRID_LEXICAL_WEIGHT = float(os.getenv("HYBRID_LEXICAL_WEIGHT", "1.0"))
+HYBRID_RRF_K = int(os.getenv("HYBRID_RRF_K", "60"))
+
+# BM25 lookups run next to the dense search of the same query
+_LEXICAL_SEARCH_EXECUTOR = ThreadPoolExecutor(max_workers=4, thread_name_prefix="bm25-search")
+
+_embedding_model = None
+_embedding_model_lock = threading.Lock()
+
+
+def get_embedding_model():
+    """Load the process-wide SentenceTransformer on first use, with the configured backend"""
+    global _embedding_model
+    if _embedding_model is None:
+        with _embedding_model_lock:
+            if _embedding_model is None:
+                _embedding_model = _load_embedding_model(EMBEDDING_BACKEND)
+    return _embedding_model
+
+
+def _load_embedding_model(backend: str):
+    """
+    Build the SentenceTransformer for an embedding backend.
+    The ONNX backends need `optimum[onnxruntime]` installed.
+
+    Args:
+        backend: "torch", "onnx" or "onnx-int8"
+
+    Returns:
+        SentenceTransformer exposing the same encode API for every backend
+    """
+    from sentence_transformers import SentenceTransformer
+
+    if backend == "torch":
+        return SentenceTransformer(EMBEDDING_MODEL)
+    if backend == "onnx":
+        return SentenceTransformer(EMBEDDING_MODEL, backend="onnx")
+    if backend == "onnx-int8":
+        try:
+            return SentenceTransformer(
+                EMBEDDING_MODEL,
+                backend="onnx",
+                model_kwargs={"file_name": EMBEDDING_ONNX_INT8_FILE}
+            )
+        except Exception as e:
+            # Not every model ships pre-quantized weights; fall back to fp32 ONNX
+            logger.warning(f"Could not load {EMBEDDING_ONNX_INT8_FILE} for {EMBEDDING_MODEL}, "
+                           f"using the fp32 ONNX model instead: {str(e)}")
+            return SentenceTransformer(EMBEDDING_MODEL, backend="onnx")
+    raise ValueError(f"Unsupported EMBEDDING_BACKEND: {backend}")
+
+
+def embedding_parity(texts: List[str] = PARITY_SAMPLE_TEXTS) -> Dict[str, float]:
+    """
+    Compare the configured backend against the PyTorch fp32 reference model.
+
+    Args:
+        texts: Sample texts to embed with both models
+
+    Returns:
+        Minimum and mean cosine similarity between the two embeddings of each text
+    """
+    reference = _load_embedding_model("torch")
+    candidate = get_embedding_model().encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+    expected = reference.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+
+    cosines = (candidate * expected).sum(axis=1)
+    return {"min_cosine": round(float(cosines.min()), 4), "mean_cosine": round(float(cosines.mean()), 4)}
 
 
 class VectorService:
@@ -26,64 +125,81 @@ class VectorService:
     def __init__(self):
         self.utils_dir = "app/utils"
         self.ensure_utils_directory()
-        self.embedding_model = CURRENT_EMBEDDING_MODEL
         self.persist_db = os.getenv('VECTOR_PERSIST').lower() == 'true'
-        self._initialize_chromadb()
-        self._ensure_nltk_data()
+        self._initialize_vector_store()
+
+    @property
+    def embedding_model(self):
+        """The shared embedding model, loaded on first use"""
+        return get_embedding_model()
 
     def ensure_utils_directory(self):
         """Ensure the utils directory exists"""
         os.makedirs(self.utils_dir, exist_ok=True)
 
-    def _initialize_chromadb(self):
-        """Initialize ChromaDB with configurable persistence"""
+    def _initialize_vector_store(self):
+        """Initialize the configured vector store (ChromaDB or hnswlib) with configurable persistence"""
         try:
-            if self.persist_db:
-                # Persistent ChromaDB
-                persist_directory = os.path.join(os.getcwd(), 'app/chroma_db')
-                os.makedirs(persist_directory, exist_ok=True)
-
-                self.chroma_client = chromadb.PersistentClient(
-                    path=persist_directory,
-                    settings=Settings(
-                        anonymized_telemetry=False,
-                        allow_reset=True
-                    )
-                )
-            else:
-                # In-memory ChromaDB
-                self.chroma_client = chromadb.EphemeralClient(
-                    settings=Settings(
-                        anonymized_telemetry=False,
-                        allow_reset=True
-                    )
-                )
+            self.vector_store = create_vector_store(persist=self.persist_db)
+
+            self._collections = {}
+            self._collections_lock = threading.Lock()
 
-            # Get or create collection
-            self.collection = self.chroma_client.get_or_create_collection(
-                name="pdf_documents",
-                metadata={"description": "PDF document chunks for RAG"}
+            # BM25 indexes live next to the vector store files, or in memory with the in-memory store
+            self.lexical_index = LexicalIndexStore(
+                os.path.join(os.getcwd(), 'app/bm25_index') if self.persist_db else None
             )
+
+            if LEGACY_COLLECTION_NAME in self._list_collection_names():
+                logger.warning(
+                    f"Ignoring the shared '{LEGACY_COLLECTION_NAME}' collection of an earlier version; "
+                    f"documents are re-indexed into per-document collections on their next upload. "
+                    f"Run 'rebuild_index.py --drop-legacy' to delete it"
+                )
         except Exception as e:
             raise e
 
-    def _ensure_nltk_data(self):
-        """Ensure required NLTK data is available"""
-        try:
-            find("tokenizers/punkt")
-            find("tokenizers/punkt/english.pickle")
-            find("tokenizers/punkt_tab")
-        except LookupError:
-            nltk.download("punkt")
-            nltk.download("punkt_tab")
+    @staticmethod
+    def _collection_name(pdf_name: str) -> str:
+        """Collection name of a document, hashed so any PDF name maps to a valid ChromaDB name"""
+        return DOCUMENT_COLLECTION_PREFIX + hashlib.sha256(pdf_name.encode("utf-8")).hexdigest()[:32]
+
+    def _list_collection_names(self) -> List[str]:
+        return list(self.vector_store.list_collections())
+
+    def _get_collection(self, pdf_name: str, create: bool = False):
+        """
+        Get the collection holding the chunks of a document.
+
+        Args:
+            pdf_name: Name of the PDF
+            create: Create the collection if the document has none yet
+
+        Returns:
+            The vector store collection, or None if it does not exist and create is False
+        """
+        with self._collections_lock:
+            collection = self._collections.get(pdf_name)
+            if collection is not None:
+                return collection
+
+            name = self._collection_name(pdf_name)
+            if create:
+                collection = self.vector_store.create_collection(
+                    name=name,
+                    metadata={"pdf_name": pdf_name, "description": "PDF document chunks for RAG"}
+                )
+            else:
+                collection = self.vector_store.get_collection(name)
+                if collection is None:
+                    return None
+
+            self._collections[pdf_name] = collection
+            return collection
 
     def clean_text(self, text: str) -> str:
         """Clean unnecessary spaces, tabs, and invisible characters."""
-        text = text.replace("\u200b", "")  # Remove Zero Width Space
-        text = re.sub(r"\n+", " ", text)  # Replace multiple newlines with space
-        text = re.sub(r"\t+", " ", text)  # Remove tabs
-        text = re.sub(r"\s{2,}", " ", text).strip()  # Remove multiple spaces
-        return text
+        return normalize_text(text)
 
     def tokenize_sentences(self, text: str, min_tokens: int = 300, max_tokens: int = 500) -> List[str]:
         """
@@ -97,51 +213,111 @@ class VectorService:
         Returns:
             List of text chunks
         """
-        try:
-            sentences = sent_tokenize(text)
-            chunks, current_chunk, current_token_count = [], [], 0
+        chunks = self.iter_chunks([(1, text)], min_tokens=min_tokens, max_tokens=max_tokens)
+        return [chunk.text for chunk in chunks]
 
-            for sentence in sentences:
-                token_count = len(sentence.split())
+    def iter_chunks(self, pages: Iterable[Tuple[int, str]], min_tokens: Optional[int] = None,
+                    max_tokens: Optional[int] = None) -> Iterator[Chunk]:
+        """
+        Lazily split a stream of raw page texts into chunks, counting tokens with the embedding model's tokenizer.
 
-                if current_token_count + token_count > max_tokens:
-                    if current_token_count >= min_tokens:
-                        chunks.append(" ".join(current_chunk))
-                    current_chunk, current_token_count = [sentence], token_count
-                else:
-                    current_chunk.append(sentence)
-                    current_token_count += token_count
+        Args:
+            pages: (page number, raw page text) tuples, in document order
+            min_tokens: Minimum tokens per chunk, defaults to CHUNK_MIN_TOKENS
+            max_tokens: Maximum tokens per chunk, defaults to CHUNK_MAX_TOKENS
 
-            if current_chunk:
-                chunks.append(" ".join(current_chunk))
+        Yields:
+            Chunks with their page range, as soon as they are complete
+        """
+        return self._make_chunker(min_tokens, max_tokens).iter_chunks(pages)
+
+    def _make_chunker(self, min_tokens: Optional[int] = None, max_tokens: Optional[int] = None) -> TextChunker:
+        # Bounds go through the constructor, which derives the overlap limit from them
+        bounds = {"min_tokens": min_tokens, "max_tokens": max_tokens}
+        return TextChunker(
+            count_tokens=self._get_token_counter(),
+            **{name: value for name, value in bounds.items() if value is not None}
+        )
+
+    def _get_token_counter(self):
+        """Batch token counter backed by the embedding model's tokenizer, or word counts without one"""
+        tokenizer = getattr(self.embedding_model, "tokenizer", None)
+        if tokenizer is None:
+            return count_words
+
+        def count_tokens(texts: List[str]) -> List[int]:
+            encoded = tokenizer(texts, add_special_tokens=False, return_attention_mask=False,
+                                return_token_type_ids=False, verbose=False)
+            return [len(input_ids) for input_ids in encoded["input_ids"]]
+        return count_tokens
+
+    def get_text_embedding(self, text: str) -> np.ndarray:
+        """
+        Generate embeddings for the given text using SentenceTransformer.
 
-            return chunks
+        Args:
+            text: Input text to embed
 
+        Returns:
+            float32 embedding vector
+        """
+        try:
+            return self.get_text_embeddings([text])[0]
         except Exception as e:
             raise e
 
-    def get_text_embedding(self, text: str) -> List[float]:
+    def get_text_embeddings(self, texts: List[str], use_cache: bool = True) -> np.ndarray:
         """
-        Generate embeddings for the given text using SentenceTransformer.
+        Generate embeddings for a batch of texts; texts found in the embedding cache
+        skip the model and the rest are encoded in a single encode call.
 
         Args:
-            text: Input text to embed
+            texts: Input texts to embed
+            use_cache: Look up and store the vectors in the embedding cache. Ingestion turns it off,
+                its chunks are embedded once and would only evict the cached query vectors
 
         Returns:
-            List of embedding values
+            float32 array with one embedding row per input text
         """
         try:
-            embedding = self.embedding_model.encode(text, convert_to_tensor=False)
-            return embedding.tolist()
+            model_id = f"{EMBEDDING_MODEL}:{EMBEDDING_BACKEND}"
+            keys = [EMBEDDING_CACHE.make_key(text, model_id) for text in texts] if use_cache else []
+            embeddings = [EMBEDDING_CACHE.get(key) for key in keys] if use_cache else [None] * len(texts)
+
+            missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+            if missing:
+                encoded = self.embedding_model.encode(
+                    [texts[i] for i in missing],
+                    batch_size=EMBEDDING_BATCH_SIZE,
+                    convert_to_numpy=True
+                )
+                for i, embedding in zip(missing, encoded):
+                    if use_cache:
+                        EMBEDDING_CACHE.put(keys[i], embedding)
+                    embeddings[i] = embedding
+
+            # Vectors stay NumPy arrays all the way into the vector store
+            if not embeddings:
+                return np.empty((0, 0), dtype=np.float32)
+            return np.stack(embeddings).astype(np.float32, copy=False)
         except Exception as e:
             raise e
 
-    def vectorize_nudge(self, pdf_data: PDFSuccessResponse) -> Dict[str, Any]:
+    def _get_write_batch_size(self) -> int:
+        """Largest write batch that fits both the configured size and the vector store's limit"""
+        try:
+            return min(VECTOR_WRITE_BATCH_SIZE, self.vector_store.max_batch_size() or VECTOR_WRITE_BATCH_SIZE)
+        except Exception:
+            return VECTOR_WRITE_BATCH_SIZE
+
+    def vectorize_nudge(self, pdf_data: PDFSuccessResponse,
+                        progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, Any]:
         """
-        Process PDF files and store them as vectors in ChromaDB.
+        Process PDF files and store them as vectors in the vector store.
 
         Args:
-            pdf_data: Dictionary containing 'pdf_name' and 'total_pages'
+            pdf_data: Dictionary containing 'pdf_name', 'total_pages' and 'document_hash'
+            progress: Optional callback receiving (chunks embedded, chunks to embed)
 
         Returns:
             Dict with processing results
@@ -149,6 +325,25 @@ class VectorService:
         try:
             pdf_name = pdf_data.pdf_filename
             total_pages = pdf_data.total_pages
+            document_hash = pdf_data.document_hash
+
+            # Skip re-embedding entirely when this exact document is already indexed
+            indexed_chunks = self._get_indexed_chunk_count(pdf_name, document_hash)
+            if indexed_chunks:
+                if progress:
+                    progress(0, 0)
+                return {
+                    "status": "success",
+                    "pdf_name": pdf_name,
+                    "total_pages": total_pages,
+                    "chunks_created": indexed_chunks,
+                    "chunks_stored": 0,
+                    "chunks_unchanged": indexed_chunks,
+                    "chunks_deleted": 0,
+                    "failed_batches": [],
+                    "already_indexed": True,
+                    "persistence_mode": "persistent" if self.persist_db else "in-memory"
+                }
 
             # Find PDF directory
             pdf_dir = os.path.join(self.utils_dir, pdf_name)
@@ -156,18 +351,28 @@ class VectorService:
             if not os.path.exists(pdf_dir):
                 raise FileNotFoundError(f"PDF directory not found: {pdf_dir}")
 
-            # Read all part files and combine content
-            pdf_content = self._read_all_pdf_parts(pdf_dir)
-
-            if not pdf_content.strip():
-                raise ValueError(f"No content found in PDF directory: {pdf_dir}")
+            # The same file bytes uploaded under another name reuse its vectors instead of being embedded again
+            source_name = self._find_indexed_copy(pdf_name, document_hash)
+            if source_name:
+                result = self._copy_indexed_chunks(source_name, pdf_name, total_pages, document_hash)
+                if progress:
+                    progress(0, 0)
+            else:
+                # Stream the pages of the part files into the chunker one at a time
+                pdf_pages = self._iter_pdf_pages(pdf_dir)
+
+                # Process and store in the vector store
+                result = self._process_and_store_chunks(
+                    pdf_pages=pdf_pages,
+                    pdf_name=pdf_name,
+                    total_pages=total_pages,
+                    document_hash=document_hash,
+                    progress=progress
+                )
 
-            # Process and store in ChromaDB
-            result = self._process_and_store_chunks(
-                pdf_content=pdf_content,
-                pdf_name=pdf_name,
-                total_pages=total_pages
-            )
+            # Cached chat answers may rely on chunks that just changed
+            if ANSWER_CACHE:
+                ANSWER_CACHE.invalidate(pdf_name)
 
             return {
                 "status": "success",
@@ -175,6 +380,11 @@ class VectorService:
                 "total_pages": total_pages,
                 "chunks_created": result['chunks_created'],
                 "chunks_stored": result['chunks_stored'],
+                "chunks_unchanged": result['chunks_unchanged'],
+                "chunks_deleted": result['chunks_deleted'],
+                "failed_batches": result['failed_batches'],
+                "already_indexed": False,
+                "copied_from": source_name,
                 "persistence_mode": "persistent" if self.persist_db else "in-memory"
             }
 
@@ -185,137 +395,504 @@ class VectorService:
                 "pdf_name": pdf_data.pdf_filename
             }
 
-    def _read_all_pdf_parts(self, pdf_dir: str) -> str:
+    def _get_indexed_chunk_count(self, pdf_name: str, document_hash: str) -> int:
         """
-        Read all part files in the PDF directory and combine them.
+        Count the stored chunks of a document version, provided the version is completely indexed.
 
         Args:
-            pdf_dir: Path to PDF directory containing part files
+            pdf_name: Name of the PDF
+            document_hash: SHA-256 of the PDF file bytes
 
         Returns:
-            Combined text content from all parts
+            Number of stored chunks, or 0 if the document is missing or only partially stored
         """
-        try:
-            # Get all part files
-            part_files = [f for f in os.listdir(pdf_dir) if f.startswith('part_') and f.endswith('.txt')]
-            part_files.sort()  # Ensure proper order
+        collection = self._get_collection(pdf_name)
+        if collection is None:
+            return 0
+
+        existing = collection.get(where={"document_hash": document_hash}, include=["metadatas"])
+        if not existing["ids"]:
+            return 0
 
-            if not part_files:
-                raise ValueError(f"No part files found in directory: {pdf_dir}")
+        total_chunks = existing["metadatas"][0]["total_chunks"]
+        return total_chunks if len(existing["ids"]) == total_chunks else 0
 
-            pdf_content = ""
+    def _find_indexed_copy(self, pdf_name: str, document_hash: str) -> Optional[str]:
+        """
+        Find another document completely indexed from the same file bytes. The page offset index
+        next to each document's part files records its hash, so no collection is loaded to search.
 
-            # Read each part file
-            for part_file in part_files:
-                part_path = os.path.join(pdf_dir, part_file)
+        Args:
+            pdf_name: Name of the PDF being indexed
+            document_hash: SHA-256 of the PDF file bytes
 
-                with open(part_path, 'r', encoding='utf-8') as f:
-                    part_content = f.read()
+        Returns:
+            Name of the indexed copy, or None if there is none
+        """
+        for other_name in sorted(os.listdir(self.utils_dir)):
+            if other_name == pdf_name:
+                continue
+            try:
+                offset_index = self._load_offset_index(other_name)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Error reading the page offset index of {other_name}: {str(e)}")
+                continue
+            if offset_index and offset_index.get("document_hash") == document_hash \
+                    and self._get_indexed_chunk_count(other_name, document_hash):
+                return other_name
+        return None
+
+    def _copy_indexed_chunks(self, source_name: str, pdf_name: str, total_pages: int,
+                             document_hash: str) -> Dict[str, Any]:
+        """
+        Index a document by copying the stored chunks and vectors of an identical one.
 
-                # Clean and add to combined content
-                cleaned_content = self.clean_text(part_content)
-                pdf_content += f"{cleaned_content}\n\n"
+        Args:
+            source_name: Name of the completely indexed PDF with the same file bytes
+            pdf_name: Name of the PDF to index
+            total_pages: Total number of pages in PDF
+            document_hash: SHA-256 of the PDF file bytes
 
-            return pdf_content.strip()
+        Returns:
+            Dictionary with processing statistics, as returned by _process_and_store_chunks
+        """
+        try:
+            source = self._get_collection(source_name).get(
+                where={"document_hash": document_hash}, include=["documents", "metadatas", "embeddings"]
+            )
+            order = sorted(range(len(source["ids"])), key=lambda i: source["metadatas"][i]["chunk_num"])
+            documents = [source["documents"][i] for i in order]
+            embeddings = np.asarray(source["embeddings"], dtype=np.float32)[order]
+            chunk_ids = [self._make_chunk_id(pdf_name, document) for document in documents]
+
+            collection = self._get_collection(pdf_name, create=True)
+            manifest = self._load_chunk_manifest(pdf_name)
+            created_at = datetime.now(timezone.utc).timestamp()
+            metadatas = []
+            for chunk_id, i in zip(chunk_ids, order):
+                metadata = source["metadatas"][i]
+                previous = manifest.get(chunk_id)
+                metadatas.append({
+                    **metadata,
+                    "pdf_name": pdf_name,
+                    "pdf_len": total_pages,
+                    "chunk_id": f"{pdf_name}_chunk_{metadata['chunk_num']:03d}",
+                    "created_at": previous["created_at"] if previous else created_at
+                })
+
+            batch_size = self._get_write_batch_size()
+            copied_ids = set(chunk_ids)
+            removed_ids = [chunk_id for chunk_id in manifest if chunk_id not in copied_ids]
+            with self.vector_store.batch_writes(collection):
+                for start in range(0, len(chunk_ids), batch_size):
+                    collection.upsert(
+                        ids=chunk_ids[start:start + batch_size],
+                        embeddings=embeddings[start:start + batch_size],
+                        documents=documents[start:start + batch_size],
+                        metadatas=metadatas[start:start + batch_size]
+                    )
+                for start in range(0, len(removed_ids), batch_size):
+                    collection.delete(ids=removed_ids[start:start + batch_size])
+
+            self.lexical_index.build(pdf_name, collection.name, chunk_ids, documents)
+            # Identical bytes extract to identical pages, so the page offsets carry over
+            shutil.copyfile(
+                os.path.join(self.utils_dir, source_name, "page_offsets.json"),
+                os.path.join(self.utils_dir, pdf_name, "page_offsets.json")
+            )
+            logger.info(f"Indexed {pdf_name} with the {len(chunk_ids)} stored chunks of its copy {source_name}")
+
+            return {
+                "chunks_created": len(chunk_ids),
+                "chunks_stored": len([chunk_id for chunk_id in chunk_ids if chunk_id not in manifest]),
+                "chunks_unchanged": len([chunk_id for chunk_id in chunk_ids if chunk_id in manifest]),
+                "chunks_deleted": len(removed_ids),
+                "failed_batches": []
+            }
 
         except Exception as e:
             raise e
 
-    def _process_and_store_chunks(self, pdf_content: str, pdf_name: str, total_pages: int) -> Dict[str, int]:
+    def iter_extracted_pages(self, pdf_name: str) -> Optional[Iterator[Tuple[int, str]]]:
         """
-        Process PDF content into chunks and store in ChromaDB.
+        The extracted pages of a PDF, e.g. for the offline benchmarks in benchmark.py.
 
         Args:
-            pdf_content: Combined text content from all PDF parts
             pdf_name: Name of the PDF
-            total_pages: Total number of pages in PDF
 
         Returns:
-            Dictionary with processing statistics
+            Lazy iterator of (page number, raw page text) tuples, or None if the PDF was not extracted
         """
-        try:
-            # Create chunks from the content
-            chunks = self.tokenize_sentences(pdf_content)
+        pdf_dir = os.path.join(self.utils_dir, pdf_name)
+        if not os.path.isdir(pdf_dir):
+            return None
+        return self._iter_pdf_pages(pdf_dir)
+
+    def _iter_pdf_pages(self, pdf_dir: str) -> Iterator[Tuple[int, str]]:
+        """
+        Lazily read the part files in the PDF directory, one part at a time, and split them into pages.
+
+        Args:
+            pdf_dir: Path to PDF directory containing part files
+
+        Yields:
+            (page number, raw page text) tuples, in page order
+        """
+        # Get all part files
+        part_files = [f for f in os.listdir(pdf_dir) if f.startswith('part_') and f.endswith('.txt')]
+        part_files.sort(key=lambda f: int(os.path.splitext(f)[0].split('_')[1]))  # Ensure numeric part order
+
+        if not part_files:
+            raise ValueError(f"No part files found in directory: {pdf_dir}")
 
-            if not chunks:
-                raise ValueError("No chunks were created from the PDF content")
+        # Read each part file
+        for part_file in part_files:
+            part_path = os.path.join(pdf_dir, part_file)
 
-            chunks_stored = 0
+            with open(part_path, 'r', encoding='utf-8') as f:
+                part_content = f.read()
 
-            # Process each chunk
-            for chunk_num, chunk_text in enumerate(chunks, 1):
+            yield from split_pages(part_content)
+
+    def _process_and_store_chunks(self, pdf_pages: Iterable[Tuple[int, str]], pdf_name: str, total_pages: int,
+                                  document_hash: str,
+                                  progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Dict[str, Any]:
+        """
+        Process PDF content into chunks and incrementally sync them with the vector store.
+        Chunks are embedded batch by batch while the chunker is still reading pages.
+        Only new or changed chunks are embedded, chunks that disappeared are deleted
+        and unchanged chunks only get their metadata refreshed.
+
+        Args:
+            pdf_pages: (page number, raw page text) tuples, in document order
+            pdf_name: Name of the PDF
+            total_pages: Total number of pages in PDF
+            document_hash: SHA-256 of the PDF file bytes
+            progress: Optional callback receiving (chunks embedded, chunks to embed), the total is None
+                until the whole document is chunked
+
+        Returns:
+            Dictionary with processing statistics
+        """
+        try:
+            collection = self._get_collection(pdf_name, create=True)
+            manifest = self._load_chunk_manifest(pdf_name)
+            created_at = datetime.now(timezone.utc).timestamp()
+            batch_size = self._get_write_batch_size()
+
+            # Content-addressed IDs: an unchanged chunk keeps its ID across document versions
+            chunks_by_id: Dict[str, Chunk] = {}
+            pending, stored_ids = [], set()
+            new_chunk_count = 0
+            failed_batches = []
+
+            def metadata_for(chunk_id: str, chunk_num: int, total_chunks: int) -> Dict[str, Any]:
+                previous = manifest.get(chunk_id)
+                return {
+                    "pdf_name": pdf_name,
+                    "pdf_len": total_pages,
+                    "chunk_num": chunk_num,
+                    "total_chunks": total_chunks,
+                    "chunk_id": f"{pdf_name}_chunk_{chunk_num:03d}",
+                    "document_hash": document_hash,
+                    "created_at": previous["created_at"] if previous else created_at,
+                    "content_length": len(chunks_by_id[chunk_id].text),
+                    "start_page": chunks_by_id[chunk_id].start_page,
+                    "end_page": chunks_by_id[chunk_id].end_page,
+                    "start_char": chunks_by_id[chunk_id].start_char,
+                    "end_char": chunks_by_id[chunk_id].end_char,
+                    "source": "pdf_vectorization"
+                }
+
+            def store_pending(total: Optional[int]):
+                # One encode call and one bulk write per batch
+                batch = pending[:]
+                pending.clear()
                 try:
-                    # Generate embedding for the chunk
-                    embedding = self.get_text_embedding(chunk_text)
-
-                    # Creating metadata
-                    metadata = {
-                        "pdf_name": pdf_name,
-                        "pdf_len": total_pages,
-                        "chunk_num": chunk_num,
-                        "total_chunks": len(chunks),
-                        "chunk_id": f"{pdf_name}_chunk_{chunk_num:03d}",
-                        "created_at": datetime.now(timezone.utc).timestamp(),
-                        "content_length": len(chunk_text),
-                        "source": "pdf_vectorization"
-                    }
-
-                    # Generate unique ID for this chunk
-                    chunk_id = f"{pdf_name}_{chunk_num:03d}_{str(uuid.uuid4())[:8]}"
-
-                    # Store in ChromaDB
-                    self.collection.add(
-                        documents=[chunk_text],
-                        embeddings=[embedding],
-                        metadatas=[metadata],
-                        ids=[chunk_id]
+                    collection.upsert(
+                        documents=[chunks_by_id[chunk_id].text for chunk_id, _ in batch],
+                        embeddings=self.get_text_embeddings(
+                            [chunks_by_id[chunk_id].text for chunk_id, _ in batch], use_cache=False
+                        ),
+                        # total_chunks stays 0 until the document is complete, so a partial index is never reused
+                        metadatas=[metadata_for(chunk_id, chunk_num, 0) for chunk_id, chunk_num in batch],
+                        ids=[chunk_id for chunk_id, _ in batch]
+                    )
+                    stored_ids.update(chunk_id for chunk_id, _ in batch)
+
+                except Exception as e:
+                    first_chunk, last_chunk = batch[0][1], batch[-1][1]
+                    logger.error(f"Error storing chunks {first_chunk}-{last_chunk} of {pdf_name}: {str(e)}")
+                    failed_batches.append({
+                        "first_chunk": first_chunk,
+                        "last_chunk": last_chunk,
+                        "error": str(e)
+                    })
+
+                if progress:
+                    progress(new_chunk_count, total)
+
+            # The writes of this sync reach the disk of a local store once, at the end
+            with self.vector_store.batch_writes(collection):
+                # Embed new or changed chunks as soon as a batch of them is ready
+                chunker = self._make_chunker()
+                for chunk in chunker.iter_chunks(pdf_pages):
+                    chunk_id = self._make_chunk_id(pdf_name, chunk.text)
+                    if chunk_id in chunks_by_id:
+                        continue
+                    chunks_by_id[chunk_id] = chunk
+                    if chunk_id not in manifest:
+                        new_chunk_count += 1
+                        pending.append((chunk_id, len(chunks_by_id)))
+                        if len(pending) >= batch_size:
+                            store_pending(None)
+
+                if not chunks_by_id:
+                    raise ValueError("No chunks were created from the PDF content")
+                if pending:
+                    store_pending(new_chunk_count)
+                elif progress:
+                    progress(new_chunk_count, new_chunk_count)
+
+                total_chunks = len(chunks_by_id)
+                kept_ids = [chunk_id for chunk_id in chunks_by_id if chunk_id in manifest]
+
+                # Final positions and the document version: unchanged chunks keep their vectors,
+                # only their metadata is refreshed, and new chunks are marked complete
+                final_ids = [chunk_id for chunk_id in chunks_by_id if chunk_id in stored_ids or chunk_id in manifest]
+                chunk_nums = {chunk_id: chunk_num for chunk_num, chunk_id in enumerate(chunks_by_id, 1)}
+                for start in range(0, len(final_ids), batch_size):
+                    batch = final_ids[start:start + batch_size]
+                    collection.update(
+                        ids=batch,
+                        metadatas=[metadata_for(chunk_id, chunk_nums[chunk_id], total_chunks) for chunk_id in batch]
                     )
 
-                    chunks_stored += 1
+                # Drop vectors of chunks that no longer exist in the document
+                removed_ids = [chunk_id for chunk_id in manifest if chunk_id not in chunks_by_id]
+                for start in range(0, len(removed_ids), batch_size):
+                    collection.delete(ids=removed_ids[start:start + batch_size])
 
-                except Exception:
-                    continue
+            # The BM25 index is rebuilt from the full chunk list, which is cheap next to embedding
+            self.lexical_index.build(
+                pdf_name, collection.name, list(chunks_by_id), [chunk.text for chunk in chunks_by_id.values()]
+            )
+            self._save_offset_index(pdf_name, document_hash, chunker)
 
             return {
-                "chunks_created": len(chunks),
-                "chunks_stored": chunks_stored
+                "chunks_created": total_chunks,
+                "chunks_stored": len(stored_ids),
+                "chunks_unchanged": len(kept_ids),
+                "chunks_deleted": len(removed_ids),
+                "failed_batches": failed_batches
             }
 
         except Exception as e:
             raise e
 
-    def semantic_search(self, query: str, pdf_name: Optional[str] = None, top_k: int = 5) -> Dict[str, Any]:
+    def _load_chunk_manifest(self, pdf_name: str) -> Dict[str, Dict[str, Any]]:
+        """
+        Load the chunks currently indexed for a PDF.
+
+        Args:
+            pdf_name: Name of the PDF
+
+        Returns:
+            Mapping of chunk ID (derived from the chunk content hash) to its stored metadata
+        """
+        collection = self._get_collection(pdf_name)
+        if collection is None:
+            return {}
+
+        existing = collection.get(include=["metadatas"])
+        return dict(zip(existing["ids"], existing["metadatas"]))
+
+    @staticmethod
+    def _make_chunk_id(pdf_name: str, chunk_text: str) -> str:
+        """Deterministic chunk ID from the PDF name and a hash of the chunk content"""
+        chunk_hash = hashlib.sha256(chunk_text.encode("utf-8")).hexdigest()
+        return f"{pdf_name}_{chunk_hash[:16]}"
+
+    def _save_offset_index(self, pdf_name: str, document_hash: str, chunker: TextChunker):
         """
-        Search for similar chunks in the vector database.
+        Store where each page starts in the normalized document text, next to the part files.
+
+        Args:
+            pdf_name: Name of the PDF
+            document_hash: SHA-256 of the PDF file bytes
+            chunker: Chunker that just processed the document
+        """
+        # Pages split across part files appear once per part, only the first start is kept
+        page_starts = []
+        for page_num, offset in chunker.page_starts:
+            if not page_starts or page_starts[-1][0] != page_num:
+                page_starts.append([page_num, offset])
+
+        offset_index = {
+            "document_hash": document_hash,
+            "document_length": chunker.document_length,
+            "page_starts": page_starts
+        }
+        with open(os.path.join(self.utils_dir, pdf_name, "page_offsets.json"), 'w', encoding='utf-8') as f:
+            json.dump(offset_index, f, separators=(",", ":"))
+
+    def _load_offset_index(self, pdf_name: str) -> Optional[Dict[str, Any]]:
+        """The page offset index of a document, or None if it was indexed by an earlier version"""
+        path = os.path.join(self.utils_dir, pdf_name, "page_offsets.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    @staticmethod
+    def make_citation(chunk_id: str, metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Page-range citation of a chunk.
+
+        Args:
+            chunk_id: ID of the chunk
+            metadata: Stored metadata of the chunk
+
+        Returns:
+            Citation with start/end page and a label such as "p. 4" or "pp. 4-5"
+        """
+        start_page, end_page = metadata.get("start_page"), metadata.get("end_page")
+        if start_page is None:
+            # Chunks indexed before page tracking only know their position
+            label = f"chunk {metadata.get('chunk_num')}"
+        elif start_page == end_page:
+            label = f"p. {start_page}"
+        else:
+            label = f"pp. {start_page}-{end_page}"
+        return {"chunk_id": chunk_id, "start_page": start_page, "end_page": end_page, "label": label}
+
+    def get_chunk_source(self, pdf_name: str, chunk_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Exact source span of a chunk, located through the offset index without reading the part files.
+
+        Args:
+            pdf_name: Name of the PDF
+            chunk_id: ID of the chunk
+
+        Returns:
+            Chunk text with its page range and the character offsets within its first and last page,
+            or None if the chunk does not exist
+        """
+        collection = self._get_collection(pdf_name)
+        if collection is None:
+            return None
+        stored = collection.get(ids=[chunk_id], include=["documents", "metadatas"])
+        if not stored["ids"]:
+            return None
+
+        metadata = stored["metadatas"][0]
+        source = {
+            "pdf_name": pdf_name,
+            "text": stored["documents"][0],
+            **self.make_citation(chunk_id, metadata),
+            "start_char": metadata.get("start_char"),
+            "end_char": metadata.get("end_char"),
+            "start_offset_in_page": None,
+            "end_offset_in_page": None
+        }
+
+        offset_index = self._load_offset_index(pdf_name)
+        if offset_index and source["start_page"] is not None \
+                and offset_index["document_hash"] == metadata.get("document_hash"):
+            page_offsets = dict((page_num, offset) for page_num, offset in offset_index["page_starts"])
+            source["start_offset_in_page"] = source["start_char"] - page_offsets[source["start_page"]]
+            source["end_offset_in_page"] = source["end_char"] - page_offsets[source["end_page"]]
+        return source
+
+    def get_stored_chunks(self, pdf_name: str,
+                          include: Tuple[str, ...] = ("documents", "metadatas")) -> Optional[Dict[str, Any]]:
+        """
+        Every stored chunk of a document, e.g. for the offline benchmarks in benchmark.py.
+
+        Args:
+            pdf_name: Name of the PDF
+            include: Stored fields to return, any of "documents", "metadatas" and "embeddings"
+
+        Returns:
+            The chunk IDs with the requested fields in the same order, embeddings as a float32 array,
+            or None if the document is not indexed
+        """
+        collection = self._get_collection(pdf_name)
+        if collection is None:
+            return None
+
+        stored = collection.get(include=list(include))
+        if "embeddings" in include:
+            stored["embeddings"] = np.asarray(stored["embeddings"], dtype=np.float32)
+        return stored
+
+    def semantic_search(self, query: str, pdf_name: str, top_k: int = 5,
+                        mode: Optional[str] = None, rerank: Optional[bool] = None) -> Dict[str, Any]:
+        """
+        Search for similar chunks within one document.
 
         Args:
             query: Search query text
-            pdf_name: Optional PDF name to filter results
+            pdf_name: PDF whose chunks are searched
             top_k: Number of results to return
+            mode: "hybrid" or "dense", defaults to RETRIEVAL_MODE
+            rerank: Re-rank a larger candidate pool with the cross-encoder, defaults to RERANK_ENABLED
 
         Returns:
-            Dictionary with search results
+            Dictionary with search results, ranked best first. Chunks found only by BM25 have no distance.
         """
         try:
+            mode = mode or RETRIEVAL_MODE
+            collection = self._get_collection(pdf_name)
+            chunk_count = collection.count() if collection is not None else 0
+            if not chunk_count:
+                return {
+                    "success": True,
+                    "query": query,
+                    "mode": mode,
+                    "results": {"ids": [[]], "documents": [[]], "metadatas": [[]], "distances": [[]]},
+                    "citations": [],
+                    "count": 0
+                }
+
+            rerank = RERANK_ENABLED if rerank is None else rerank
+            # Re-ranking starts from a larger pool, sized to what fits its latency budget
+            fetch_k = RERANKER.candidate_pool(top_k) if rerank else top_k
+
+            lexical_future = None
+            if mode == "hybrid":
+                lexical_future = _LEXICAL_SEARCH_EXECUTOR.submit(
+                    self._lexical_search, pdf_name, collection, query, max(HYBRID_CANDIDATES, fetch_k)
+                )
+
             # Generate embedding for the query
             query_embedding = self.get_text_embedding(query)
 
-            where_clause = None
-            if pdf_name:
-                where_clause = {"pdf_name": pdf_name}
-
-            # Search in ChromaDB
-            results = self.collection.query(
-                query_embeddings=[query_embedding],
-                n_results=top_k,
-                where=where_clause,
+            # Search only the collection of the document
+            results = collection.query(
+                query_embeddings=query_embedding[None, :],
+                n_results=min(max(fetch_k, HYBRID_CANDIDATES) if lexical_future else fetch_k, chunk_count),
                 include=["documents", "metadatas", "distances"]
             )
 
+            dense_results = results
+            if lexical_future:
+                results = self._fuse_results(collection, results, lexical_future.result(), fetch_k)
+
+            rerank_report = None
+            if rerank:
+                results, rerank_report = RERANKER.rerank(query, results, top_k, dense_results=dense_results)
+
             return {
                 "success": True,
                 "query": query,
+                "mode": mode,
                 "results": results,
+                "rerank": rerank_report,
+                "citations": [
+                    self.make_citation(chunk_id, metadata)
+                    for chunk_id, metadata in zip(results["ids"][0], results["metadatas"][0])
+                ],
                 "count": len(results['documents'][0]) if results['documents'] else 0
             }
 
@@ -324,4 +901,177 @@ class VectorService:
                 "success": False,
                 "error": str(e),
                 "query": query
-            }
\ No newline at end of file
+            }
+
+    def _lexical_search(self, pdf_name: str, collection, query: str, top_k: int) -> List[str]:
+        """
+        Rank the chunks of a document with BM25, building the index from the stored chunks if it is missing.
+
+        Returns:
+            Chunk IDs, best first
+        """
+        index = self.lexical_index.get(pdf_name, collection.name)
+        if index is None:
+            stored = collection.get(include=["documents"])
+            index = self.lexical_index.build(pdf_name, collection.name, stored["ids"], stored["documents"])
+        return [chunk_id for chunk_id, _ in index.search(query, top_k)]
+
+    @staticmethod
+    def _fuse_results(collection, dense_results: Dict[str, Any], lexical_ids: List[str],
+                      top_k: int) -> Dict[str, Any]:
+        """
+        Merge dense and BM25 rankings with weighted reciprocal rank fusion.
+
+        Args:
+            collection: Collection of the document, to fetch chunks only BM25 found
+            dense_results: ChromaDB query result of the dense search
+            lexical_ids: Chunk IDs ranked by BM25
+            top_k: Number of results to return
+
+        Returns:
+            Fused results in the ChromaDB query result layout, plus "rrf_scores"
+        """
+        chunks = {
+            chunk_id: (document, metadata, distance)
+            for chunk_id, document, metadata, distance in zip(
+                dense_results["ids"][0], dense_results["documents"][0],
+                dense_results["metadatas"][0], dense_results["distances"][0]
+            )
+        }
+
+        scores: Dict[str, float] = {}
+        for weight, ranking in ((HYBRID_DENSE_WEIGHT, dense_results["ids"][0]), (HYBRID_LEXICAL_WEIGHT, lexical_ids)):
+            for rank, chunk_id in enumerate(ranking, 1):
+                scores[chunk_id] = scores.get(chunk_id, 0.0) + weight / (HYBRID_RRF_K + rank)
+
+        fused_ids = sorted(scores, key=scores.get, reverse=True)[:top_k]
+
+        missing_ids = [chunk_id for chunk_id in fused_ids if chunk_id not in chunks]
+        if missing_ids:
+            stored = collection.get(ids=missing_ids, include=["documents", "metadatas"])
+            for chunk_id, document, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+                chunks[chunk_id] = (document, metadata, None)
+            # A BM25 hit whose vector write failed has nothing to return
+            fused_ids = [chunk_id for chunk_id in fused_ids if chunk_id in chunks]
+
+        return {
+            "ids": [fused_ids],
+            "documents": [[chunks[chunk_id][0] for chunk_id in fused_ids]],
+            "metadatas": [[chunks[chunk_id][1] for chunk_id in fused_ids]],
+            "distances": [[chunks[chunk_id][2] for chunk_id in fused_ids]],
+            "rrf_scores": [[round(scores[chunk_id], 6) for chunk_id in fused_ids]]
+        }
+
+    def list_documents(self) -> List[Dict[str, Any]]:
+        """
+        Summarize every indexed document.
+
+        Returns:
+            Stats of each document, see document_stats
+        """
+        documents = []
+        for pdf_name in self.list_document_names():
+            documents.append(self.document_stats(pdf_name))
+        return [stats for stats in documents if stats]
+
+    def list_document_names(self) -> List[str]:
+        """Names of the PDFs that have a collection"""
+        return [
+            metadata["pdf_name"] for name, metadata in self.vector_store.list_collections().items()
+            if name.startswith(DOCUMENT_COLLECTION_PREFIX) and name != LEGACY_COLLECTION_NAME
+            and metadata.get("pdf_name")
+        ]
+
+    def document_stats(self, pdf_name: str) -> Optional[Dict[str, Any]]:
+        """
+        Index statistics of one document.
+
+        Args:
+            pdf_name: Name of the PDF
+
+        Returns:
+            Chunk count, indexed document version and content size, or None if the document is not indexed
+        """
+        collection = self._get_collection(pdf_name)
+        if collection is None:
+            return None
+
+        metadatas = collection.get(include=["metadatas"])["metadatas"]
+        document_hashes = sorted({metadata.get("document_hash") for metadata in metadatas} - {None})
+        return {
+            "pdf_name": pdf_name,
+            "chunk_count": len(metadatas),
+            "total_pages": metadatas[0].get("pdf_len") if metadatas else None,
+            "document_hash": document_hashes[0] if len(document_hashes) == 1 else None,
+            "fully_indexed": bool(metadatas) and len(metadatas) == metadatas[0].get("total_chunks"),
+            "content_length": sum(metadata.get("content_length", 0) for metadata in metadatas),
+            "indexed_at": max((metadata.get("created_at", 0) for metadata in metadatas), default=None),
+            "collection": collection.name,
+            "index": {
+                "backend": self.vector_store.backend,
+                **self.vector_store.collection_stats(collection)
+            }
+        }
+
+    def rebuild_index(self, pdf_name: str, params: Optional[HnswParams] = None) -> Optional[Dict[str, Any]]:
+        """
+        Rebuild the vector index of a document, e.g. with new HNSW settings or to compact
+        the slots left by deleted chunks. Meant for offline use, see rebuild_index.py.
+
+        Args:
+            pdf_name: Name of the PDF
+            params: HNSW settings of the rebuilt index, defaults to the configured ones
+
+        Returns:
+            Rebuild statistics, or None if the document is not indexed
+        """
+        collection = self._get_collection(pdf_name)
+        if collection is None:
+            return None
+
+        with self._collections_lock:
+            result = self.vector_store.rebuild_collection(collection.name, params)
+            # The ChromaDB backend replaces the collection, so the cached handle is stale
+            self._collections.pop(pdf_name, None)
+        return {"pdf_name": pdf_name, **result}
+
+    def drop_legacy_collection(self) -> Optional[int]:
+        """
+        Delete the shared collection of earlier versions. Its documents are not migrated: their chunks
+        lack the per-document metadata, so they are re-indexed on their next upload instead.
+        Meant for offline use, see rebuild_index.py.
+
+        Returns:
+            Number of chunks dropped, or None if there is no legacy collection
+        """
+        collection = self.vector_store.get_collection(LEGACY_COLLECTION_NAME)
+        if collection is None:
+            return None
+
+        chunk_count = collection.count()
+        self.vector_store.delete_collection(LEGACY_COLLECTION_NAME)
+        logger.info(f"Dropped the legacy '{LEGACY_COLLECTION_NAME}' collection with {chunk_count} chunks")
+        return chunk_count
+
+    def delete_document(self, pdf_name: str) -> bool:
+        """
+        Drop the collection of a document together with its cached chat answers.
+
+        Args:
+            pdf_name: Name of the PDF
+
+        Returns:
+            True if the document was indexed
+        """
+        collection = self._get_collection(pdf_name)
+        if collection is None:
+            return False
+
+        with self._collections_lock:
+            self.vector_store.delete_collection(collection.name)
+            self._collections.pop(pdf_name, None)
+        self.lexical_index.delete(pdf_name, collection.name)
+
+        if ANSWER_CACHE:
+            ANSWER_CACHE.invalidate(pdf_name)
+        return True
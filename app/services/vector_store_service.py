@@ -0,0 +1,870 @@
+import abc
+import contextlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+# chromadb and hnswlib are imported lazily, only the configured backend is ever loaded
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+VECTOR_STORE_BACKEND = os.getenv("VECTOR_STORE_BACKEND", "chroma").lower()  # "chroma", "hnswlib" or "flat"
+VECTOR_STORE_DIRECTORIES = {"chroma": "app/chroma_db", "hnswlib": "app/hnsw_index", "flat": "app/flat_index"}
+# hnswlib and flat: document indexes kept in RAM, the others load from disk when searched
+VECTOR_MAX_LOADED_COLLECTIONS = int(os.getenv("VECTOR_MAX_LOADED_COLLECTIONS", "32"))
+
+# flat: storage of the normalized vectors, "float32", "float16" or "int8" (scalar-quantized)
+VECTOR_STORAGE_DTYPE = os.getenv("VECTOR_STORAGE_DTYPE", "float16").lower()
+VECTOR_RESCORE = os.getenv("VECTOR_RESCORE", "false").lower() == "true"  # Re-score candidates at full precision
+VECTOR_RESCORE_FACTOR = int(os.getenv("VECTOR_RESCORE_FACTOR", "4"))  # Quantized candidates per result
+FLAT_SCAN_BLOCK_ROWS = 4096
+
+# HNSW settings of new collections; the defaults are ChromaDB's own, so existing behaviour is unchanged
+HNSW_SPACE = os.getenv("HNSW_SPACE", "l2").lower()  # "l2", "cosine" or "ip", fixed once a collection exists
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "100"))
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "10"))
+
+
+class HnswParams(NamedTuple):
+    """HNSW graph settings of a collection"""
+    space: str = HNSW_SPACE
+    m: int = HNSW_M
+    ef_construction: int = HNSW_EF_CONSTRUCTION
+    ef_search: int = HNSW_EF_SEARCH
+
+    def to_chroma_metadata(self) -> Dict[str, Any]:
+        return {
+            "hnsw:space": self.space,
+            "hnsw:M": self.m,
+            "hnsw:construction_ef": self.ef_construction,
+            "hnsw:search_ef": self.ef_search
+        }
+
+    @classmethod
+    def from_chroma_metadata(cls, metadata: Optional[Dict[str, Any]]) -> "HnswParams":
+        """Settings of a ChromaDB collection; collections created without them use ChromaDB's defaults"""
+        metadata = metadata or {}
+        return cls(
+            space=metadata.get("hnsw:space", "l2"),
+            m=metadata.get("hnsw:M", 16),
+            ef_construction=metadata.get("hnsw:construction_ef", 100),
+            ef_search=metadata.get("hnsw:search_ef", 10)
+        )
+
+
+class VectorStore(abc.ABC):
+    """
+    Named collections of chunk vectors. Collections expose the part of the ChromaDB Collection API
+    that VectorService uses: name, metadata, count, get, upsert, update, delete and query.
+    """
+
+    backend = ""
+
+    @abc.abstractmethod
+    def list_collections(self) -> Dict[str, Dict[str, Any]]:
+        """Metadata of every collection, by name"""
+
+    @abc.abstractmethod
+    def get_collection(self, name: str):
+        """The collection with this name, or None if it does not exist"""
+
+    @abc.abstractmethod
+    def create_collection(self, name: str, metadata: Dict[str, Any], params: Optional[HnswParams] = None):
+        """Get the collection with this name, creating it with the given HNSW settings if it does not exist"""
+
+    @abc.abstractmethod
+    def delete_collection(self, name: str):
+        """Drop a collection and its files"""
+
+    @abc.abstractmethod
+    def collection_params(self, collection) -> HnswParams:
+        """HNSW settings a collection was built with"""
+
+    def collection_stats(self, collection) -> Dict[str, Any]:
+        """Index settings and storage details of a collection"""
+        return self.collection_params(collection)._asdict()
+
+    @abc.abstractmethod
+    def rebuild_collection(self, name: str, params: Optional[HnswParams] = None) -> Dict[str, Any]:
+        """
+        Rebuild the index of a collection from its stored vectors, dropping the slots of deleted chunks.
+
+        Args:
+            name: Name of the collection
+            params: HNSW settings of the rebuilt index, defaults to the configured ones
+
+        Returns:
+            Chunk count, the new settings and the time the rebuild took
+        """
+
+    def max_batch_size(self) -> Optional[int]:
+        """Largest number of records accepted by one write, or None if there is no limit"""
+        return None
+
+    def batch_writes(self, collection) -> contextlib.AbstractContextManager:
+        """
+        Context in which a run of writes to a collection is persisted once, when it exits,
+        instead of after every upsert, update and delete. ChromaDB persists its own writes.
+
+        Args:
+            collection: Collection about to be written
+
+        Returns:
+            Context manager
+        """
+        return contextlib.nullcontext()
+
+
+class ChromaVectorStore(VectorStore):
+    """ChromaDB client, persistent or in-memory, with the HNSW settings passed as collection metadata"""
+
+    backend = "chroma"
+
+    def __init__(self, persist_directory: Optional[str] = None, params: Optional[HnswParams] = None):
+        import chromadb
+        from chromadb.config import Settings
+
+        self.params = params or HnswParams()
+        settings = Settings(anonymized_telemetry=False, allow_reset=True)
+        if persist_directory:
+            os.makedirs(persist_directory, exist_ok=True)
+            self.client = chromadb.PersistentClient(path=persist_directory, settings=settings)
+        else:
+            self.client = chromadb.EphemeralClient(settings=settings)
+
+    def list_collections(self) -> Dict[str, Dict[str, Any]]:
+        collections = {}
+        for collection in self.client.list_collections():
+            # ChromaDB returns either Collection objects or plain names depending on the version
+            if isinstance(collection, str):
+                collection = self.client.get_collection(name=collection)
+            collections[collection.name] = collection.metadata or {}
+        return collections
+
+    def get_collection(self, name: str):
+        names = [getattr(collection, "name", collection) for collection in self.client.list_collections()]
+        return self.client.get_collection(name=name) if name in names else None
+
+    def create_collection(self, name: str, metadata: Dict[str, Any], params: Optional[HnswParams] = None):
+        collection = self.get_collection(name)
+        if collection is not None:
+            return collection
+        return self.client.create_collection(
+            name=name, metadata={**metadata, **(params or self.params).to_chroma_metadata()}
+        )
+
+    def delete_collection(self, name: str):
+        self.client.delete_collection(name=name)
+
+    def collection_params(self, collection) -> HnswParams:
+        return HnswParams.from_chroma_metadata(collection.metadata)
+
+    def rebuild_collection(self, name: str, params: Optional[HnswParams] = None) -> Dict[str, Any]:
+        collection = self.get_collection(name)
+        if collection is None:
+            raise ValueError(f"Collection not found: {name}")
+
+        params = params or self.params
+        started = time.perf_counter()
+        metadata = {key: value for key, value in (collection.metadata or {}).items() if not key.startswith("hnsw:")}
+        stored = collection.get(include=["embeddings", "documents", "metadatas"])
+
+        # HNSW settings cannot change in place: copy into a fresh collection, then take over the name
+        rebuild_name = f"{name}_rebuild"
+        if self.get_collection(rebuild_name) is not None:
+            self.client.delete_collection(name=rebuild_name)
+        rebuilt = self.client.create_collection(name=rebuild_name, metadata={**metadata, **params.to_chroma_metadata()})
+
+        batch_size = self.max_batch_size() or len(stored["ids"]) or 1
+        for start in range(0, len(stored["ids"]), batch_size):
+            end = start + batch_size
+            rebuilt.add(
+                ids=stored["ids"][start:end],
+                embeddings=stored["embeddings"][start:end],
+                documents=stored["documents"][start:end],
+                metadatas=stored["metadatas"][start:end]
+            )
+
+        self.client.delete_collection(name=name)
+        rebuilt.modify(name=name)
+        return {
+            "collection": name,
+            "backend": self.backend,
+            "count": len(stored["ids"]),
+            "params": params._asdict(),
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+
+    def max_batch_size(self) -> Optional[int]:
+        return self.client.get_max_batch_size()
+
+
+class LocalCollection(abc.ABC):
+    """
+    Chunks of one document kept in process: documents and metadata by chunk ID, each pointing at a
+    slot (label) of a vector index implemented by the subclass. A persisted collection is loaded on
+    first use and may be unloaded again by its store.
+    """
+
+    def __init__(self, store: "LocalVectorStore", name: str, metadata: Dict[str, Any], params: HnswParams,
+                 directory: Optional[str] = None):
+        self._store = store
+        self.name = name
+        self.metadata = metadata
+        self.params = params
+        self.directory = directory
+        self.dim: Optional[int] = None
+        self._next_label = 0
+        # chunk ID -> (label in the index, document, metadata); None while the collection is not loaded
+        self._records: Optional[Dict[str, Tuple[int, str, Dict[str, Any]]]] = None
+        self._ids_by_label: Dict[int, str] = {}
+        self._lock = threading.RLock()
+        # Open batch_writes contexts, and whether writes made in them are not on disk yet
+        self._deferred_writes = 0
+        self._dirty = False
+
+    @classmethod
+    def open(cls, store: "LocalVectorStore", directory: str) -> "LocalCollection":
+        """Read the header of a persisted collection, leaving its index on disk until it is used"""
+        with open(os.path.join(directory, "collection.json"), 'r', encoding='utf-8') as f:
+            header = json.load(f)
+        collection = cls(store, header["name"], header["metadata"], HnswParams(**header["params"]), directory)
+        collection._read_header(header)
+        return collection
+
+    def count(self) -> int:
+        with self._lock:
+            self._load()
+            return len(self._records)
+
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            include: Tuple[str, ...] = ("metadatas", "documents")) -> Dict[str, Any]:
+        """
+        Stored chunks, optionally filtered by ID and by metadata equality.
+
+        Args:
+            ids: Chunk IDs to fetch, defaults to every chunk
+            where: Metadata fields the chunks must match exactly
+            include: Any of "documents", "metadatas" and "embeddings"
+
+        Returns:
+            Chunks in the ChromaDB get result layout, embeddings as a float32 array
+        """
+        with self._lock:
+            self._load()
+            selected = [
+                (chunk_id, record) for chunk_id, record in (
+                    self._records.items() if ids is None
+                    else ((chunk_id, self._records[chunk_id]) for chunk_id in ids if chunk_id in self._records)
+                )
+                if not where or all(record[2].get(key) == value for key, value in where.items())
+            ]
+
+            embeddings = None
+            if "embeddings" in include:
+                labels = [record[0] for _, record in selected]
+                embeddings = (self._get_vectors(labels) if labels
+                              else np.empty((0, self.dim or 0), dtype=np.float32))
+
+            return {
+                "ids": [chunk_id for chunk_id, _ in selected],
+                "documents": [record[1] for _, record in selected] if "documents" in include else None,
+                "metadatas": [record[2] for _, record in selected] if "metadatas" in include else None,
+                "embeddings": embeddings
+            }
+
+    def upsert(self, ids: List[str], embeddings, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None):
+        """Add chunks or replace the vectors, documents and metadata of existing ones"""
+        vectors = np.asarray(embeddings, dtype=np.float32)
+        with self._lock:
+            self._load()
+            if self.dim is None:
+                self.dim = vectors.shape[1]
+
+            labels = [
+                self._records[chunk_id][0] if chunk_id in self._records else self._allocate_label()
+                for chunk_id in ids
+            ]
+            self._put_vectors(vectors, labels)
+
+            for i, (chunk_id, label) in enumerate(zip(ids, labels)):
+                previous = self._records.get(chunk_id, (label, "", {}))
+                self._records[chunk_id] = (
+                    label,
+                    documents[i] if documents is not None else previous[1],
+                    metadatas[i] if metadatas is not None else previous[2]
+                )
+                self._ids_by_label[label] = chunk_id
+            self._persist()
+
+    def update(self, ids: List[str], embeddings=None, documents: Optional[List[str]] = None,
+               metadatas: Optional[List[Dict[str, Any]]] = None):
+        """Replace fields of existing chunks; unknown IDs are ignored"""
+        with self._lock:
+            self._load()
+            known = [i for i, chunk_id in enumerate(ids) if chunk_id in self._records]
+            if embeddings is not None and known:
+                vectors = np.asarray(embeddings, dtype=np.float32)[known]
+                self._put_vectors(vectors, [self._records[ids[i]][0] for i in known])
+
+            for i in known:
+                label, document, metadata = self._records[ids[i]]
+                self._records[ids[i]] = (
+                    label,
+                    documents[i] if documents is not None else document,
+                    metadatas[i] if metadatas is not None else metadata
+                )
+            self._persist()
+
+    def delete(self, ids: List[str]):
+        """Remove chunks; their index slots are reused by later additions or dropped by a rebuild"""
+        with self._lock:
+            self._load()
+            labels = []
+            for chunk_id in ids:
+                record = self._records.pop(chunk_id, None)
+                if record:
+                    labels.append(record[0])
+                    self._ids_by_label.pop(record[0], None)
+            if labels:
+                self._delete_vectors(labels)
+            self._persist()
+
+    def query(self, query_embeddings, n_results: int = 10,
+              include: Tuple[str, ...] = ("metadatas", "documents", "distances")) -> Dict[str, Any]:
+        """
+        Nearest neighbours of each query vector.
+
+        Args:
+            query_embeddings: Query vectors
+            n_results: Neighbours per query
+            include: Any of "documents", "metadatas" and "distances"
+
+        Returns:
+            Neighbours in the ChromaDB query result layout, closest first
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        with self._lock:
+            self._load()
+            k = min(n_results, len(self._records))
+            if not k:
+                labels, distances = np.empty((len(queries), 0), dtype=np.int64), np.empty((len(queries), 0))
+            else:
+                labels, distances = self._search(queries, k)
+            records = [[self._records[self._ids_by_label[int(label)]] for label in row] for row in labels]
+            ids = [[self._ids_by_label[int(label)] for label in row] for row in labels]
+
+        return {
+            "ids": ids,
+            "documents": [[record[1] for record in row] for row in records] if "documents" in include else None,
+            "metadatas": [[record[2] for record in row] for row in records] if "metadatas" in include else None,
+            "distances": [[float(distance) for distance in row] for row in distances]
+            if "distances" in include else None,
+            "embeddings": None
+        }
+
+    def rebuild(self, params: HnswParams) -> Dict[str, Any]:
+        """Rebuild the index with new settings and contiguous labels, dropping deleted slots"""
+        with self._lock:
+            self._load()
+            chunk_ids = list(self._records)
+            vectors = self._get_vectors([self._records[chunk_id][0] for chunk_id in chunk_ids]) if chunk_ids else None
+            slots = self._slot_count()
+
+            self.params = params
+            self._reset_vectors()
+            self._records = {
+                chunk_id: (label, *self._records[chunk_id][1:]) for label, chunk_id in enumerate(chunk_ids)
+            }
+            self._ids_by_label = dict(enumerate(chunk_ids))
+            self._next_label = len(chunk_ids)
+            if chunk_ids:
+                self._put_vectors(vectors, list(range(len(chunk_ids))))
+            self._persist()
+            return {"count": len(chunk_ids), "slots_reclaimed": slots - len(chunk_ids)}
+
+    @contextlib.contextmanager
+    def batch_writes(self):
+        """Persist the writes made inside the context once, when the last open context exits"""
+        with self._lock:
+            self._deferred_writes += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._deferred_writes -= 1
+                if not self._deferred_writes and self._dirty:
+                    self._persist()
+
+    def _allocate_label(self) -> int:
+        label = self._next_label
+        self._next_label += 1
+        return label
+
+    @abc.abstractmethod
+    def _get_vectors(self, labels: List[int]) -> np.ndarray:
+        """float32 vectors stored at the labels"""
+
+    @abc.abstractmethod
+    def _put_vectors(self, vectors: np.ndarray, labels: List[int]):
+        """Write vectors at the labels, growing the index as needed"""
+
+    @abc.abstractmethod
+    def _delete_vectors(self, labels: List[int]):
+        """Mark the labels as deleted, so searches skip them"""
+
+    @abc.abstractmethod
+    def _search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Labels and distances of the k nearest live vectors of each query, closest first"""
+
+    @abc.abstractmethod
+    def _slot_count(self) -> int:
+        """Slots the index currently holds, deleted ones included"""
+
+    @abc.abstractmethod
+    def _reset_vectors(self):
+        """Drop the index ahead of a rebuild"""
+
+    @abc.abstractmethod
+    def _load_vectors(self):
+        """Read the index from the collection directory"""
+
+    @abc.abstractmethod
+    def _save_vectors(self):
+        """Write the index to the collection directory"""
+
+    @abc.abstractmethod
+    def _unload_vectors(self):
+        """Release the in-memory index"""
+
+    def _header(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "metadata": self.metadata,
+            "params": self.params._asdict(),
+            "dim": self.dim,
+            "next_label": self._next_label
+        }
+
+    def _read_header(self, header: Dict[str, Any]):
+        self.dim = header["dim"]
+        self._next_label = header["next_label"]
+
+    def _load(self):
+        """Load the records and vectors from disk if they are not in memory; caller holds the lock"""
+        if self._records is None:
+            with open(os.path.join(self.directory, "records.json"), 'r', encoding='utf-8') as f:
+                records = json.load(f)
+            self._records = {chunk_id: (label, document, metadata) for chunk_id, label, document, metadata in records}
+            self._ids_by_label = {record[0]: chunk_id for chunk_id, record in self._records.items()}
+            if self.dim:
+                self._load_vectors()
+        self._store._touch(self)
+
+    def _unload(self) -> bool:
+        """Drop the in-memory copy of a persisted collection, unless it is in use; returns True if it was dropped"""
+        if not self.directory or not self._lock.acquire(blocking=False):
+            return False
+        try:
+            if self._deferred_writes or self._dirty:
+                # Writes not persisted yet exist only in memory
+                return False
+            self._records, self._ids_by_label = None, {}
+            self._unload_vectors()
+            return True
+        finally:
+            self._lock.release()
+
+    def _persist(self):
+        """Write the vectors, records and header, or only flag them inside batch_writes; caller holds the lock"""
+        if not self.directory:
+            return
+        if self._deferred_writes:
+            self._dirty = True
+            return
+        self._dirty = False
+        if self.dim:
+            self._save_vectors()
+
+        files = {
+            "records.json": [[chunk_id, *record] for chunk_id, record in self._records.items()],
+            "collection.json": self._header()
+        }
+        for file_name, content in files.items():
+            path = os.path.join(self.directory, file_name)
+            with open(f"{path}.tmp", 'w', encoding='utf-8') as f:
+                json.dump(content, f, ensure_ascii=False, separators=(",", ":"))
+            os.replace(f"{path}.tmp", path)
+
+
+class HnswlibCollection(LocalCollection):
+    """Chunks of one document in an in-process hnswlib index"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._index = None
+
+    def _get_vectors(self, labels: List[int]) -> np.ndarray:
+        # With the cosine space hnswlib stores, and returns, normalized vectors
+        return np.asarray(self._index.get_items(labels), dtype=np.float32)
+
+    def _put_vectors(self, vectors: np.ndarray, labels: List[int]):
+        if self._index is None:
+            self._index = self._create_index(len(labels))
+        if self._index.get_current_count() + len(labels) > self._index.get_max_elements():
+            self._index.resize_index(max(self._index.get_current_count() + len(labels),
+                                         2 * self._index.get_max_elements()))
+        self._index.add_items(vectors, labels, replace_deleted=True)
+
+    def _delete_vectors(self, labels: List[int]):
+        for label in labels:
+            self._index.mark_deleted(label)
+
+    def _search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # hnswlib needs a candidate list at least as long as the number of results
+        self._index.set_ef(max(self.params.ef_search, k))
+        return self._index.knn_query(queries, k=k)
+
+    def _slot_count(self) -> int:
+        return self._index.get_current_count() if self._index is not None else 0
+
+    def _reset_vectors(self):
+        self._index = None
+
+    def _create_index(self, capacity: int):
+        import hnswlib
+
+        index = hnswlib.Index(space=self.params.space, dim=self.dim)
+        index.init_index(max_elements=max(capacity, 16), ef_construction=self.params.ef_construction,
+                         M=self.params.m, allow_replace_deleted=True)
+        index.set_ef(self.params.ef_search)
+        return index
+
+    def _load_vectors(self):
+        import hnswlib
+
+        self._index = hnswlib.Index(space=self.params.space, dim=self.dim)
+        self._index.load_index(os.path.join(self.directory, "index.bin"), allow_replace_deleted=True)
+        self._index.set_ef(self.params.ef_search)
+
+    def _save_vectors(self):
+        if self._index is None:
+            return
+        path = os.path.join(self.directory, "index.bin")
+        self._index.save_index(f"{path}.tmp")
+        os.replace(f"{path}.tmp", path)
+
+    def _unload_vectors(self):
+        self._index = None
+
+
+class FlatCollection(LocalCollection):
+    """
+    Chunks of one document as a matrix of normalized vectors in float32, float16 or scalar-quantized
+    int8 (one float32 scale per vector), searched exhaustively. Persisted matrices are memory-mapped.
+    With rescoring, full-precision vectors are kept in a second, memory-mapped file and re-score the
+    best quantized candidates, so only those rows are ever read from disk.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dtype = self._store.dtype
+        self.rescore = self._store.rescore and self.dtype != "float32"
+        self._vectors: Optional[np.ndarray] = None  # Rows by label, in the storage dtype
+        self._scales: Optional[np.ndarray] = None  # int8 only: dequantization factor per row
+        self._full: Optional[np.ndarray] = None  # Rescoring only: float32 rows by label
+        self._free_labels: List[int] = []
+
+    def memory_stats(self) -> Dict[str, Any]:
+        """Bytes held by the searched matrix and by the full-precision copy used for rescoring"""
+        with self._lock:
+            self._load()
+            rows, dim = self._next_label, self.dim or 0
+            return {
+                "dtype": self.dtype,
+                "rescore": self.rescore,
+                "vector_bytes": rows * dim * np.dtype(self.dtype).itemsize + (rows * 4 if self.dtype == "int8" else 0),
+                "full_precision_bytes": rows * dim * 4 if self.rescore else 0,
+                "float32_vector_bytes": rows * dim * 4
+            }
+
+    def _get_vectors(self, labels: List[int]) -> np.ndarray:
+        if self._full is not None:
+            return np.array(self._full[labels], dtype=np.float32)
+        vectors = np.asarray(self._vectors[labels], dtype=np.float32)
+        if self._scales is not None:
+            vectors *= self._scales[labels][:, None]
+        return vectors
+
+    def _allocate_label(self) -> int:
+        return self._free_labels.pop() if self._free_labels else super()._allocate_label()
+
+    def _put_vectors(self, vectors: np.ndarray, labels: List[int]):
+        vectors = vectors / np.maximum(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12)
+        rows = self._next_label
+        # Writes go to in-memory copies, persisted files are mapped read-only
+        self._vectors = self._grow(self._vectors, rows, self.dtype, self.dim)
+        if self.dtype == "int8":
+            scales = np.maximum(np.abs(vectors).max(axis=1), 1e-12) / 127
+            self._scales = self._grow(self._scales, rows, "float32")
+            self._scales[labels] = scales
+            self._vectors[labels] = np.round(vectors / scales[:, None]).astype(np.int8)
+        else:
+            self._vectors[labels] = vectors.astype(self.dtype)
+        if self.rescore:
+            self._full = self._grow(self._full, rows, "float32", self.dim)
+            self._full[labels] = vectors
+
+    @staticmethod
+    def _grow(array: Optional[np.ndarray], rows: int, dtype: str, columns: Optional[int] = None) -> np.ndarray:
+        """Writable array with at least `rows` rows, keeping the existing ones"""
+        if array is not None and not isinstance(array, np.memmap) and len(array) >= rows:
+            return array
+        # Appends double the capacity, a mapped file is copied at its own size
+        capacity = rows if array is None else max(rows, len(array) if len(array) >= rows else 2 * len(array))
+        grown = np.zeros((capacity, columns) if columns else (capacity,), dtype=dtype)
+        if array is not None:
+            grown[:len(array)] = array
+        return grown
+
+    def _delete_vectors(self, labels: List[int]):
+        self._free_labels.extend(labels)
+
+    def _search(self, queries: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        rows = self._next_label
+        queries = queries / np.maximum(np.linalg.norm(queries, axis=1, keepdims=True), 1e-12)
+
+        # Similarities against the stored rows, upcast block by block rather than the whole matrix at once
+        scores = np.empty((len(queries), rows), dtype=np.float32)
+        for start in range(0, rows, FLAT_SCAN_BLOCK_ROWS):
+            # The matrix grows by doubling, rows past the last label are unused capacity
+            block = np.asarray(self._vectors[start:min(start + FLAT_SCAN_BLOCK_ROWS, rows)], dtype=np.float32)
+            scores[:, start:start + len(block)] = queries @ block.T
+        if self._scales is not None:
+            scores *= self._scales[:rows]
+        if self._free_labels:
+            scores[:, self._free_labels] = -np.inf
+
+        candidates = min(k * VECTOR_RESCORE_FACTOR if self.rescore else k, rows)
+        top = np.argpartition(-scores, candidates - 1, axis=1)[:, :candidates]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        if self.rescore:
+            exact = np.einsum("qcd,qd->qc", np.asarray(self._full[top], dtype=np.float32), queries)
+            top_scores = np.where(np.isneginf(top_scores), -np.inf, exact)
+
+        order = np.argsort(-top_scores, axis=1)[:, :k]
+        similarities = np.take_along_axis(top_scores, order, axis=1)
+        # Squared L2 and cosine distances of unit vectors both follow from the dot product
+        distances = 2 - 2 * similarities if self.params.space == "l2" else 1 - similarities
+        return np.take_along_axis(top, order, axis=1), distances
+
+    def _slot_count(self) -> int:
+        return self._next_label
+
+    def _reset_vectors(self):
+        # A rebuild re-encodes the vectors with the store's current storage settings
+        self.dtype = self._store.dtype
+        self.rescore = self._store.rescore and self.dtype != "float32"
+        self._vectors, self._scales, self._full, self._free_labels = None, None, None, []
+
+    def _header(self) -> Dict[str, Any]:
+        return {**super()._header(), "dtype": self.dtype, "rescore": self.rescore}
+
+    def _read_header(self, header: Dict[str, Any]):
+        super()._read_header(header)
+        self.dtype = header["dtype"]
+        self.rescore = header["rescore"]
+
+    def _files(self) -> Dict[str, str]:
+        files = {"_vectors": "vectors.npy"}
+        if self.dtype == "int8":
+            files["_scales"] = "scales.npy"
+        if self.rescore:
+            files["_full"] = "vectors_f32.npy"
+        return files
+
+    def _load_vectors(self):
+        for attribute, file_name in self._files().items():
+            setattr(self, attribute, np.load(os.path.join(self.directory, file_name), mmap_mode="r"))
+        used = set(self._ids_by_label)
+        self._free_labels = [label for label in range(self._next_label) if label not in used]
+
+    def _save_vectors(self):
+        for attribute, file_name in self._files().items():
+            array = getattr(self, attribute)
+            if array is None or isinstance(array, np.memmap):
+                continue  # Empty, or unchanged since it was loaded
+            path = os.path.join(self.directory, file_name)
+            with open(f"{path}.tmp", 'wb') as f:
+                np.save(f, array[:self._next_label])
+            # Release the in-memory copy for a read-only mapping of the file just written
+            setattr(self, attribute, None)
+            os.replace(f"{path}.tmp", path)
+            setattr(self, attribute, np.load(path, mmap_mode="r"))
+
+    def _unload_vectors(self):
+        self._vectors, self._scales, self._full, self._free_labels = None, None, None, []
+
+
+class LocalVectorStore(VectorStore):
+    """
+    In-process collections, persisted one directory each. Persisted collections are loaded when their
+    document is first searched, and only the VECTOR_MAX_LOADED_COLLECTIONS most recently used stay in memory.
+    """
+
+    collection_class = LocalCollection
+
+    def __init__(self, persist_directory: Optional[str] = None, params: Optional[HnswParams] = None,
+                 max_loaded: int = VECTOR_MAX_LOADED_COLLECTIONS):
+        self.persist_directory = persist_directory
+        self.params = params or HnswParams()
+        self.max_loaded = max_loaded
+        self._collections: Dict[str, LocalCollection] = {}
+        self._loaded: OrderedDict[str, None] = OrderedDict()
+        self._lock = threading.Lock()
+
+        if self.persist_directory:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            for name in os.listdir(self.persist_directory):
+                directory = os.path.join(self.persist_directory, name)
+                if os.path.exists(os.path.join(directory, "collection.json")):
+                    try:
+                        self._collections[name] = self.collection_class.open(self, directory)
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.error(f"Error opening collection {directory}: {str(e)}")
+
+    def list_collections(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return {name: collection.metadata for name, collection in self._collections.items()}
+
+    def get_collection(self, name: str) -> Optional[LocalCollection]:
+        with self._lock:
+            return self._collections.get(name)
+
+    def create_collection(self, name: str, metadata: Dict[str, Any],
+                          params: Optional[HnswParams] = None) -> LocalCollection:
+        with self._lock:
+            collection = self._collections.get(name)
+            if collection is not None:
+                return collection
+
+            directory = os.path.join(self.persist_directory, name) if self.persist_directory else None
+            collection = self.collection_class(self, name, metadata, params or self.params, directory)
+            collection._records = {}
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+                collection._persist()
+            self._collections[name] = collection
+        self._touch(collection)
+        return collection
+
+    def delete_collection(self, name: str):
+        with self._lock:
+            collection = self._collections.pop(name, None)
+            self._loaded.pop(name, None)
+        if collection and collection.directory:
+            shutil.rmtree(collection.directory, ignore_errors=True)
+
+    def collection_params(self, collection: LocalCollection) -> HnswParams:
+        return collection.params
+
+    def batch_writes(self, collection: LocalCollection) -> contextlib.AbstractContextManager:
+        return collection.batch_writes()
+
+    def rebuild_collection(self, name: str, params: Optional[HnswParams] = None) -> Dict[str, Any]:
+        collection = self.get_collection(name)
+        if collection is None:
+            raise ValueError(f"Collection not found: {name}")
+
+        params = params or self.params
+        started = time.perf_counter()
+        result = collection.rebuild(params)
+        return {
+            "collection": name,
+            "backend": self.backend,
+            **result,
+            "params": params._asdict(),
+            "seconds": round(time.perf_counter() - started, 3)
+        }
+
+    def _touch(self, collection: LocalCollection):
+        """Mark a persisted collection as recently used and unload the least recently used ones beyond the limit"""
+        if not collection.directory:
+            return
+        with self._lock:
+            self._loaded[collection.name] = None
+            self._loaded.move_to_end(collection.name)
+            evicted = []
+            while len(self._loaded) > max(self.max_loaded, 1):
+                name, _ = self._loaded.popitem(last=False)
+                if name in self._collections:
+                    evicted.append(self._collections[name])
+
+        # A collection busy in another thread stays loaded and is tracked again on its next use
+        for other in evicted:
+            other._unload()
+
+
+class HnswlibVectorStore(LocalVectorStore):
+    """In-process hnswlib indexes, one per collection"""
+
+    backend = "hnswlib"
+    collection_class = HnswlibCollection
+
+
+class FlatVectorStore(LocalVectorStore):
+    """
+    Exhaustive search over compact per-document matrices. Documents have their own collection, so
+    an exact scan stays small, and float16 or int8 storage cuts the index memory to a half or a quarter.
+    """
+
+    backend = "flat"
+    collection_class = FlatCollection
+
+    def __init__(self, persist_directory: Optional[str] = None, params: Optional[HnswParams] = None,
+                 max_loaded: int = VECTOR_MAX_LOADED_COLLECTIONS, dtype: str = VECTOR_STORAGE_DTYPE,
+                 rescore: bool = VECTOR_RESCORE):
+        if dtype not in ("float32", "float16", "int8"):
+            raise ValueError(f"Unsupported VECTOR_STORAGE_DTYPE: {dtype}")
+        self.dtype = dtype
+        self.rescore = rescore
+        super().__init__(persist_directory, params, max_loaded)
+
+    def collection_stats(self, collection: FlatCollection) -> Dict[str, Any]:
+        return {"space": collection.params.space, **collection.memory_stats()}
+
+
+def create_vector_store(backend: str = VECTOR_STORE_BACKEND, persist: bool = False,
+                        params: Optional[HnswParams] = None) -> VectorStore:
+    """
+    Build a vector store of the configured backend.
+
+    Args:
+        backend: "chroma", "hnswlib" or "flat"
+        persist: Store the collections on disk under app/, otherwise keep them in memory
+        params: HNSW settings of new collections, defaults to the configured ones
+
+    Returns:
+        The vector store
+    """
+    if backend not in VECTOR_STORE_DIRECTORIES:
+        logger.warning(f"Unknown VECTOR_STORE_BACKEND '{backend}', using ChromaDB")
+        backend = "chroma"
+    persist_directory = os.path.join(os.getcwd(), VECTOR_STORE_DIRECTORIES[backend]) if persist else None
+    if backend == "hnswlib":
+        return HnswlibVectorStore(persist_directory, params)
+    if backend == "flat":
+        return FlatVectorStore(persist_directory, params)
+    return ChromaVectorStore(persist_directory, params)
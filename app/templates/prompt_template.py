@@ -4,7 +4,7 @@ from pydantic import BaseModel
 
 
 class OperationType(BaseModel):
-    type: Literal["part", "final", "chat"] = "chat"
+    type: Literal["part", "group", "final", "chat"] = "chat"
 
     def in_chat_mode(self) -> bool:
         return self.type == "chat"
@@ -12,6 +12,8 @@ class OperationType(BaseModel):
     def dynamic_prompt(self, **kwargs):
         if self.type == "part":
             return self.part_summary()
+        elif self.type == "group":
+            return self.group_summary()
         elif self.type == "final":
             return self.final_summary()
         elif self.type == "chat":
@@ -160,6 +162,36 @@ class OperationType(BaseModel):
         """
         return prompt
 
+    @staticmethod
+    def group_summary():
+        prompt = """
+            # Intermediate Section Summary Consolidation
+            
+            You are an expert document analyst consolidating a group of consecutive section summaries from a large 
+            PDF document. Your output will be combined with other consolidated groups to write the final report, 
+            so it must preserve every important fact while removing repetition.
+            
+            ## CONSOLIDATION REQUIREMENTS
+            
+            ### Content Structure (**response must be 1500-2000 tokens total**):
+            - **Group Overview**: What this span of the document covers and how it fits the whole
+            - **Consolidated Content**: The key themes, findings, data and arguments of the grouped sections, in document order
+            - **Carry-Forward Insights**: Conclusions, open questions and cross-references later sections may depend on
+            
+            ## CRITICAL REQUIREMENTS
+            
+            - **No Information Loss**: Keep specific figures, names, dates, definitions and decisions
+            - **Document Order**: Follow the order of the sections as they appear in the input
+            - **Deduplication**: Merge points repeated across sections instead of restating them
+            - **Faithfulness**: Do not add information that is not present in the section summaries
+            
+            IMPORTANT NOTES:
+            - Response must be 1500-2000 tokens in total
+            - Focus on narrative analysis with clear paragraph structure
+            - Adapt the consolidation approach to the document type
+        """
+        return prompt
+
     @staticmethod
     def final_summary():
         prompt = """
@@ -0,0 +1,133 @@
+"""
+Offline benchmarks of the indexed documents. They load the models and scan whole documents,
+so stop the API first, then run e.g.:
+
+    uv run benchmark.py retrieval --pdf report --eval-set report_eval.jsonl --modes dense,hybrid,hybrid+rerank
+    uv run benchmark.py chunking --pdf report --repeat 5
+    uv run benchmark.py index --pdf report --m 16,32 --ef-search 10,50,100
+    uv run benchmark.py quantization --pdf report --dtypes float16,int8
+
+The retrieval evaluation set has one JSON object per line, with the query and its relevant
+pages (1-based) and/or chunk IDs, e.g. {"query": "What is the warranty period?", "pages": [12]}
+"""
+import argparse
+import json
+
+from dotenv import load_dotenv
+
+from app.services.benchmark_service import (
+    chunking_benchmark, index_benchmark, load_eval_set, quantization_benchmark, retrieval_benchmark
+)
+from app.services.vector_service import VectorService
+from app.services.vector_store_service import HnswParams
+
+# Load environment variables
+load_dotenv()
+
+
+def parse_list(value: str) -> list[str]:
+    """Parse a comma-separated command line option"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def positive_int(value: str) -> int:
+    """Parse a command line option that must be at least 1"""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, got {value}")
+    return number
+
+
+def positive_int_list(value: str) -> list[int]:
+    """Parse a comma-separated command line option of integers that must be at least 1"""
+    return [positive_int(item) for item in parse_list(value)]
+
+
+def run_retrieval(vector_service: VectorService, args: argparse.Namespace):
+    for pdf_name in args.pdf:
+        eval_set = load_eval_set(args.eval_set, pdf_name)
+        if not eval_set:
+            print(json.dumps({"pdf_name": pdf_name, "error": "No labelled queries for this document"}))
+            continue
+        report = retrieval_benchmark(vector_service, pdf_name, eval_set, tuple(parse_list(args.modes)), top_k=args.top_k)
+        print(json.dumps(report or {"pdf_name": pdf_name, "error": "Document not indexed"}))
+
+
+def run_chunking(vector_service: VectorService, args: argparse.Namespace):
+    for pdf_name in args.pdf:
+        report = chunking_benchmark(vector_service, pdf_name, repeat=args.repeat)
+        print(json.dumps(report or {"pdf_name": pdf_name, "error": "Document not extracted"}))
+
+
+def run_index(vector_service: VectorService, args: argparse.Namespace):
+    configs = [
+        HnswParams()._replace(m=m, ef_construction=ef_construction, ef_search=ef_search,
+                              **({"space": args.space} if args.space else {}))
+        for m in args.m
+        for ef_construction in args.ef_construction
+        for ef_search in args.ef_search
+    ]
+    for pdf_name in args.pdf:
+        report = index_benchmark(vector_service, pdf_name, configs, sample_size=args.queries, top_k=args.top_k)
+        print(json.dumps(report or {"pdf_name": pdf_name, "error": "Document not indexed"}))
+
+
+def run_quantization(vector_service: VectorService, args: argparse.Namespace):
+    dtypes = tuple(parse_list(args.dtypes))
+    for pdf_name in args.pdf:
+        report = quantization_benchmark(vector_service, pdf_name, dtypes, sample_size=args.queries, top_k=args.top_k)
+        print(json.dumps(report or {"pdf_name": pdf_name, "error": "Document not indexed"}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark retrieval and indexing on indexed PDFs")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    retrieval = commands.add_parser("retrieval", help="Compare retrieval modes on a labelled evaluation set")
+    retrieval.add_argument("--pdf", action="append", required=True, help="PDF name to benchmark, repeatable")
+    retrieval.add_argument("--eval-set", required=True, help="JSONL file of queries with their relevant pages or chunk_ids")
+    retrieval.add_argument("--modes", default="dense,hybrid,hybrid+rerank",
+                           help="Comma-separated search modes; a +rerank suffix adds cross-encoder re-ranking")
+    retrieval.add_argument("--top-k", type=positive_int, default=5, help="Results per query")
+    retrieval.set_defaults(run=run_retrieval, needs_index=True)
+
+    chunking = commands.add_parser("chunking", help="Measure normalization and chunking throughput in MB/s")
+    chunking.add_argument("--pdf", action="append", required=True, help="Extracted PDF name, repeatable")
+    chunking.add_argument("--repeat", type=positive_int, default=3, help="Runs per measurement, the fastest is reported")
+    chunking.set_defaults(run=run_chunking, needs_index=False)
+
+    index = commands.add_parser("index", help="Compare recall@k and QPS of HNSW settings on the stored vectors")
+    index.add_argument("--pdf", action="append", required=True, help="PDF name to benchmark, repeatable")
+    index.add_argument("--space", choices=["l2", "cosine", "ip"], help="Distance space, defaults to HNSW_SPACE")
+    index.add_argument("--m", type=positive_int_list, default=[16], help="Comma-separated graph links per node")
+    index.add_argument("--ef-construction", type=positive_int_list, default=[100],
+                       help="Comma-separated build candidate list sizes")
+    index.add_argument("--ef-search", type=positive_int_list, default=[10, 50, 100],
+                       help="Comma-separated query candidate list sizes")
+    index.add_argument("--queries", type=positive_int, default=50, help="Queries sampled from the document's chunks")
+    index.add_argument("--top-k", type=positive_int, default=10, help="Neighbours per query")
+    index.set_defaults(run=run_index, needs_index=True)
+
+    quantization = commands.add_parser("quantization",
+                                       help="Compare vector memory and recall@k of float32, float16 and int8 storage")
+    quantization.add_argument("--pdf", action="append", required=True, help="PDF name to benchmark, repeatable")
+    quantization.add_argument("--dtypes", default="float32,float16,int8",
+                              help="Comma-separated storage types out of float32, float16 and int8")
+    quantization.add_argument("--queries", type=positive_int, default=50, help="Queries sampled from the document's chunks")
+    quantization.add_argument("--top-k", type=positive_int, default=10, help="Neighbours per query")
+    quantization.set_defaults(run=run_quantization, needs_index=True)
+
+    args = parser.parse_args()
+    if args.command == "quantization" and not set(parse_list(args.dtypes)) <= {"float32", "float16", "int8"}:
+        parser.error("--dtypes must be a comma-separated list of float32, float16, int8")
+
+    vector_service = VectorService()
+    if args.needs_index and not vector_service.persist_db:
+        print("VECTOR_PERSIST is not enabled, there is no stored index to benchmark")
+        return
+
+    args.run(vector_service, args)
+
+
+if __name__ == "__main__":
+    main()
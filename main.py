@@ -1,20 +1,45 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+IMPORT_STARTED = time.perf_counter()
+
 import uvicorn
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from starlette.concurrency import run_in_threadpool
 from dotenv import load_dotenv
 
 from app.routers.chat_router import chat_router
+from app.routers.document_router import document_router
+from app.routers.job_router import job_router
 from app.routers.pdf_router import pdf_router
 
 from app.routers.health_router import health_router
+from app.services.job_service import JOB_SERVICE
+from app.services.service_container import SERVICES
 
 # Load environment variables
 load_dotenv()
 
+SERVICES.app_import_seconds = round(time.perf_counter() - IMPORT_STARTED, 3)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the shared services up in the background so liveness answers immediately; /ready tracks progress
+    warm_up = asyncio.create_task(run_in_threadpool(SERVICES.warm_up))
+    yield
+    JOB_SERVICE.shutdown()
+    await warm_up
+    await run_in_threadpool(SERVICES.shutdown)
+
+
 app = FastAPI(
     title="PDF Summarizer",
     description="Extract and summarize information from PDF documents using LLMs.",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Add CORS middleware
@@ -29,7 +54,9 @@ app.add_middleware(
 # Include routers
 app.include_router(health_router, tags=["Server checkup"])
 app.include_router(pdf_router, tags=["PDF Processing"])
+app.include_router(job_router, tags=["Ingestion jobs"])
 app.include_router(chat_router, tags=["LLM chat"])
+app.include_router(document_router, tags=["Document index"])
 
 @app.get("/")
 async def root():
@@ -0,0 +1,56 @@
+"""
+Offline rebuild and compaction of the per-document vector indexes.
+
+Stop the API first, then run e.g.:
+
+    uv run rebuild_index.py                          # every document, with the configured HNSW_* settings
+    uv run rebuild_index.py --pdf report --m 32 --ef-search 64
+    uv run rebuild_index.py --drop-legacy            # also delete the shared collection of earlier versions
+"""
+import argparse
+import json
+
+from dotenv import load_dotenv
+
+from app.services.vector_service import VectorService
+from app.services.vector_store_service import HnswParams
+
+# Load environment variables
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild the vector index of indexed PDFs")
+    parser.add_argument("--pdf", action="append", help="PDF name to rebuild, repeatable; defaults to every document")
+    parser.add_argument("--space", choices=["l2", "cosine", "ip"], help="Distance space, defaults to HNSW_SPACE")
+    parser.add_argument("--m", type=int, help="Graph links per node, defaults to HNSW_M")
+    parser.add_argument("--ef-construction", type=int, help="Build candidate list size, defaults to HNSW_EF_CONSTRUCTION")
+    parser.add_argument("--ef-search", type=int, help="Query candidate list size, defaults to HNSW_EF_SEARCH")
+    parser.add_argument("--drop-legacy", action="store_true",
+                        help="Delete the shared 'pdf_documents' collection of earlier versions")
+    args = parser.parse_args()
+
+    overrides = {
+        "space": args.space,
+        "m": args.m,
+        "ef_construction": args.ef_construction,
+        "ef_search": args.ef_search
+    }
+    params = HnswParams()._replace(**{name: value for name, value in overrides.items() if value is not None})
+
+    vector_service = VectorService()
+    if not vector_service.persist_db:
+        print("VECTOR_PERSIST is not enabled, there is no stored index to rebuild")
+        return
+
+    if args.drop_legacy:
+        dropped = vector_service.drop_legacy_collection()
+        print(json.dumps({"legacy_collection": "dropped" if dropped is not None else "absent", "chunks": dropped}))
+
+    for pdf_name in args.pdf or vector_service.list_document_names():
+        result = vector_service.rebuild_index(pdf_name, params)
+        print(json.dumps(result or {"pdf_name": pdf_name, "error": "Document not indexed"}))
+
+
+if __name__ == "__main__":
+    main()
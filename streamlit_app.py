@@ -3,6 +3,7 @@ import requests
 import time
 import json
 import os
+import uuid
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,6 +11,10 @@ load_dotenv()
 # Global base URL from environment variable
 BASE_URL = os.getenv('API_BASE_URL')
 
+# Background ingestion job polling
+JOB_POLL_INTERVAL = 2  # seconds
+JOB_TIMEOUT = 3600  # seconds
+
 st.set_page_config(
     page_title="PDF Analyzer",
     page_icon="📄",
@@ -39,30 +44,72 @@ def initialize_session_state():
         st.session_state.processing_status = {'summary': False, 'chat': False}
     if 'processing_errors' not in st.session_state:
         st.session_state.processing_errors = {'summary': None, 'chat': None}
+    if 'chat_session_id' not in st.session_state:
+        # Keys this browser session's chat history on the server
+        st.session_state.chat_session_id = uuid.uuid4().hex
+
+
+def run_ingestion_job(file_data, operation, progress_placeholder=None):
+    """Submit a background ingestion job and poll it until it finishes"""
+    files = {
+        'file': (file_data['name'], file_data['data'], 'application/pdf')
+    }
+    data = {'operation': operation}
+
+    response = requests.post(
+        f'{BASE_URL}/jobs/upload-pdf',
+        files=files,
+        data=data,
+        timeout=60
+    )
+    if response.status_code != 200:
+        return {'status': 'error', 'message': f"{response.status_code} - {response.text}"}
+
+    job_id = response.json()['job_id']
+    deadline = time.time() + JOB_TIMEOUT
+
+    while time.time() < deadline:
+        job = requests.get(f'{BASE_URL}/jobs/{job_id}', timeout=10).json()
+
+        if job['status'] == 'completed':
+            return {'status': 'success', 'result': job['result']}
+        if job['status'] in ('failed', 'cancelled'):
+            return {'status': 'error', 'message': job.get('error') or f"Job {job['status']}"}
 
+        if progress_placeholder is not None:
+            progress_placeholder.text(f"🔄 {describe_job_progress(job)}")
+        time.sleep(JOB_POLL_INTERVAL)
 
-def process_pdf_for_summary(file_data):
+    requests.delete(f'{BASE_URL}/jobs/{job_id}', timeout=10)
+    return {'status': 'timeout', 'message': 'Job did not finish in time'}
+
+
+def describe_job_progress(job):
+    """Summarize per-stage job progress in one line"""
+    labels = {'extract': 'pages extracted', 'vectorize': 'chunks embedded', 'summarize': 'parts summarized'}
+    progress = []
+    for stage, state in job['stages'].items():
+        if state['status'] == 'pending':
+            continue
+        total = state['total'] if state['total'] is not None else '?'
+        progress.append(f"{state['completed']}/{total} {labels.get(stage, stage)}")
+    return ", ".join(progress) or "Queued..."
+
+
+def process_pdf_for_summary(file_data, progress_placeholder=None):
     """Process PDF for summarization"""
     try:
-        files = {
-            'file': (file_data['name'], file_data['data'], 'application/pdf')
-        }
-        data = {'operation': 'summarize'}
-        
-        response = requests.post(
-            f'{BASE_URL}/upload-pdf',
-            files=files,
-            data=data,
-            timeout=300
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            return {'status': 'success', 'result': result}
+        job_result = run_ingestion_job(file_data, 'summarize', progress_placeholder)
+
+        if job_result['status'] == 'success':
+            return job_result
+        elif job_result['status'] == 'timeout':
+            error_msg = "Request timed out. The document analysis is taking longer than expected."
+            return {'status': 'error', 'message': error_msg}
         else:
-            error_msg = f"Analysis failed: {response.status_code} - {response.text}"
+            error_msg = f"Analysis failed: {job_result['message']}"
             return {'status': 'error', 'message': error_msg}
-            
+
     except requests.exceptions.Timeout:
         error_msg = "Request timed out. The document analysis is taking longer than expected."
         return {'status': 'error', 'message': error_msg}
@@ -71,32 +118,20 @@ def process_pdf_for_summary(file_data):
         return {'status': 'error', 'message': error_msg}
 
 
-def process_pdf_for_chat(file_data):
+def process_pdf_for_chat(file_data, progress_placeholder=None):
     """Process PDF for chat mode"""
     try:
-        files = {
-            'file': (file_data['name'], file_data['data'], 'application/pdf')
-        }
-        data = {'operation': 'chat'}
-        
-        response = requests.post(
-            f'{BASE_URL}/upload-pdf',
-            files=files,
-            data=data,
-            timeout=300
-        )
-        
-        if response.status_code == 200:
-            result = response.json()
-            if result.get('status') == 'success':
-                return {'status': 'success', 'result': result}
-            else:
-                error_msg = f"Chat setup failed: {result.get('message', 'Unknown error')}"
-                return {'status': 'error', 'message': error_msg}
+        job_result = run_ingestion_job(file_data, 'chat', progress_placeholder)
+
+        if job_result['status'] == 'success':
+            return job_result
+        elif job_result['status'] == 'timeout':
+            error_msg = "Request timed out. The chat setup is taking longer than expected."
+            return {'status': 'error', 'message': error_msg}
         else:
-            error_msg = f"Error: {response.status_code} - {response.text}"
+            error_msg = f"Chat setup failed: {job_result['message']}"
             return {'status': 'error', 'message': error_msg}
-            
+
     except requests.exceptions.Timeout:
         error_msg = "Request timed out. The chat setup is taking longer than expected."
         return {'status': 'error', 'message': error_msg}
@@ -147,7 +182,7 @@ def process_uploaded_file(uploaded_file):
 
     # Process chat setup
     chat_placeholder.text("🔄 Setting up chat...")
-    chat_result = process_pdf_for_chat(st.session_state.uploaded_file_data)
+    chat_result = process_pdf_for_chat(st.session_state.uploaded_file_data, chat_placeholder)
     
     if chat_result['status'] == 'success':
         st.session_state.pdf_filename = chat_result['result'].get('pdf_filename', uploaded_file.name)
@@ -160,7 +195,7 @@ def process_uploaded_file(uploaded_file):
             
     # Process summary 
     summary_placeholder.text("🔄 Processing summary...")
-    summary_result = process_pdf_for_summary(st.session_state.uploaded_file_data)
+    summary_result = process_pdf_for_summary(st.session_state.uploaded_file_data, summary_placeholder)
     
     if summary_result['status'] == 'success':
         st.session_state.summary_result = summary_result['result']
@@ -237,6 +272,7 @@ def reset_session_state():
     st.session_state.current_mode = 'upload'
     st.session_state.summary_result = None
     st.session_state.chat_messages = []
+    st.session_state.chat_session_id = uuid.uuid4().hex
     st.session_state.chat_ready = False
     st.session_state.summary_ready = False
     st.session_state.document_info = None
@@ -426,9 +462,13 @@ def show_chat_interface():
 
         # Generate assistant response
         with st.chat_message("assistant"):
-            with st.spinner("Analyzing document and generating response..."):
-                response = handle_chat_message(prompt)
-                st.markdown(response)
+            # Tokens are rendered as the server streams them
+            st.session_state.last_citations = []
+            response = st.write_stream(stream_chat_message(prompt))
+            sources = format_citations(st.session_state.last_citations)
+            if sources:
+                st.caption(sources)
+                response = f"{response}\n\n*{sources}*"
 
         # Add assistant response to chat history
         st.session_state.chat_messages.append({"role": "assistant", "content": response})
@@ -474,53 +514,62 @@ def show_chat_interface():
             )
 
 
-def handle_chat_message(user_message):
-    """Handle a chat message and get response from chat API"""
+def format_citations(citations):
+    """Format the page-range citations of a chat reply as a sources line"""
+    labels = list(dict.fromkeys(citation['label'] for citation in citations))
+    return f"📄 Sources: {', '.join(labels)}" if labels else ""
+
+
+def stream_chat_message(user_message):
+    """Stream a chat reply from the chat API, yielding text fragments as they arrive"""
     try:
         # Get PDF filename from session state
         pdf_name = st.session_state.get('pdf_filename', 'Document')
         pdf_name = pdf_name.split('.')[0]
 
-        # Prepare chat payload
         chat_payload = {
             "file_name": pdf_name,
-            "query": user_message
+            "query": user_message,
+            "session_id": st.session_state.get('chat_session_id', 'default')
         }
 
-        # Make request to chat endpoint
-        response = requests.post(
-            f'{BASE_URL}/chat',
-            json=chat_payload,
-            timeout=60
-        )
-
-        if response.status_code == 200:
-            result = response.json()
-
-            # Check if the response was successful
-            if result.get('status') == 'success':
-                return result.get('llm_reply', 'No response received from the AI.')
-            else:
-                error_message = result.get('message', 'Unknown error occurred')
-                return f"❌ Sorry, I encountered an issue: {error_message}"
-
-        else:
-            return f"❌ Sorry, I couldn't process your request. Server returned status code: {response.status_code}"
+        with requests.post(f'{BASE_URL}/chat/stream', json=chat_payload, stream=True, timeout=60) as response:
+            if response.status_code != 200:
+                yield f"❌ Sorry, I couldn't process your request. Server returned status code: {response.status_code}"
+                return
+
+            # Server-Sent Events: "event:" names the frame, "data:" carries its JSON payload
+            event = "message"
+            for line in response.iter_lines(decode_unicode=True):
+                if not line:
+                    event = "message"
+                elif line.startswith("event:"):
+                    event = line[len("event:"):].strip()
+                elif line.startswith("data:"):
+                    data = json.loads(line[len("data:"):])
+                    if event == "delta":
+                        yield data.get("delta", "")
+                    elif event == "error":
+                        yield f"❌ Sorry, I encountered an issue: {data.get('message', 'Unknown error occurred')}"
+                        return
+                    elif event == "done":
+                        st.session_state.last_citations = data.get("citations", [])
+                        return
 
     except requests.exceptions.Timeout:
-        return "⏱️ Sorry, the request took too long to process. Please try again with a shorter question."
+        yield "⏱️ Sorry, the request took too long to process. Please try again with a shorter question."
 
     except requests.exceptions.ConnectionError:
-        return "🔌 Sorry, I couldn't connect to the chat service. Please ensure the API server is running."
+        yield "🔌 Sorry, I couldn't connect to the chat service. Please ensure the API server is running."
 
     except requests.exceptions.RequestException as e:
-        return f"🌐 Sorry, there was a network error: {str(e)}"
+        yield f"🌐 Sorry, there was a network error: {str(e)}"
 
     except json.JSONDecodeError:
-        return "❌ Sorry, I received an invalid response from the server. Please try again."
+        yield "❌ Sorry, I received an invalid response from the server. Please try again."
 
     except Exception as e:
-        return f"❌ Sorry, I encountered an unexpected error: {str(e)}"
+        yield f"❌ Sorry, I encountered an unexpected error: {str(e)}"
 
 
 def add_sidebar_info():
@@ -0,0 +1,6 @@
+import os
+
+# The OpenAI client is created at import time and is stubbed in the tests; it only needs a key to construct
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+# Keep the SQLite summary cache out of the source tree
+os.environ.setdefault("SUMMARY_CACHE_ENABLED", "false")
@@ -0,0 +1,21 @@
+import numpy as np
+
+from app.services.cache_service import AnswerCache
+
+CITATIONS = [{"chunk_id": "report_1", "start_page": 1, "end_page": 1, "label": "p. 1"}]
+
+
+def test_hit_returns_the_citations_stored_with_the_answer():
+    cache = AnswerCache(threshold=0.95)
+    cache.store("report", np.array([1.0, 0.0]), ["report_1", "report_2"], "Q3 revenue grew.", CITATIONS)
+
+    assert cache.lookup("report", np.array([0.99, 0.01]), ["report_1", "report_2"]) == ("Q3 revenue grew.", CITATIONS)
+
+
+def test_miss_on_different_chunks_or_dissimilar_query():
+    cache = AnswerCache(threshold=0.95)
+    cache.store("report", np.array([1.0, 0.0]), ["report_1", "report_2"], "Q3 revenue grew.", CITATIONS)
+
+    assert cache.lookup("report", np.array([1.0, 0.0]), ["report_2", "report_1"]) is None
+    assert cache.lookup("report", np.array([0.0, 1.0]), ["report_1", "report_2"]) is None
+    assert cache.stats()["misses"] == 2
@@ -0,0 +1,161 @@
+"""
+Tests for the /chat/stream Server-Sent Events endpoint.
+
+The endpoint runs unchanged against a stub OpenAI client and a stubbed document search,
+so no model, index or network is needed.
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.routers.chat_router import chat_router
+from app.services import llm_service
+from app.services.chat_service import ChatService
+from app.services.executor_service import StageSaturatedError
+from app.services.session_service import SESSION_STORE
+
+CITATIONS = [{"chunk_id": "report_3", "start_page": 2, "end_page": 3, "label": "pp. 2-3"}]
+QUERY = {"file_name": "report", "query": "What does the report cover?", "bypass_cache": True, "session_id": "stream"}
+
+
+def completion_chunk(content):
+    """A streamed chat completion chunk carrying one text delta"""
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+
+
+class StubCompletionStream:
+    """Async iterator standing in for the stream returned by chat.completions.create(stream=True)"""
+
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            raise StopAsyncIteration
+        if isinstance(chunk, Exception):
+            raise chunk
+        return chunk
+
+
+class StubOpenAIClient:
+    """Stands in for AsyncOpenAI: chat.completions.create streams the given chunks, or raises an error"""
+
+    def __init__(self, chunks=(), error=None):
+        self.calls = []
+        self._chunks = chunks
+        self._error = error
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    async def _create(self, **kwargs):
+        self.calls.append(kwargs)
+        if self._error:
+            raise self._error
+        return StubCompletionStream(self._chunks)
+
+
+def parse_sse(body: str) -> list[tuple[str, dict]]:
+    """Split an SSE body into (event, data) pairs"""
+    events = []
+    for frame in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in frame.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def stored_turns():
+    """Messages of the test session's history, oldest first"""
+    return list(ChatService.load(SESSION_STORE, QUERY["session_id"], QUERY["file_name"]).memory.values())
+
+
+@pytest.fixture
+def client(monkeypatch):
+    def retrieve_context(self, query):
+        return {
+            "success": True,
+            "query": query,
+            "results": {"documents": [["The report covers the third quarter."]]},
+            "citations": CITATIONS
+        }
+
+    monkeypatch.setattr(ChatService, "retrieve_context", retrieve_context)
+    app = FastAPI()
+    app.include_router(chat_router)
+    with TestClient(app) as test_client:
+        yield test_client
+    SESSION_STORE.delete_document(QUERY["file_name"])
+
+
+def use_client(monkeypatch, stub):
+    monkeypatch.setattr(llm_service, "CLIENT", stub)
+    return stub
+
+
+def test_stream_forwards_deltas_then_done(client, monkeypatch):
+    stub = use_client(monkeypatch, StubOpenAIClient([
+        completion_chunk("The report "),
+        SimpleNamespace(choices=[]),  # e.g. a trailing usage chunk
+        completion_chunk(None),
+        completion_chunk("covers Q3."),
+    ]))
+
+    response = client.post("/chat/stream", json=QUERY)
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = parse_sse(response.text)
+    assert events[:-1] == [("delta", {"delta": "The report "}), ("delta", {"delta": "covers Q3."})]
+    event, done = events[-1]
+    assert event == "done"
+    assert done["llm_reply"] == "The report covers Q3."
+    assert done["cached"] is False
+    assert done["citations"] == CITATIONS
+    assert stub.calls[0]["stream"] is True
+    assert stub.calls[0]["messages"][-1]["content"] == QUERY["query"]
+    assert "The report covers the third quarter." in stub.calls[0]["messages"][0]["content"]
+    assert stored_turns() == [QUERY["query"], "The report covers Q3."]
+
+
+def test_stream_reports_completion_failure_as_error_event(client, monkeypatch):
+    use_client(monkeypatch, StubOpenAIClient(error=ValueError("model unavailable")))
+
+    response = client.post("/chat/stream", json=QUERY)
+
+    assert response.status_code == 200
+    assert parse_sse(response.text) == [("error", {"status": "error", "message": "model unavailable"})]
+    assert stored_turns() == []
+
+
+def test_error_mid_stream_sends_an_error_event_and_records_no_turn(client, monkeypatch):
+    use_client(monkeypatch, StubOpenAIClient([
+        completion_chunk("The report "),
+        ConnectionResetError("connection reset by peer")
+    ]))
+
+    response = client.post("/chat/stream", json=QUERY)
+
+    assert response.status_code == 200
+    assert parse_sse(response.text) == [
+        ("delta", {"delta": "The report "}),
+        ("error", {"status": "error", "message": "connection reset by peer"})
+    ]
+    assert stored_turns() == []
+
+
+def test_stream_returns_429_when_search_stage_is_saturated(client, monkeypatch):
+    async def run(func, *args, **kwargs):
+        raise StageSaturatedError("search stage is saturated")
+
+    monkeypatch.setattr(llm_service.SEARCH_EXECUTOR, "run", run)
+
+    response = client.post("/chat/stream", json=QUERY)
+
+    assert response.status_code == 429
+    assert response.headers["retry-after"] == "5"
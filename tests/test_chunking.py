@@ -0,0 +1,87 @@
+from app.services.chunking_service import TextChunker, count_words, normalize_text
+
+
+def sentence(index, words=5):
+    return f"Sentence {index} " + " ".join(["word"] * (words - 3)) + " end."
+
+
+def count_characters(texts):
+    """Tokens proportional to word length, so the tokens per word vary"""
+    return [sum(len(word) // 3 + 1 for word in text.split()) for text in texts]
+
+
+def document_text(pages):
+    return " ".join(text for text in (normalize_text(page) for _, page in pages) if text)
+
+
+def test_chunks_end_on_sentence_boundaries():
+    pages = [(1, " ".join(sentence(index) for index in range(12)))]
+
+    chunks = list(TextChunker(min_tokens=10, max_tokens=12).iter_chunks(pages))
+
+    assert [chunk.text for chunk in chunks] == [
+        " ".join(sentence(index) for index in range(first, first + 2)) for first in range(0, 12, 2)
+    ]
+
+
+def test_overlap_repeats_the_trailing_sentence():
+    pages = [(1, " ".join(sentence(index) for index in range(6)))]
+
+    chunks = list(TextChunker(min_tokens=10, max_tokens=15, overlap_tokens=5).iter_chunks(pages))
+
+    assert chunks[0].text.endswith(sentence(2))
+    assert chunks[1].text.startswith(sentence(2))
+    assert chunks[-1].text.endswith(sentence(5))
+
+
+def test_oversized_sentence_is_split_within_the_token_bound():
+    text = "Intro is short. " + " ".join(f"w{index}" for index in range(50)) + "."
+    chunker = TextChunker(min_tokens=8, max_tokens=12)
+
+    chunks = list(chunker.iter_chunks([(1, text)]))
+
+    assert all(tokens <= 12 for tokens in count_words([chunk.text for chunk in chunks]))
+    assert " ".join(chunk.text for chunk in chunks) == text
+
+
+def test_split_respects_the_bound_when_tokens_per_word_vary():
+    words = ["a", "extraordinarily", "bb", "internationalization", "c"] * 12
+    text = "Tiny start. " + " ".join(words) + "."
+    chunker = TextChunker(count_tokens=count_characters, min_tokens=10, max_tokens=14)
+
+    chunks = list(chunker.iter_chunks([(1, text)]))
+
+    assert all(tokens <= 14 for tokens in count_characters([chunk.text for chunk in chunks]))
+    assert " ".join(chunk.text for chunk in chunks) == text
+
+
+def test_fit_head_returns_the_longest_prefix_within_budget():
+    chunker = TextChunker(count_tokens=count_characters)
+    words = ["a", "extraordinarily", "bb", "internationalization", "c"]
+
+    assert chunker._fit_head(words, 5, 8) == (3, 8)
+    # A single word is kept even when it alone exceeds the budget
+    assert chunker._fit_head(["internationalization", "a"], 2, 3) == (1, 7)
+
+
+def test_chunk_offsets_and_pages_match_the_document_text():
+    pages = [
+        (1, " ".join(sentence(index) for index in range(4)) + " This sentence runs"),
+        (2, "\n across the page\tbreak. " + " ".join(sentence(index) for index in range(4, 8))),
+        (3, "   "),
+        (4, " ".join(sentence(index) for index in range(8, 11)))
+    ]
+    chunker = TextChunker(min_tokens=8, max_tokens=12, overlap_tokens=4)
+    document = document_text(pages)
+
+    chunks = list(chunker.iter_chunks(pages))
+
+    assert [page for page, _ in chunker.page_starts] == [1, 2, 4]
+    assert chunker.document_length == len(document)
+    assert any(chunk.start_page == 1 and chunk.end_page == 2 for chunk in chunks)
+    for chunk in chunks:
+        assert document[chunk.start_char:chunk.end_char] == chunk.text
+        assert chunk.start_page == chunker.page_at(chunk.start_char)
+        assert chunk.end_page == chunker.page_at(chunk.end_char - 1)
+    for page, start in chunker.page_starts:
+        assert chunker.page_at(start) == page
@@ -0,0 +1,26 @@
+import pytest
+
+pytest.importorskip("sentence_transformers")
+pytest.importorskip("optimum.onnxruntime")
+
+from app.services import vector_service
+from app.services.vector_service import embedding_parity, _load_embedding_model
+
+# Minimum cosine similarity to the PyTorch fp32 embedding of the same text
+PARITY_THRESHOLDS = {"onnx": 0.999, "onnx-int8": 0.98}
+
+
+@pytest.mark.parametrize("backend", sorted(PARITY_THRESHOLDS))
+def test_onnx_embeddings_match_the_torch_model(backend, monkeypatch):
+    if not vector_service.EMBEDDING_MODEL:
+        pytest.skip("EMBEDDING_MODEL is not set")
+    try:
+        candidate = _load_embedding_model(backend)
+        _load_embedding_model("torch")
+    except Exception as e:
+        pytest.skip(f"Embedding model {vector_service.EMBEDDING_MODEL} is not available: {e}")
+    monkeypatch.setattr(vector_service, "_embedding_model", candidate)
+
+    parity = embedding_parity()
+
+    assert parity["min_cosine"] >= PARITY_THRESHOLDS[backend]
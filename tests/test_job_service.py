@@ -0,0 +1,54 @@
+import asyncio
+import os
+import time
+
+from app.pydantics.models import PDFErrorResponse, PDFSuccessResponse
+from app.services.job_service import JobService
+from app.services.pdf_service import PDFService
+
+TOTAL_PAGES = 10
+
+
+def test_cancel_during_extraction_stops_the_worker_thread(tmp_path, monkeypatch):
+    spool_path = tmp_path / "upload.pdf"
+    spool_path.write_bytes(b"%PDF-1.4")
+    reports = []  # (pages extracted, spooled file still present)
+
+    def process_spooled_pdf(self, pdf_filename, spool_path, document_hash, progress=None):
+        # Mirrors PDFService: errors raised by the progress callback become an error response
+        try:
+            for page in range(1, TOTAL_PAGES + 1):
+                time.sleep(0.05)
+                reports.append((page, os.path.exists(spool_path)))
+                progress(page, TOTAL_PAGES)
+            return PDFSuccessResponse(pdf_filename=pdf_filename, total_pages=TOTAL_PAGES, document_hash=document_hash)
+        except Exception as e:
+            return PDFErrorResponse(error=str(e))
+
+    monkeypatch.setattr(PDFService, "process_spooled_pdf", process_spooled_pdf)
+
+    async def scenario():
+        service = JobService(max_workers=1)
+        job = service.submit("report", str(spool_path), "hash", "chat")
+        task = service._tasks[job.job_id]
+        while service.get(job.job_id).stages["extract"].completed < 2:
+            await asyncio.sleep(0.01)
+
+        service.cancel(job.job_id)
+        reports_at_cancel = len(reports)
+        await task
+        service.shutdown()
+        return service, service.get(job.job_id), reports_at_cancel
+
+    service, job, reports_at_cancel = asyncio.run(scenario())
+
+    assert job.status == "cancelled"
+    assert job.stages["extract"].status == "cancelled"
+    assert job.stages["vectorize"].status == "cancelled"
+    # The thread stops at its next progress report instead of extracting the remaining pages
+    assert len(reports) <= reports_at_cancel + 1 < TOTAL_PAGES
+    assert job.stages["extract"].completed < TOTAL_PAGES
+    # The spooled file is only removed once extraction no longer reads it
+    assert all(present for _, present in reports)
+    assert not spool_path.exists()
+    assert not service._cancelled and not service._blocking
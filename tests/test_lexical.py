@@ -0,0 +1,88 @@
+import pytest
+
+from app.services.lexical_service import BM25Index, LexicalIndexStore, tokenize
+from app.services.vector_service import VectorService
+
+IDS = ["report_1", "report_2", "report_3"]
+TEXTS = [
+    "Revenue grew by 12 percent in the services segment.",
+    "The warranty excludes damage from part A-1024.3 installed by third parties.",
+    "Operating margin fell while revenue of the hardware segment was flat, revenue revenue."
+]
+
+
+class StubCollection:
+    """Returns stored chunks for the IDs fusion could not take from the dense results"""
+
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.requested = []
+
+    def get(self, ids, include):
+        self.requested.extend(ids)
+        found = [chunk_id for chunk_id in ids if chunk_id in self.chunks]
+        return {
+            "ids": found,
+            "documents": [self.chunks[chunk_id] for chunk_id in found],
+            "metadatas": [{"chunk_index": chunk_id} for chunk_id in found]
+        }
+
+
+def dense(ids):
+    return {
+        "ids": [ids],
+        "documents": [[f"text of {chunk_id}" for chunk_id in ids]],
+        "metadatas": [[{} for _ in ids]],
+        "distances": [[0.1 * rank for rank in range(1, len(ids) + 1)]]
+    }
+
+
+def test_identifiers_are_indexed_whole_and_by_part():
+    assert tokenize("Part A-1024.3 fits") == ["part", "a-1024.3", "a", "1024", "3", "fits"]
+
+
+def test_scores_rank_term_frequency_and_rare_terms_first():
+    index = BM25Index.build(IDS, TEXTS)
+
+    ranked = index.search("revenue", top_k=3)
+    assert [chunk_id for chunk_id, _ in ranked] == ["report_3", "report_1"]
+    assert ranked[0][1] > ranked[1][1] > 0
+
+    assert index.search("a-1024.3 warranty", top_k=1)[0][0] == "report_2"
+    assert index.search("nonexistent") == []
+
+
+def test_persisted_index_reloads_with_the_same_scores(tmp_path):
+    store = LexicalIndexStore(persist_directory=str(tmp_path))
+    expected = store.build("report.pdf", "pdf_report", IDS, TEXTS).search("revenue segment")
+
+    reloaded = LexicalIndexStore(persist_directory=str(tmp_path))
+
+    assert (tmp_path / "pdf_report.json").exists()
+    assert reloaded.get("report.pdf", "pdf_report").search("revenue segment") == expected
+    assert reloaded.get("other.pdf", "pdf_other") is None
+
+    reloaded.delete("report.pdf", "pdf_report")
+    assert not (tmp_path / "pdf_report.json").exists()
+    assert LexicalIndexStore(persist_directory=str(tmp_path)).get("report.pdf", "pdf_report") is None
+
+
+def test_fusion_ranks_chunks_found_by_both_retrievers_first():
+    collection = StubCollection({"d": "text of d"})
+
+    fused = VectorService._fuse_results(collection, dense(["a", "b", "c", "e"]), ["c", "d", "b"], top_k=4)
+
+    assert fused["ids"] == [["c", "b", "a", "d"]]
+    assert collection.requested == ["d"]
+    assert fused["documents"][0][3] == "text of d"
+    assert fused["distances"][0] == [pytest.approx(0.3), pytest.approx(0.2), pytest.approx(0.1), None]
+    assert fused["rrf_scores"][0] == sorted(fused["rrf_scores"][0], reverse=True)
+
+
+def test_fusion_returns_each_chunk_once_and_drops_unstored_bm25_hits():
+    collection = StubCollection({})
+
+    fused = VectorService._fuse_results(collection, dense(["a", "b"]), ["b", "x", "a"], top_k=5)
+
+    assert sorted(fused["ids"][0]) == ["a", "b"]
+    assert len(fused["documents"][0]) == len(fused["rrf_scores"][0]) == 2
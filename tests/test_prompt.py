@@ -0,0 +1,40 @@
+from app.services.prompt_service import PromptAssembler, count_tokens
+
+
+def make_history(turns, words=200):
+    history = []
+    for turn in range(1, turns + 1):
+        history.append((f"User (query_num -> {turn})", f"question {turn} " + "about revenue " * words))
+        history.append((f"AI (response_num -> {turn})", f"answer {turn} " + "revenue grew " * words))
+    return history
+
+
+def make_finding(chunks, words=150):
+    documents = [f"chunk {index} " + "quarterly results " * words for index in range(chunks)]
+    return {
+        "success": True,
+        "results": {"documents": [documents]},
+        "citations": [{"chunk_id": f"report_{index}", "label": f"p. {index + 1}"} for index in range(chunks)]
+    }
+
+
+def test_prompt_with_long_history_stays_within_the_token_budget():
+    assembler = PromptAssembler(token_budget=3000, history_share=0.3)
+
+    prompt, usage, citations = assembler.assemble("What about margins?", make_history(7), make_finding(20))
+
+    assert count_tokens(prompt) <= 3000
+    assert usage["history_tokens"] <= int((3000 - usage["template_tokens"]) * 0.3)
+    assert citations
+
+
+def test_digest_keeps_answers_of_older_turns():
+    assembler = PromptAssembler(token_budget=3000, history_share=0.3)
+
+    history_text, _ = assembler._fit_history(make_history(7, words=40), 600)
+
+    digest = history_text.splitlines()[0]
+    assert digest.startswith("Summary of the earlier conversation:")
+    assert "User: question" in digest and "AI: answer" in digest
+    # The most recent turns are kept verbatim
+    assert history_text.splitlines()[-1].startswith("AI (response_num -> 7)")
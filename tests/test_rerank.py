@@ -0,0 +1,54 @@
+from app.services.rerank_service import CrossEncoderReranker
+
+
+class StubCrossEncoder:
+    """Scores a chunk by its position in a list ordered from least to most relevant"""
+
+    def __init__(self, relevance):
+        self.relevance = relevance
+
+    def predict(self, pairs, **kwargs):
+        return [self.relevance.index(document) for _, document in pairs]
+
+
+def make_results(ids, distances):
+    return {
+        "ids": [ids],
+        "documents": [[f"text of {chunk_id}" for chunk_id in ids]],
+        "metadatas": [[{} for _ in ids]],
+        "distances": [distances]
+    }
+
+
+def make_reranker():
+    reranker = CrossEncoderReranker(skip_margin=0.15)
+    reranker._model = StubCrossEncoder(["text of c", "text of a", "text of b"])
+    return reranker
+
+
+def test_dense_results_with_a_clear_leader_are_not_reranked():
+    results, report = make_reranker().rerank("query", make_results(["a", "b", "c"], [0.2, 0.5, 0.6]), top_k=2)
+
+    assert report == {"status": "skipped", "reason": "separated"}
+    assert results["ids"] == [["a", "b"]]
+
+
+def test_skip_test_uses_the_dense_ranking_of_fused_results():
+    dense = make_results(["a", "b", "c"], [0.2, 0.5, 0.6])
+    # RRF order with a BM25-only chunk ranked first; its distance gap to the next result is meaningless
+    fused = make_results(["c", "b", "a"], [None, 0.5, 0.2])
+
+    results, report = make_reranker().rerank("query", fused, top_k=2, dense_results=dense)
+
+    assert report["status"] == "reranked"
+    assert results["ids"] == [["b", "a"]]
+
+
+def test_fused_results_led_by_the_separated_dense_leader_are_not_reranked():
+    dense = make_results(["a", "b", "c"], [0.2, 0.5, 0.6])
+    fused = make_results(["a", "c", "b"], [0.2, None, 0.5])
+
+    results, report = make_reranker().rerank("query", fused, top_k=2, dense_results=dense)
+
+    assert report["reason"] == "separated"
+    assert results["ids"] == [["a", "c"]]
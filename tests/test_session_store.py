@@ -0,0 +1,112 @@
+import threading
+import types
+
+import pytest
+
+from app.services import session_service
+from app.services.chat_service import ChatService
+from app.services.session_service import (
+    MemorySessionStore, SQLiteSessionStore, deserialize_history, serialize_history
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(session_service, "time", types.SimpleNamespace(time=clock.time))
+    return clock
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def make_store(request, tmp_path):
+    def make(max_sessions=10, ttl=0):
+        if request.param == "memory":
+            return MemorySessionStore(max_sessions=max_sessions, ttl=ttl)
+        return SQLiteSessionStore(str(tmp_path / "sessions.sqlite3"), max_sessions=max_sessions, ttl=ttl)
+    return make
+
+
+def test_history_round_trips_through_the_store(make_store):
+    store = make_store()
+    ChatService.append_turn(store, "s1", "report.pdf", "What grew?", "Revenue, by 12%.")
+    ChatService.append_turn(store, "s1", "report.pdf", "Why?", "Services demand.")
+
+    chat_service = ChatService.load(store, "s1", "report.pdf")
+
+    assert chat_service.query_count == 2
+    assert list(chat_service.memory.items()) == [
+        ("User (query_num -> 1)", "What grew?"),
+        ("AI (response_num -> 1)", "Revenue, by 12%."),
+        ("User (query_num -> 2)", "Why?"),
+        ("AI (response_num -> 2)", "Services demand.")
+    ]
+    assert deserialize_history(serialize_history(2, chat_service.memory)) == (2, chat_service.memory)
+    assert store.load("s1", "other.pdf") is None
+    assert store.delete_document("report.pdf") == 1
+    assert store.load("s1", "report.pdf") is None
+
+
+def test_sessions_expire_after_the_ttl(make_store, clock):
+    store = make_store(ttl=60)
+    store.save("s1", "report.pdf", "state")
+
+    clock.now += 59
+    assert store.load("s1", "report.pdf") == "state"
+    # Loading refreshes the last access
+    clock.now += 59
+    assert store.load("s1", "report.pdf") == "state"
+    clock.now += 61
+    assert store.load("s1", "report.pdf") is None
+
+    store.update("s1", "report.pdf", lambda state: "fresh" if state is None else state + "+")
+    assert store.load("s1", "report.pdf") == "fresh"
+
+
+def test_least_recently_used_session_is_evicted(make_store, clock):
+    store = make_store(max_sessions=2)
+    store.save("s1", "report.pdf", "one")
+    clock.now += 1
+    store.save("s2", "report.pdf", "two")
+    clock.now += 1
+    store.load("s1", "report.pdf")
+    clock.now += 1
+    store.save("s3", "report.pdf", "three")
+
+    assert store.load("s2", "report.pdf") is None
+    assert store.load("s1", "report.pdf") == "one"
+    assert store.load("s3", "report.pdf") == "three"
+    assert store.stats()["sessions"] == 2
+
+
+def test_concurrent_appends_keep_every_turn(make_store):
+    # Two stores on one database file behave like two worker processes
+    stores = [make_store(), make_store()]
+    threads, turns = 8, 10
+
+    def ask(thread):
+        for turn in range(turns):
+            ChatService.append_turn(stores[thread % 2], "s1", "report.pdf", f"q{thread}-{turn}", f"a{thread}-{turn}")
+
+    workers = [threading.Thread(target=ask, args=(thread,)) for thread in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+    # The SQLite stores share their sessions, each memory store has its own
+    shared = isinstance(stores[0], SQLiteSessionStore)
+    expected = threads * turns if shared else threads * turns // 2
+    assert [ChatService.load(store, "s1", "report.pdf").query_count for store in stores] == [expected, expected]
+    chat_service = ChatService.load(stores[0], "s1", "report.pdf")
+    assert len(chat_service.memory) == chat_service.max_memory_size * 2
+    # Every question is stored next to its own answer
+    pairs = list(chat_service.memory.values())
+    assert all(question[1:] == answer[1:] for question, answer in zip(pairs[::2], pairs[1::2]))
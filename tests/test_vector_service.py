@@ -0,0 +1,118 @@
+import os
+
+import numpy as np
+import pytest
+
+from app.pydantics.models import PDFSuccessResponse
+from app.services import vector_service
+from app.services.chunking_service import TextChunker
+from app.services.vector_service import VectorService
+from app.services.vector_store_service import FlatVectorStore, HnswParams
+
+DIM = 32
+TOPICS = ["revenue", "warranty", "temperature", "margin", "staffing", "logistics", "pricing", "audit"]
+
+
+class StubEmbeddingModel:
+    """Bag of words with one dimension per word, so texts sharing words are close; records every text it encodes"""
+
+    def __init__(self):
+        self.encoded = []
+        self.vocabulary = {}
+
+    def encode(self, texts, **kwargs):
+        self.encoded.extend(texts)
+        vectors = np.zeros((len(texts), DIM), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                dimension = self.vocabulary.setdefault(word.strip("."), len(self.vocabulary))
+                vectors[row, dimension % DIM] += 1.0
+        return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def page(topics):
+    return " ".join(f"The {topic} section covers {topic} details." for topic in topics)
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv("VECTOR_PERSIST", "false")
+    monkeypatch.setattr(vector_service, "create_vector_store",
+                        lambda persist: FlatVectorStore(params=HnswParams(space="cosine")))
+    monkeypatch.setattr(vector_service, "_embedding_model", StubEmbeddingModel())
+    monkeypatch.setattr(vector_service, "EMBEDDING_CACHE", vector_service.EmbeddingCache())
+    service = VectorService()
+    # Two sentences of six words per chunk
+    monkeypatch.setattr(service, "_make_chunker", lambda: TextChunker(min_tokens=12, max_tokens=12))
+    for pdf_name in ("report.pdf", "copy.pdf"):
+        os.makedirs(os.path.join(service.utils_dir, pdf_name))
+    return service
+
+
+def index(service, pages, version):
+    return service._process_and_store_chunks(list(enumerate(pages, 1)), "report.pdf", len(pages), version)
+
+
+def test_reindex_embeds_only_changed_chunks_and_deletes_removed_ones(service):
+    model = vector_service._embedding_model
+    first = index(service, [page(TOPICS[:4]), page(TOPICS[4:])], "v1")
+    assert first == {"chunks_created": 4, "chunks_stored": 4, "chunks_unchanged": 0,
+                     "chunks_deleted": 0, "failed_batches": []}
+
+    model.encoded.clear()
+    # The second page loses its last chunk and one of its chunks changes
+    second = index(service, [page(TOPICS[:4]), page(["staffing", "shipping"])], "v2")
+
+    assert second == {"chunks_created": 3, "chunks_stored": 1, "chunks_unchanged": 2,
+                      "chunks_deleted": 2, "failed_batches": []}
+    assert model.encoded == [page(["staffing", "shipping"])]
+
+    collection = service._get_collection("report.pdf")
+    assert collection.count() == 3
+    stored = collection.get(include=["metadatas"])
+    assert sorted(metadata["chunk_num"] for metadata in stored["metadatas"]) == [1, 2, 3]
+    assert {metadata["total_chunks"] for metadata in stored["metadatas"]} == {3}
+    assert {metadata["document_hash"] for metadata in stored["metadatas"]} == {"v2"}
+
+    for mode in ("dense", "hybrid"):
+        found = service.semantic_search("shipping details", "report.pdf", top_k=2, mode=mode, rerank=False)
+        assert found["success"]
+        assert "shipping" in found["results"]["documents"][0][0]
+        assert found["citations"][0]["start_page"] == 2
+    removed = service.semantic_search("audit", "report.pdf", top_k=3, mode="hybrid", rerank=False)
+    assert all("audit" not in document for document in removed["results"]["documents"][0])
+
+
+def test_same_bytes_under_a_new_name_reuse_the_stored_vectors(service):
+    model = vector_service._embedding_model
+    index(service, [page(TOPICS[:4]), page(TOPICS[4:])], "v1")
+    model.encoded.clear()
+
+    result = service.vectorize_nudge(PDFSuccessResponse(pdf_filename="copy.pdf", total_pages=2, document_hash="v1"))
+
+    assert result["status"] == "success"
+    assert result["copied_from"] == "report.pdf"
+    assert (result["chunks_created"], result["chunks_stored"]) == (4, 4)
+    assert model.encoded == []
+    assert service._get_indexed_chunk_count("copy.pdf", "v1") == 4
+    assert service._load_offset_index("copy.pdf") == service._load_offset_index("report.pdf")
+
+    found = service.semantic_search("logistics", "copy.pdf", top_k=1, mode="hybrid", rerank=False)
+    assert "logistics" in found["results"]["documents"][0][0]
+    assert found["results"]["metadatas"][0][0]["pdf_name"] == "copy.pdf"
+    assert found["results"]["ids"][0][0].startswith("copy.pdf_")
+
+    again = service.vectorize_nudge(PDFSuccessResponse(pdf_filename="copy.pdf", total_pages=2, document_hash="v1"))
+    assert again["already_indexed"]
+
+
+def test_ingestion_bypasses_the_query_embedding_cache(service):
+    index(service, [page(TOPICS[:4]), page(TOPICS[4:])], "v1")
+    assert vector_service.EMBEDDING_CACHE.stats()["entries"] == 0
+
+    service.semantic_search("audit details", "report.pdf", top_k=1, mode="dense", rerank=False)
+    service.semantic_search("audit details", "report.pdf", top_k=1, mode="dense", rerank=False)
+
+    stats = vector_service.EMBEDDING_CACHE.stats()
+    assert (stats["entries"], stats["hits"]) == (1, 1)
@@ -0,0 +1,82 @@
+import numpy as np
+import pytest
+
+from app.services.vector_store_service import FlatVectorStore, HnswParams
+
+DIM = 8
+
+
+def make_vectors(count, seed):
+    return np.random.default_rng(seed).normal(size=(count, DIM)).astype(np.float32)
+
+
+@pytest.fixture(params=[("float16", False), ("int8", False), ("float16", True), ("int8", True)],
+                ids=["float16", "int8", "float16-rescore", "int8-rescore"])
+def collection(request):
+    dtype, rescore = request.param
+    store = FlatVectorStore(params=HnswParams(space="cosine"), dtype=dtype, rescore=rescore)
+    return store.create_collection("pdf_test", {"pdf_name": "test"})
+
+
+def test_query_after_a_write_grows_the_matrix(collection):
+    first = make_vectors(37, seed=0)
+    collection.upsert(ids=[f"a{i}" for i in range(37)], embeddings=first)
+    # One more row doubles the in-memory capacity to 74 rows, only 38 of them are used
+    extra = make_vectors(1, seed=1)
+    collection.upsert(ids=["b0"], embeddings=extra)
+
+    result = collection.query(query_embeddings=extra, n_results=3)
+
+    assert result["ids"][0][0] == "b0"
+    assert len(result["ids"][0]) == 3
+    assert result["distances"][0][0] == pytest.approx(0.0, abs=0.02)
+
+
+def test_query_after_delete_and_reuse_of_a_slot(collection):
+    vectors = make_vectors(20, seed=2)
+    collection.upsert(ids=[f"a{i}" for i in range(20)], embeddings=vectors)
+    collection.delete(["a3", "a7"])
+
+    result = collection.query(query_embeddings=vectors[3:4], n_results=20)
+    assert "a3" not in result["ids"][0] and "a7" not in result["ids"][0]
+    assert len(result["ids"][0]) == 18
+
+    collection.upsert(ids=["c0"], embeddings=vectors[3:4])
+    result = collection.query(query_embeddings=vectors[3:4], n_results=1)
+    assert result["ids"] == [["c0"]]
+    assert collection.count() == 19
+
+
+def test_batched_writes_are_persisted_once(tmp_path, monkeypatch):
+    store = FlatVectorStore(str(tmp_path), params=HnswParams(space="cosine"))
+    collection = store.create_collection("pdf_test", {"pdf_name": "test"})
+    saves, save_vectors = [], collection._save_vectors
+
+    def counting_save():
+        saves.append(len(collection._records))
+        save_vectors()
+    monkeypatch.setattr(collection, "_save_vectors", counting_save)
+    vectors = make_vectors(10, seed=3)
+
+    with store.batch_writes(collection):
+        collection.upsert(ids=[f"a{i}" for i in range(5)], embeddings=vectors[:5])
+        collection.upsert(ids=[f"a{i}" for i in range(5, 10)], embeddings=vectors[5:])
+        collection.update(ids=["a0"], metadatas=[{"chunk_num": 1}])
+        collection.delete(["a9"])
+        # Nothing is unloaded while its writes exist only in memory
+        assert not collection._unload()
+        assert saves == []
+
+    assert saves == [9]
+    reopened = FlatVectorStore(str(tmp_path)).get_collection("pdf_test")
+    assert reopened.count() == 9
+    assert reopened.get(ids=["a0"])["metadatas"] == [{"chunk_num": 1}]
+
+
+def test_writes_outside_a_batch_are_persisted_immediately(tmp_path):
+    store = FlatVectorStore(str(tmp_path), params=HnswParams(space="cosine"))
+    collection = store.create_collection("pdf_test", {"pdf_name": "test"})
+
+    collection.upsert(ids=["a0", "a1"], embeddings=make_vectors(2, seed=4))
+
+    assert FlatVectorStore(str(tmp_path)).get_collection("pdf_test").count() == 2